@@ -0,0 +1,55 @@
+"""
+مقارنة نتيجتي قياس بصيغة JSON واكتشاف التراجع في الأداء
+
+التشغيل من مجلد backend:
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/current.json
+    python -m benchmarks.compare old.json new.json --threshold 0.1
+
+يقبل ملفات pytest-benchmark (--benchmark-json) وملخص Locust الذي يكتبه
+benchmarks/locustfile.py بنفس البنية. يُقارن الوسيط لكل قياس موجود في
+الملفين، ويخرج برمز 1 إذا زاد وسيط أي قياس بأكثر من threshold (نسبة).
+"""
+import argparse
+import json
+import sys
+from typing import Dict
+
+
+def load_medians(path: str) -> Dict[str, float]:
+    """وسيط كل قياس بالثواني حسب اسمه"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {benchmark["name"]: benchmark["stats"]["median"] for benchmark in data["benchmarks"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="أقصى زيادة مقبولة في الوسيط (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline = load_medians(args.baseline)
+    current = load_medians(args.current)
+    regressions = []
+    width = max(map(len, baseline.keys() | current.keys()), default=10)
+    print(f"{'benchmark':<{width}} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name in sorted(baseline.keys() | current.keys()):
+        if name not in baseline or name not in current:
+            value = baseline.get(name, current.get(name)) * 1000
+            where = "current" if name in current else "baseline"
+            print(f"{name:<{width}} {'only in ' + where:>25} {value:8.3f} ms")
+            continue
+        change = current[name] / baseline[name] - 1
+        marker = "  REGRESSION" if change > args.threshold else ""
+        if marker:
+            regressions.append(name)
+        print(f"{name:<{width}} {baseline[name] * 1000:12.3f} {current[name] * 1000:12.3f} {change:+8.1%}{marker}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+قياس أثر الاستدعاءات المعطِّلة على زمن الاستجابة تحت الحمل
+
+التشغيل من مجلد backend:
+    python -m benchmarks.event_loop_latency --concurrency 50 --provider-latency 0.1
+
+يستبدل GoogleTranslator ببديل متزامن ينام provider-latency ثانية (محاكاةً
+لطلب شبكة حقيقي) ثم يرسل concurrency طلباً متزامناً إلى /translate:
+- before: الاستدعاء المتزامن داخل حلقة الأحداث كما كان سابقاً
+- after: الاستدعاء عبر BlockingPool
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+import main
+from services.blocking_pool import BlockingPool
+from services.translation_cache import TranslationCache
+
+
+class InlinePool:
+    """السلوك السابق: تشغيل الاستدعاء المتزامن مباشرة داخل الحلقة"""
+
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def shutdown(self):
+        pass
+
+
+def make_fake_translator(latency: float):
+    class FakeGoogleTranslator:
+        def __init__(self, source: str, target: str):
+            self.target = target
+
+        def translate(self, text: str) -> str:
+            time.sleep(latency)
+            return f"[{self.target}] {text}"
+
+    return FakeGoogleTranslator
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_load(concurrency: int, label: str) -> list[float]:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(index: int) -> float:
+            start = time.perf_counter()
+            response = await client.post("/translate", json={
+                "text": f"{label} request {index}", "target_lang": "ar", "source_lang": "en",
+            })
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        return await asyncio.gather(*(one(i) for i in range(concurrency)))
+
+
+def main_() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--provider-latency", type=float, default=0.1)
+    parser.add_argument("--pool-size", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    main.GoogleTranslator = make_fake_translator(args.provider_latency)
+    services = main.app.state.services
+    main.app.state.rate_limiter.max_requests = 10 ** 9
+    print(f"{'mode':>8} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for label, pool in (("before", InlinePool()), ("after", BlockingPool(args.pool_size))):
+        services.blocking_pool = pool
+        services.translation_cache = TranslationCache()
+        latencies = asyncio.run(run_load(args.concurrency, label))
+        pool.shutdown()
+        print(f"{label:>8} {percentile(latencies, 0.5) * 1000:10.1f} "
+              f"{percentile(latencies, 0.99) * 1000:10.1f} {max(latencies) * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main_()
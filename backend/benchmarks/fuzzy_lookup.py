@@ -0,0 +1,116 @@
+"""
+قياس زمن البحث التقريبي في ذاكرة الترجمة
+
+التشغيل من مجلد backend:
+    python -m benchmarks.fuzzy_lookup --sizes 10000 100000 1000000
+    python -m benchmarks.fuzzy_lookup --with-context --threshold 0.5
+
+يقارن التقييم المتجه (NumPy) والبحث عبر الفهرس المقلوب بالمسح الخطي (للأحجام
+التي لا تتجاوز --linear-limit لأن المسح الخطي عند مليون مدخل يستغرق دقائق).
+مع --with-context تحمل المدخلات والاستعلامات سياقاً فتُحسب درجة السياق لكل مرشح.
+"""
+import argparse
+import asyncio
+import random
+import time
+from statistics import median
+
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+from services.translation_memory_service import TranslationMemoryService, jaccard, tokenize
+
+VOCABULARY_SIZE = 50_000
+
+
+def make_sentence(rng: random.Random, words: list[str]) -> str:
+    # نصف الكلمات من رأس المفردات (كلمات شائعة) ليشبه التوزيع نصوصاً حقيقية
+    length = rng.randint(6, 18)
+    return " ".join(rng.choice(words[:200]) if rng.random() < 0.5 else rng.choice(words)
+                    for _ in range(length))
+
+
+def make_context(rng: random.Random, words: list[str], with_context: bool) -> TranslationContext:
+    if not with_context:
+        return TranslationContext()
+    return TranslationContext(
+        previous_paragraph=make_sentence(rng, words),
+        next_paragraph=make_sentence(rng, words),
+        scene_type=rng.choice(["حوار", "وصف", "معركة"]),
+        chapter_number=rng.randint(1, 50),
+    )
+
+
+def build_service(size: int, rng: random.Random, words: list[str], with_context: bool = False) -> TranslationMemoryService:
+    service = TranslationMemoryService(vectorized=False)
+    context = TranslationContext()
+
+    async def load() -> None:
+        for i in range(size):
+            await service.add_entry(TranslationMemoryEntry.model_construct(
+                original_text=make_sentence(rng, words),
+                translated_text=f"t{i}",
+                context=make_context(rng, words, with_context) if with_context else context,
+                frequency=1,
+                confidence_score=1.0,
+            ))
+
+    asyncio.run(load())
+    return service
+
+
+def linear_scan(service: TranslationMemoryService, text: str, context, threshold: float) -> list:
+    query = tokenize(text)
+    return [entry for entry in service.memory_entries
+            if jaccard(query, tokenize(entry.original_text)) * 0.7
+            + (service._calculate_context_similarity(context, entry.context) if context else 1.0) * 0.3
+            >= threshold]
+
+
+def measure(fn, queries: list[str]) -> float:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append(time.perf_counter() - start)
+    return median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--linear-limit", type=int, default=100_000)
+    parser.add_argument("--with-context", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    context = make_context(rng, words, args.with_context) if args.with_context else None
+    print(f"{'entries':>10} {'vector ms':>12} {'indexed ms':>12} {'linear ms':>12}")
+    for size in args.sizes:
+        service = build_service(size, rng, words, args.with_context)
+        # نفس واجهة التخزين مع التقييم المتجه
+        vector = TranslationMemoryService(service.store, vectorized=True)
+        # نصف الاستعلامات نسخ معدلة قليلاً من مدخلات موجودة والنصف الآخر عشوائي
+        queries = []
+        for _ in range(args.queries):
+            if rng.random() < 0.5:
+                queries.append(rng.choice(service.memory_entries).original_text + " extra")
+            else:
+                queries.append(make_sentence(rng, words))
+
+        # بناء فهرس المقيم المتجه خارج القياس
+        asyncio.run(vector.find_similar_translations(queries[0], context, args.threshold))
+        vectorized = measure(
+            lambda q: asyncio.run(vector.find_similar_translations(q, context, args.threshold)), queries
+        )
+        indexed = measure(
+            lambda q: asyncio.run(service.find_similar_translations(q, context, args.threshold)), queries
+        )
+        linear = (f"{measure(lambda q: linear_scan(service, q, context, args.threshold), queries):12.2f}"
+                  if size <= args.linear_limit else f"{'-':>12}")
+        print(f"{size:>10} {vectorized:12.2f} {indexed:12.2f} {linear}")
+
+
+if __name__ == "__main__":
+    main()
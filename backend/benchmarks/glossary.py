@@ -0,0 +1,55 @@
+"""
+قياس استبدال المصطلحات: str.replace لكل مصطلح مقابل المطابق ذي المرور الواحد
+
+التشغيل من مجلد backend:
+    python -m benchmarks.glossary --terms 5000 --chars 50000
+"""
+import argparse
+import random
+import time
+
+from services.glossary import GlossaryMatcher
+
+
+def sequential_replace(text: str, terms: list[tuple[str, str]]) -> str:
+    """السلوك السابق لـ apply_terms"""
+    for original, translation in terms:
+        text = text.replace(original, translation)
+    return text
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=5000)
+    parser.add_argument("--chars", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(3, 10))) for _ in range(args.terms * 2)]
+    terms = [(word.capitalize(), f"<{i}>") for i, word in enumerate(words[:args.terms])]
+    chapter_words = []
+    while sum(len(word) + 1 for word in chapter_words) < args.chars:
+        # نحو 10% من كلمات الفصل مصطلحات
+        chapter_words.append(rng.choice(terms)[0] if rng.random() < 0.1 else rng.choice(words))
+    chapter = " ".join(chapter_words)[:args.chars]
+
+    build = timed(lambda: GlossaryMatcher(terms))
+    matcher = GlossaryMatcher(terms)
+    print(f"terms={len(terms)} chars={len(chapter)}")
+    print(f"sequential str.replace: {timed(lambda: sequential_replace(chapter, terms)):8.2f} ms")
+    print(f"matcher build (once):   {build:8.2f} ms")
+    print(f"matcher apply:          {timed(lambda: matcher.apply(chapter)):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+سيناريو حمل لـ /translate ونقاط نهاية ذاكرة الترجمة (Locust)
+
+التشغيل من مجلد backend بعد تشغيل benchmarks.stub_server:
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 --headless -u 50 -r 10 -t 1m
+
+عند انتهاء الاختبار يُكتب ملخص لكل نقطة نهاية (الوسيط وp95 بالثواني، وعدد
+الطلبات والأخطاء، والطلبات في الثانية) إلى LOCUST_JSON
+(افتراضياً benchmarks/results/locust.json) بنفس بنية pytest-benchmark حتى
+يُقارن عبر benchmarks.compare.
+"""
+import json
+import os
+import random
+
+from locust import HttpUser, between, events, task
+
+WORDS = ["the", "dragon", "king", "castle", "sword", "night", "storm", "magic", "ancient", "forest",
+         "whispered", "gate", "river", "shadow", "crown", "stone", "light", "wind", "blade", "tower"]
+# نصوص متكررة تصيب الذاكرة المؤقتة وذاكرة الترجمة كما في فصول حقيقية
+COMMON = [" ".join(random.Random(i).choices(WORDS, k=12)) + "." for i in range(50)]
+
+
+def sentence(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(6, 18))) + "."
+
+
+class TranslatorUser(HttpUser):
+    wait_time = between(0.05, 0.2)
+
+    def on_start(self):
+        self.rng = random.Random()
+
+    @task(4)
+    def translate_repeated(self):
+        self.client.post("/translate", name="/translate [repeated]", json={
+            "text": self.rng.choice(COMMON), "source_lang": "en", "target_lang": "ar",
+        })
+
+    @task(2)
+    def translate_unique(self):
+        self.client.post("/translate", name="/translate [unique]", json={
+            "text": sentence(self.rng), "source_lang": "en", "target_lang": "ar",
+        })
+
+    @task(1)
+    def translate_batch(self):
+        self.client.post("/translate/batch", json={
+            "segments": [sentence(self.rng) for _ in range(20)], "source_lang": "en", "target_lang": "ar",
+        })
+
+    @task(2)
+    def find_similar(self):
+        self.client.post("/translation-memory/find-similar", name="/translation-memory/find-similar", params={
+            "text": self.rng.choice(COMMON), "threshold": 0.5, "limit": 10,
+        })
+
+    @task(1)
+    def add_memory(self):
+        original_text = sentence(self.rng)
+        self.client.post("/translation-memory/add", json={
+            "original_text": original_text, "translated_text": f"[ar] {original_text}",
+            "context": {"scene_type": "حوار"}, "target_lang": "ar",
+        })
+
+
+@events.test_stop.add_listener
+def write_summary(environment, **kwargs):
+    benchmarks = []
+    for entry in environment.stats.entries.values():
+        benchmarks.append({
+            "name": f"{entry.method} {entry.name}",
+            "stats": {
+                "median": entry.median_response_time / 1000,
+                "p95": entry.get_response_time_percentile(0.95) / 1000,
+                "rounds": entry.num_requests,
+                "failures": entry.num_failures,
+                "rps": entry.total_rps,
+            },
+        })
+    path = os.getenv("LOCUST_JSON", os.path.join("benchmarks", "results", "locust.json"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"benchmarks": benchmarks}, f, indent=2, ensure_ascii=False)
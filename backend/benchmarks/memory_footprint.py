@@ -0,0 +1,75 @@
+"""
+قياس ذاكرة مدخلات ذاكرة الترجمة: قائمة نماذج Pydantic مقابل CompactStore
+
+التشغيل من مجلد backend:
+    python -m benchmarks.memory_footprint --sizes 10000 100000
+
+تُنشأ المدخلات نفسها (نصوص عربية وإنجليزية، وسياق، ووسوم وشخصيات متكررة
+لعدد قليل من الروايات) ويُقاس ما يبقى محجوزاً بعد إضافتها عبر tracemalloc.
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime
+
+from models.translation_memory import Character, TranslationContext, TranslationMemoryEntry
+from services.translation_memory_service import exact_key
+from services.translation_memory_store import CompactStore, InMemoryStore
+
+WORDS = ["the", "dragon", "king", "castle", "sword", "night", "storm", "magic", "ancient", "forest"]
+ARABIC_WORDS = ["التنين", "الملك", "القلعة", "السيف", "الليل", "العاصفة", "السحر", "القديم", "الغابة"]
+NOVELS = [f"Novel {i}" for i in range(20)]
+SCENES = ["حوار", "وصف", "معركة"]
+
+
+def make_entry(rng: random.Random, i: int) -> TranslationMemoryEntry:
+    novel = rng.choice(NOVELS)
+    return TranslationMemoryEntry(
+        original_text=" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 25))) + f" {i}",
+        translated_text=" ".join(rng.choice(ARABIC_WORDS) for _ in range(rng.randint(8, 25))),
+        context=TranslationContext(
+            previous_paragraph=" ".join(rng.choice(WORDS) for _ in range(20)),
+            scene_type=rng.choice(SCENES),
+            chapter_number=rng.randint(1, 200),
+        ),
+        last_used=datetime(2024, 1, 1),
+        characters=[Character(name_original=f"{novel} hero", name_translated="البطل")],
+        tags=[novel.lower(), "draft"],
+        novel_title=novel,
+        target_lang="ar",
+    )
+
+
+def footprint(store_factory, entries: list) -> int:
+    """الذاكرة المحجوزة بالبايت بعد إضافة المدخلات إلى واجهة تخزين جديدة"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = store_factory()
+    for entry in entries:
+        # نسخة مستقلة لكل مدخل كما يصل من الطلب، فلا تُحتسب الكائنات المشتركة
+        store.add(exact_key(entry.original_text, entry.novel_title, entry.target_lang), entry.model_copy(deep=True))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del store
+    return used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    print(f"{'entries':>10} {'models MB':>12} {'compact MB':>12} {'ratio':>8}")
+    for size in args.sizes:
+        entries = [make_entry(rng, i) for i in range(size)]
+        models = footprint(InMemoryStore, entries)
+        compact = footprint(CompactStore, entries)
+        print(f"{size:>10} {models / 2**20:12.1f} {compact / 2**20:12.1f} {models / compact:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+قياس ذاكرة عدة عمال وسرعتهم: فهارس محلية لكل عملية مقابل الفهرس المشترك
+
+التشغيل من مجلد backend (Linux، يقرأ /proc/self/smaps_rollup):
+    python -m benchmarks.shared_index --entries 50000 --workers 4
+
+تُملأ قاعدة SQLite مؤقتة بالمدخلات نفسها وينشر منها إصدار واحد من الفهرس
+المشترك. ثم تعمل --workers عمليات في نفس الوقت، كل منها تفتح ذاكرة الترجمة
+(بفهارسها الخاصة أو بالفهرس المشترك) وتنفذ --queries بحثاً تقريبياً مع سياق.
+الذاكرة الخاصة (Private) هي ما لا تتشاركه العملية مع غيرها، وPSS تقسم الصفحات
+المشتركة على العمليات التي تستخدمها.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.memory_footprint import make_entry
+from models.translation_memory import TranslationContext
+from services.shared_index import SharedIndexReader, SharedIndexWriter
+from services.translation_memory_service import TranslationMemoryService
+from services.translation_memory_store import SQLiteStore
+
+
+def memory_kb() -> dict:
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split()[:2] for line in f if line.split()[0].endswith(":"))
+    return {
+        "private": int(fields["Private_Clean:"]) + int(fields["Private_Dirty:"]),
+        "pss": int(fields["Pss:"]),
+    }
+
+
+def worker(path: str, directory: str, shared: bool, queries: list, start, results) -> None:
+    before = memory_kb()
+    service = TranslationMemoryService(
+        SQLiteStore(path), shared_index=SharedIndexReader(directory) if shared else None
+    )
+    context = TranslationContext(scene_type="حوار", chapter_number=3)
+    # الاستعلام الأول يبني الفهارس المحلية أو يفتح الفهرس المشترك
+    asyncio.run(service.find_similar_translations(queries[0], context, 0.5, limit=10))
+    start.wait()
+    began = time.perf_counter()
+    for query in queries:
+        asyncio.run(service.find_similar_translations(query, context, 0.5, limit=10))
+    elapsed = time.perf_counter() - began
+    after = memory_kb()
+    results.put((after["private"] - before["private"], after["pss"], len(queries) / elapsed))
+
+
+def run(path: str, directory: str, shared: bool, workers: int, queries: list) -> tuple:
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Barrier(workers), ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(path, directory, shared, queries, start, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    private = sum(m[0] for m in measured) / workers / 1024
+    pss = sum(m[1] for m in measured) / 1024
+    throughput = sum(m[2] for m in measured)
+    return private, pss, throughput
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path, directory = os.path.join(tmp, "memory.db"), os.path.join(tmp, "index")
+        service = TranslationMemoryService(SQLiteStore(path))
+        entries = [make_entry(rng, i) for i in range(args.entries)]
+        asyncio.run(service.import_entries(entries))
+        began = time.perf_counter()
+        writer = SharedIndexWriter(directory, SQLiteStore(path))
+        writer.publish()
+        print(f"index build: {time.perf_counter() - began:.1f}s, "
+              f"{os.path.getsize(os.path.join(directory, 'index-0000000001.bin')) / 2**20:.1f} MB on disk")
+
+        queries = [entries[rng.randrange(len(entries))].original_text + " extra" for _ in range(args.queries)]
+        print(f"{'mode':>8} {'private MB/worker':>18} {'total PSS MB':>13} {'queries/s':>10}")
+        for shared in (False, True):
+            private, pss, throughput = run(path, directory, shared, args.workers, queries)
+            print(f"{'shared' if shared else 'local':>8} {private:18.1f} {pss:13.1f} {throughput:10.0f}")
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+مزودو ترجمة محليون لقياس الأداء دون اتصال بالشبكة
+
+يستبدل install دوال المزودين في main ببدائل حتمية تنام latency ثانية ثم
+تعيد كل سطر مع بادئة اللغة الهدف (وتبقي علامات المقاطع [[n]] كما يفعل
+المزود الحقيقي)، ويرفع حد معدل الطلبات حتى لا يتحول الحمل إلى ردود 429.
+تفشل نسبة failure_rate من الطلبات (نص فارغ) لاختبار الرجوع إلى المزود البديل.
+"""
+import asyncio
+import random
+from typing import AsyncIterator
+
+import main
+from services.batching import SEGMENT_MARKER
+
+
+def install(latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0) -> None:
+    rng = random.Random(seed)
+
+    async def respond(text: str, target_lang: str) -> str:
+        if latency:
+            await asyncio.sleep(latency)
+        if failure_rate and rng.random() < failure_rate:
+            return ""
+        return "\n".join(
+            line if line.startswith(SEGMENT_MARKER[:2]) else f"[{target_lang}] {line}"
+            for line in text.split("\n")
+        )
+
+    async def translate_with_google(text: str, source_lang: str, target_lang: str) -> str:
+        return await respond(text, target_lang)
+
+    async def translate_with_openai(
+        text: str, source_lang: str, target_lang: str, api_key: str, instructions: str = ""
+    ) -> str:
+        return await respond(text, target_lang)
+
+    async def translate_with_openai_stream(
+        text: str, source_lang: str, target_lang: str, api_key: str, instructions: str = ""
+    ) -> AsyncIterator[str]:
+        translated_text = await respond(text, target_lang)
+        for word in translated_text.split(" "):
+            yield word + " "
+
+    main.translate_with_google = translate_with_google
+    main.translate_with_openai = translate_with_openai
+    main.translate_with_openai_stream = translate_with_openai_stream
+    main.app.state.rate_limiter.max_requests = 10 ** 9
@@ -0,0 +1,30 @@
+"""
+تشغيل الخادم بمزودين محليين لاختبارات الحمل دون اتصال
+
+التشغيل من مجلد backend:
+    python -m benchmarks.stub_server --port 8000 --provider-latency 0.05
+ثم في نافذة أخرى:
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 --headless -u 50 -r 10 -t 1m
+"""
+import argparse
+
+import uvicorn
+
+import main
+from benchmarks import stub_providers
+
+
+def main_() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--provider-latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub_providers.install(args.provider_latency, args.failure_rate)
+    uvicorn.run(main.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main_()
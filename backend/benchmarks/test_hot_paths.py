@@ -0,0 +1,146 @@
+"""
+قياسات دقيقة للمسارات الساخنة في الخلفية (pytest-benchmark)
+
+التشغيل من مجلد backend (لا تحتاج اتصالاً بالشبكة):
+    python -m pytest benchmarks --benchmark-json=benchmarks/results/current.json
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+لحفظ خط أساس جديد يُشغل الأمر الأول مع baseline.json بدلاً من current.json.
+كل قياس مكرر لعدة أحجام بيانات (الحجم في اسم القياس بين القوسين).
+"""
+import asyncio
+import itertools
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks import stub_providers  # noqa: E402
+from models.translation_memory import TranslationContext, TranslationMemoryEntry  # noqa: E402
+from security import InMemoryRateLimitBackend, RateLimiter  # noqa: E402
+from services.translation_cache import TranslationCache  # noqa: E402
+from services.translation_memory_service import TranslationMemoryService  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(5000)]
+SCENES = ["حوار", "وصف", "معركة"]
+
+
+def sentence(rng: random.Random, length: int = 12) -> str:
+    # نصف الكلمات شائعة ليشبه التوزيع نصوصاً حقيقية
+    return " ".join(rng.choice(WORDS[:200]) if rng.random() < 0.5 else rng.choice(WORDS) for _ in range(length))
+
+
+def make_entry(rng: random.Random, i: int) -> TranslationMemoryEntry:
+    return TranslationMemoryEntry(
+        original_text=sentence(rng),
+        translated_text=f"ترجمة {i}",
+        context=TranslationContext(
+            previous_paragraph=sentence(rng),
+            scene_type=rng.choice(SCENES),
+            chapter_number=rng.randint(1, 50),
+        ),
+        target_lang="ar",
+    )
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+_services = {}
+
+
+def filled_service(loop, size: int) -> TranslationMemoryService:
+    """خدمة بـ size مدخلاً (تُبنى مرة واحدة لكل حجم)"""
+    if size not in _services:
+        rng = random.Random(size)
+        service = TranslationMemoryService()
+        loop.run_until_complete(service.import_entries(make_entry(rng, i) for i in range(size)))
+        _services[size] = service
+    return _services[size]
+
+
+@pytest.mark.parametrize("term_count", [10, 100, 1000])
+def test_apply_terms(benchmark, loop, term_count):
+    rng = random.Random(term_count)
+    terms = [main.Term(original=f"Name{i}", translation=f"اسم{i}") for i in range(term_count)]
+    text = " ".join(f"Name{rng.randrange(term_count)}" if rng.random() < 0.1 else rng.choice(WORDS)
+                    for _ in range(2000))
+    result = benchmark(lambda: loop.run_until_complete(main.apply_terms(text, terms)))
+    assert "اسم" in result
+
+
+@pytest.mark.parametrize("words", [10, 100, 1000])
+def test_calculate_similarity(benchmark, words):
+    rng = random.Random(words)
+    service = TranslationMemoryService()
+    first, second = sentence(rng, words), sentence(rng, words)
+    assert 0 <= benchmark(service._calculate_similarity, first, second) <= 1
+
+
+@pytest.mark.parametrize("size", [1_000, 10_000, 50_000])
+def test_find_similar_translations(benchmark, loop, size):
+    service = filled_service(loop, size)
+    rng = random.Random(1)
+    queries = itertools.cycle(
+        [service.memory_entries[rng.randrange(size)].original_text + " extra" for _ in range(50)]
+    )
+    context = TranslationContext(scene_type="حوار", chapter_number=3)
+    # بناء الفهارس خارج القياس
+    loop.run_until_complete(service.find_similar_translations(next(queries), context, 0.5, limit=10))
+    matches = benchmark(lambda: loop.run_until_complete(
+        service.find_similar_translations(next(queries), context, 0.5, limit=10)
+    ))
+    assert len(matches) <= 10
+
+
+@pytest.mark.parametrize("size", [1_000, 10_000, 50_000])
+def test_add_entry(benchmark, loop, size):
+    service = filled_service(loop, size)
+    rng = random.Random(2)
+    counter = itertools.count()
+
+    def add() -> None:
+        entry = make_entry(rng, next(counter))
+        loop.run_until_complete(service.add_entry(entry))
+
+    benchmark(add)
+
+
+@pytest.mark.parametrize("clients", [1, 1_000, 100_000])
+def test_rate_limiter_is_allowed(benchmark, loop, clients):
+    limiter = RateLimiter(window=900, max_requests=10 ** 9, backend=InMemoryRateLimitBackend())
+    client_ids = [f"10.0.{i // 256}.{i % 256}" for i in range(clients)]
+    for client_id in client_ids:
+        loop.run_until_complete(limiter.is_allowed(client_id))
+    cycle = itertools.cycle(client_ids)
+    assert benchmark(lambda: loop.run_until_complete(limiter.is_allowed(next(cycle))))
+
+
+@pytest.mark.parametrize("source", ["provider", "memory"])
+def test_translate_endpoint(benchmark, monkeypatch, source):
+    """/translate كاملاً عبر ASGI مع مزود محلي (ذاكرة الترجمة أو المزود، دون ذاكرة مؤقتة)"""
+    # حفظ ما يستبدله install حتى يُستعاد بعد القياس
+    for name in ("translate_with_google", "translate_with_openai", "translate_with_openai_stream"):
+        monkeypatch.setattr(main, name, getattr(main, name))
+    monkeypatch.setattr(main, "app", main.create_app(), raising=False)
+    stub_providers.install()
+    service = TranslationMemoryService()
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache(max_size=0))
+    client = TestClient(main.app)
+    text = "The ancient dragon slept beneath the castle."
+    if source == "memory":
+        client.post("/translation-memory/add", json={
+            "original_text": text, "translated_text": "نام التنين", "context": {}, "target_lang": "ar",
+        })
+    payload = {"text": text, "source_lang": "en", "target_lang": "ar"}
+    response = benchmark(client.post, "/translate", json=payload)
+    assert response.status_code == 200
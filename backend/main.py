@@ -9,45 +9,259 @@
 - تحديد معدل الاستخدام
 """
 
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Query, UploadFile, File
+from fastapi.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
-import httpx
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple, AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import asyncio
+import json
+import logging
 import os
+import threading
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
-from langdetect import detect
-from monitoring import init_monitoring
+from monitoring import (
+    init_monitoring, CACHE_HIT_RATIO, PROVIDER_FALLBACKS, PROVIDER_HEDGES, PROVIDER_LATENCY, PROVIDER_REQUESTS,
+    STAGE_LATENCY,
+    TRANSLATION_MEMORY_SIZE, TRANSLATION_SOURCES,
+)
 from security import init_security
 from services.translation_memory_service import TranslationMemoryService
+from services.translation_memory_store import create_store
+from services.memory_io import UNDETERMINED, detect_format, export_entries, iter_entries
+from services.translation_cache import TranslationCache
+from services.batching import SEGMENT_INSTRUCTIONS, join_segments, pack_segments, split_segments
+from services.segmentation import reassemble, split_paragraphs, split_sentences
+from services.translation_engine import DeltaCallback, TranslationEngine
+from services.circuit_breaker import CircuitBreakers
+from services.job_queue import JobQueue
+from services.blocking_pool import BlockingPool
+from services.language_detection import LanguageDetector
+from services.glossary import compile_glossary
+from services.novel_bundle import NovelBundle
 from models.translation_memory import TranslationMemoryEntry, TranslationContext, NovelContext
 
+# الوحدات الثقيلة (httpx، deep_translator، langdetect) تُستورد عند أول استخدام
+# فقط، حتى يتناسب وقت الإقلاع والذاكرة مع المزودين المفعّلين فعلاً
+if TYPE_CHECKING:
+    from services.provider_http import ProviderHTTPClient
+    from services.shared_index import SharedIndexWriter
+
 load_dotenv()
 
-app = FastAPI(title="AI Translator API")
+logger = logging.getLogger(__name__)
 
-# Initialize monitoring and security
-init_monitoring(app)
-init_security(app)
+OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
 
-# CORS configuration
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# المزودون المفعّلون بترتيب الأولوية (قبل قياس زمنهم)؛ المزود غير المفعّل لا تُستورد مكتبته أبداً
+ENABLED_PROVIDERS = [
+    name.strip() for name in os.getenv("TRANSLATION_PROVIDERS", "openai,google").split(",") if name.strip()
+]
+
+class AppServices:
+    """الموارد المشتركة لتطبيق واحد، تُحفظ في app.state.services
+
+    تُنشأ في create_app دون استيراد مكتبات المزودين؛ عميل HTTP ومجمعا الخيوط
+    (للمزودين والكشف، وللتخزين) وذاكرة الترجمة تُنشأ في lifespan (أو عند أول استخدام)، وطابور المهام فقط
+    إذا ضُبط TRANSLATION_JOBS_DB. قواطع الدائرة مستقلة عن عميل HTTP حتى لا
+    يُنشأ العميل لمزود لا يستخدمه (Google).
+    """
+
+    def __init__(self):
+        self.language_detector = LanguageDetector.from_env()
+        self.translation_cache = TranslationCache(
+            max_size=int(os.getenv("TRANSLATION_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("TRANSLATION_CACHE_TTL", "86400")),
+            single_flight=os.getenv("TRANSLATION_CACHE_SINGLE_FLIGHT", "true").lower() == "true",
+        )
+        self.breakers = CircuitBreakers.from_env()
+        self.translation_engine = create_translation_engine()
+        self.provider_http: Optional["ProviderHTTPClient"] = None
+        self.blocking_pool: Optional[BlockingPool] = None
+        self.storage_pool: Optional[BlockingPool] = None
+        self.translation_memory_service: Optional[TranslationMemoryService] = None
+        # فهرس قراءة مشترك بين العمال عبر mmap (يتطلب TRANSLATION_MEMORY_DB)؛ ينشره عامل واحد
+        self.translation_memory_index_dir = os.getenv("TRANSLATION_MEMORY_INDEX_DIR")
+        self.shared_index_writer: Optional["SharedIndexWriter"] = None
+        # طابور مهام ترجمة الروايات الكاملة (SQLite)، معطل إن لم يُحدد ملفه
+        self.jobs_db = os.getenv("TRANSLATION_JOBS_DB")
+        self.job_queue: Optional[JobQueue] = None
+
+    def get_provider_http(self) -> "ProviderHTTPClient":
+        if self.provider_http is None:
+            from services.provider_http import ProviderHTTPClient
+            self.provider_http = ProviderHTTPClient.from_env(self.breakers)
+        return self.provider_http
+
+    def get_blocking_pool(self) -> BlockingPool:
+        if self.blocking_pool is None:
+            self.blocking_pool = BlockingPool.from_env()
+        return self.blocking_pool
+
+    def get_storage_pool(self) -> BlockingPool:
+        if self.storage_pool is None:
+            self.storage_pool = BlockingPool.storage_from_env()
+        return self.storage_pool
+
+    def run_blocking(self, func, *args):
+        """تشغيل استعلام تخزين متزامن (SQLite) في مجمع التخزين المنفصل"""
+        return self.get_storage_pool().run(func, *args)
+
+    def get_translation_memory_service(self) -> TranslationMemoryService:
+        if self.translation_memory_service is None:
+            shared_index = None
+            if self.translation_memory_index_dir:
+                if not os.getenv("TRANSLATION_MEMORY_DB"):
+                    raise ValueError("TRANSLATION_MEMORY_INDEX_DIR requires TRANSLATION_MEMORY_DB")
+                from services.shared_index import SharedIndexReader
+                shared_index = SharedIndexReader(self.translation_memory_index_dir)
+            self.translation_memory_service = TranslationMemoryService(
+                create_store(), shared_index=shared_index, run_blocking=self.run_blocking
+            )
+        return self.translation_memory_service
+
+    def get_job_queue(self) -> Optional[JobQueue]:
+        if self.job_queue is None and self.jobs_db:
+            self.job_queue = JobQueue.from_env(translate_job_segments, TRANSLATE_SEGMENT_CHARS, self.run_blocking)
+        return self.job_queue
+
+    async def start(self) -> None:
+        memory_service = self.get_translation_memory_service()
+        # عميل HTTP (ومعه httpx) يُنشأ مسبقاً فقط إذا كان OpenAI مفعّلاً
+        if "openai" in self.translation_engine.providers:
+            self.get_provider_http()
+        self.get_blocking_pool()
+        self.get_storage_pool()
+        if memory_service.shared_index is not None:
+            from services.shared_index import SharedIndexWriter
+            # كل عامل يشغّل الكاتب، لكن من يحصل على القفل وحده يبني الإصدارات
+            self.shared_index_writer = SharedIndexWriter.from_env(
+                memory_service.shared_index.directory, memory_service.store
+            )
+            self.shared_index_writer.start(self.blocking_pool.run)
+        # المهام التي توقفت مع العملية السابقة تُستأنف من آخر نقطة محفوظة
+        job_queue = self.get_job_queue()
+        if job_queue is not None:
+            job_queue.start()
+
+    async def stop(self) -> None:
+        if self.job_queue is not None:
+            await self.job_queue.stop()
+        if self.shared_index_writer is not None:
+            await self.shared_index_writer.stop()
+            self.shared_index_writer = None
+        if self.provider_http is not None:
+            await self.provider_http.aclose()
+            self.provider_http = None
+        if self.blocking_pool is not None:
+            self.blocking_pool.shutdown()
+            self.blocking_pool = None
+        if self.storage_pool is not None:
+            self.storage_pool.shutdown()
+            self.storage_pool = None
+
+# موارد التطبيق الذي يعالج الطلب الحالي؛ تضبطها ServicesMiddleware وlifespan
+# فتصل إليها دوال المزودين والمهام في الخلفية دون تمريرها في كل استدعاء
+_current_services: ContextVar[AppServices] = ContextVar("current_services")
+
+def current_services() -> AppServices:
+    """موارد التطبيق الحالي
+
+    Raises:
+        RuntimeError: خارج طلب أو lifespan ودون use_services
+    """
+    try:
+        return _current_services.get()
+    except LookupError:
+        raise RuntimeError("No application services are active; use use_services(app.state.services)") from None
+
+@contextmanager
+def use_services(services: AppServices) -> Iterator[AppServices]:
+    """تفعيل موارد تطبيق في السياق الحالي (للاستدعاء خارج الطلبات، كالاختبارات)"""
+    token = _current_services.set(services)
+    try:
+        yield services
+    finally:
+        _current_services.reset(token)
+
+class ServicesMiddleware:
+    """ASGI middleware تفعّل موارد التطبيق لكل طلب ولحدث lifespan"""
+
+    def __init__(self, app: ASGIApp, services: AppServices):
+        self.app = app
+        self.services = services
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        with use_services(self.services):
+            await self.app(scope, receive, send)
+
+def get_provider_http() -> "ProviderHTTPClient":
+    """عميل HTTP المشترك (يُنشأ عند أول استخدام إذا لم يبدأ التطبيق بعد)"""
+    return current_services().get_provider_http()
+
+def get_blocking_pool() -> BlockingPool:
+    """مجمع الخيوط المشترك (يُنشأ عند أول استخدام إذا لم يبدأ التطبيق بعد)"""
+    return current_services().get_blocking_pool()
+
+def get_job_queue() -> JobQueue:
+    """طابور المهام المشترك
+
+    Raises:
+        HTTPException: 503 إذا لم يُضبط TRANSLATION_JOBS_DB
+    """
+    job_queue = current_services().get_job_queue()
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Background jobs are disabled (TRANSLATION_JOBS_DB is not set)")
+    return job_queue
+
+def get_translation_memory_service() -> TranslationMemoryService:
+    """خدمة ذاكرة الترجمة المشتركة (تُنشأ عند أول استخدام إذا لم يبدأ التطبيق بعد)"""
+    return current_services().get_translation_memory_service()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services = app.state.services
+    with use_services(services):
+        await services.start()
+        try:
+            yield
+        finally:
+            await services.stop()
+            await app.state.rate_limiter.aclose()
+
+router = APIRouter()
+
+def create_app() -> FastAPI:
+    """إنشاء تطبيق FastAPI بالمسارات والمراقبة والأمان (CORS وتحديد المعدل)
+
+    الموارد المشتركة تُحفظ في app.state.services (AppServices)، وما يحتاج منها
+    اتصالاً أو ملفات يُنشأ في lifespan عند بدء التطبيق وليس عند استيراد الوحدة.
+    """
+    app = FastAPI(title="AI Translator API", lifespan=lifespan)
+    services = app.state.services = AppServices()
+    init_monitoring(app)
+    init_security(app)
+    app.include_router(router)
+    # تُضاف أخيراً لتكون الخارجية فتسري على كل الطبقات الأخرى
+    app.add_middleware(ServicesMiddleware, services=services)
+
+    # المقاييس تُقرأ عند كل طلب لـ /metrics
+    TRANSLATION_MEMORY_SIZE.set_function(
+        lambda: services.translation_memory_service.entry_count
+        if services.translation_memory_service is not None else 0
+    )
+    CACHE_HIT_RATIO.set_function(lambda: services.translation_cache.stats()["hit_ratio"])
+    return app
 
 # Health check endpoint
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 # Test endpoint
-@app.get("/test")
+@router.get("/test")
 async def test():
     return {"status": "ok", "message": "Test endpoint is working"}
 
@@ -64,79 +278,408 @@ class TranslationRequest(BaseModel):
         source_lang (str, optional): رمز اللغة المصدر (اختياري، يتم الكشف عنه تلقائياً)
         context (str, optional): سياق النص للترجمة الأكثر دقة
         terms (List[Term], optional): قائمة المصطلحات المخصصة للترجمة
-        ai_provider (str, optional): مزود الذكاء الاصطناعي المفضل (google, openai, anthropic)
+        ai_provider (str, optional): مزود الذكاء الاصطناعي المفضل (google, openai)، أو None
+            للمزود الأسرع حسب الزمن المقاس
+        novel_title (str, optional): الرواية التي يُطبق مسردها وأسماء شخصياتها على الترجمة
+            (إن وُجد لها سياق محفوظ) دون إعادة إرسال المصطلحات في كل طلب
     """
     text: str
     target_lang: str
     source_lang: Optional[str] = None
     context: Optional[str] = None
     terms: Optional[List[Term]] = None
-    ai_provider: Optional[str] = "google"
+    ai_provider: Optional[str] = None
+    novel_title: Optional[str] = None
 
 class TranslationResponse(BaseModel):
     translated_text: str
     detected_language: Optional[str]
     confidence: Optional[float]
 
+class BatchTranslationRequest(BaseModel):
+    """نموذج طلب ترجمة دفعة من المقاطع
+
+    Attributes:
+        segments (List[str]): المقاطع (الفقرات) المراد ترجمتها بالترتيب
+        target_lang (str): رمز اللغة الهدف
+        source_lang (str, optional): رمز اللغة المصدر (يُكشف من أول المقاطع إن لم يحدد)
+        terms (List[Term], optional): قائمة المصطلحات المخصصة للترجمة
+        ai_provider (str, optional): مزود الذكاء الاصطناعي المفضل، أو None (افتراضياً)
+            للمزود الأسرع حسب الزمن المقاس
+        max_chars_per_call (int, optional): أقصى عدد أحرف في طلب واحد للمزود (حتى 5000، حد Google)
+        novel_title (str, optional): الرواية التي تُبحث ترجماتها المحفوظة ويُطبق مسردها
+    """
+    segments: List[str]
+    target_lang: str
+    source_lang: Optional[str] = None
+    terms: Optional[List[Term]] = None
+    ai_provider: Optional[str] = None
+    max_chars_per_call: Optional[int] = Field(default=None, gt=0, le=5000)
+    novel_title: Optional[str] = None
+
+class BatchTranslationResponse(BaseModel):
+    translations: List[str]
+    detected_language: Optional[str]
+    memory_hits: int
+    provider_calls: int
+    failed: List[int] = []
+
+class JobChapter(BaseModel):
+    title: Optional[str] = None
+    text: str
+
+class TranslationJobRequest(BaseModel):
+    """نموذج طلب مهمة ترجمة رواية كاملة في الخلفية
+
+    Attributes:
+        chapters (List[JobChapter]): فصول الرواية بالترتيب
+        target_lang (str): رمز اللغة الهدف
+        source_lang (str, optional): رمز اللغة المصدر (يُكشف من الفصل الأول إن لم يحدد)
+        terms (List[Term], optional): قائمة المصطلحات المخصصة للترجمة
+        ai_provider (str, optional): مزود الذكاء الاصطناعي المفضل، أو None (افتراضياً)
+            للمزود الأسرع حسب الزمن المقاس
+        novel_title (str, optional): الرواية التي يُطبق مسردها وأسماء شخصياتها
+    """
+    chapters: List[JobChapter] = Field(min_length=1)
+    target_lang: str
+    source_lang: Optional[str] = None
+    terms: Optional[List[Term]] = None
+    ai_provider: Optional[str] = None
+    novel_title: Optional[str] = None
+
 async def detect_language(text: str) -> str:
+    """كشف لغة النص (عينة محدودة، مصنف حسب الخط الكتابي، وذاكرة مؤقتة)"""
     try:
-        return detect(text)
-    except:
+        services = current_services()
+        return await services.language_detector.detect(text, services.get_blocking_pool().run)
+    except Exception:
         return "en"
 
+# مترجمو Google لكل زوج لغات. GoogleTranslator يعدّل حالته الداخلية أثناء
+# translate، لذا يُعاد استخدام المثيل داخل نفس الخيط فقط.
+_google_translators = threading.local()
+
+# صنف deep_translator.GoogleTranslator، يُستورد عند أول ترجمة عبر Google
+GoogleTranslator = None
+
+def get_google_translator(source_lang: str, target_lang: str) -> "GoogleTranslator":
+    """مثيل GoogleTranslator معاد الاستخدام لزوج اللغات في الخيط الحالي"""
+    global GoogleTranslator
+    translators = getattr(_google_translators, "by_pair", None)
+    if translators is None:
+        translators = _google_translators.by_pair = {}
+    key = (source_lang, target_lang)
+    if key not in translators:
+        if GoogleTranslator is None:
+            from deep_translator import GoogleTranslator
+        translators[key] = GoogleTranslator(source=source_lang, target=target_lang)
+    return translators[key]
+
+def _google_translate(text: str, source_lang: str, target_lang: str) -> str:
+    return get_google_translator(source_lang, target_lang).translate(text)
+
 async def translate_with_google(text: str, source_lang: str, target_lang: str) -> str:
+    breaker = current_services().breakers.get("google")
+    if not breaker.allow():
+        return ""
+    settled = False
     try:
-        translator = GoogleTranslator(source=source_lang, target=target_lang)
-        return translator.translate(text)
-    except:
+        translated_text = await get_blocking_pool().run(_google_translate, text, source_lang, target_lang)
+        settled = True
+        breaker.record_success()
+        return translated_text
+    except Exception as e:
+        settled = True
+        breaker.record_failure()
+        logger.warning("Google translation failed: %s", e)
         return ""
+    finally:
+        # إلغاء الطلب (خسارة التحوط أو انقطاع عميل البث) لا يحكم على صحة المزود،
+        # لكن يجب تحرير الطلب التجريبي وإلا بقي القاطع نصف مفتوح ويرفض كل الطلبات
+        if not settled:
+            breaker.release()
 
-async def translate_with_openai(text: str, source_lang: str, target_lang: str, api_key: str) -> str:
+def openai_messages(text: str, source_lang: str, target_lang: str, instructions: str = "") -> List[Dict]:
+    """رسائل محادثة OpenAI لطلب ترجمة"""
+    return [
+        {
+            "role": "system",
+            "content": f"You are a professional translator. Translate the following text from {source_lang} to {target_lang}. Maintain the original meaning, tone, and formatting. Provide only the translation without any additional text.{instructions}"
+        },
+        {"role": "user", "content": text}
+    ]
+
+async def translate_with_openai(
+    text: str, source_lang: str, target_lang: str, api_key: str, instructions: str = ""
+) -> str:
+    """ترجمة نص عبر OpenAI باستخدام عميل HTTP المشترك
+
+    يعيد نصاً فارغاً عند الفشل أو عندما تكون دائرة المزود مفتوحة حتى يعود
+    المستدعي إلى المزود البديل.
+    """
     try:
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json={
-                    "model": "gpt-3.5-turbo",
-                    "messages": [
-                        {
-                            "role": "system", 
-                            "content": f"You are a professional translator. Translate the following text from {source_lang} to {target_lang}. Maintain the original meaning, tone, and formatting. Provide only the translation without any additional text."
-                        },
-                        {"role": "user", "content": text}
-                    ]
-                }
-            )
+
+        response = await get_provider_http().post(
+            "openai",
+            OPENAI_API_URL,
+            headers=headers,
+            json={
+                "model": "gpt-3.5-turbo",
+                "messages": openai_messages(text, source_lang, target_lang, instructions)
+            }
+        )
 
         if response.status_code == 200:
             return response.json()["choices"][0]["message"]["content"].strip()
+        logger.warning("OpenAI translation failed with status %s", response.status_code)
         return ""
-    except:
+    except Exception as e:
+        logger.warning("OpenAI translation failed: %s", e)
         return ""
 
-async def apply_terms(text: str, terms: list[Term]) -> str:
-    if not terms:
+async def translate_with_openai_stream(
+    text: str, source_lang: str, target_lang: str, api_key: str, instructions: str = ""
+) -> AsyncIterator[str]:
+    """ترجمة نص عبر OpenAI مع بث أجزاء الرد فور وصولها
+
+    لا يُرفع أي استثناء؛ ينتهي البث مبكراً عند الفشل.
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    try:
+        async with get_provider_http().stream(
+            "openai",
+            "POST",
+            OPENAI_API_URL,
+            headers=headers,
+            json={
+                "model": "gpt-3.5-turbo",
+                "stream": True,
+                "messages": openai_messages(text, source_lang, target_lang, instructions)
+            }
+        ) as response:
+            if response.status_code != 200:
+                return
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                delta = json.loads(line[6:])["choices"][0]["delta"].get("content")
+                if delta:
+                    yield delta
+    except Exception as e:
+        logger.warning("OpenAI streaming translation failed: %s", e)
+        return
+
+# سجل المزودين: تُستدعى دوال الترجمة عبر اسمها عند كل طلب (وليس كمرجع ثابت)
+# حتى يمكن استبدالها في الاختبارات. العنصر الثالث (اختياري) دالة البث
+PROVIDERS = {
+    "openai": (
+        lambda text, source_lang, target_lang, instructions: translate_with_openai(
+            text, source_lang, target_lang, "YOUR_OPENAI_API_KEY", instructions
+        ),
+        0.9,
+        lambda text, source_lang, target_lang, instructions: translate_with_openai_stream(
+            text, source_lang, target_lang, "YOUR_OPENAI_API_KEY", instructions
+        ),
+    ),
+    "google": (
+        lambda text, source_lang, target_lang, instructions: translate_with_google(text, source_lang, target_lang),
+        0.7,
+    ),
+}
+
+def create_translation_engine() -> TranslationEngine:
+    """محرك ترجمة بالمزودين المفعّلين في TRANSLATION_PROVIDERS
+
+    Raises:
+        ValueError: إذا ذُكر مزود غير معروف
+    """
+    engine = TranslationEngine.from_env()
+    for provider_name in ENABLED_PROVIDERS:
+        if provider_name not in PROVIDERS:
+            raise ValueError(
+                f"Unknown provider '{provider_name}' in TRANSLATION_PROVIDERS, expected one of {', '.join(PROVIDERS)}"
+            )
+        engine.register(provider_name, *PROVIDERS[provider_name])
+    return engine
+
+def check_provider(ai_provider: Optional[str]) -> None:
+    """رفض المزودين غير المسجلين بدلاً من تجاهلهم
+
+    Raises:
+        HTTPException: 400 إذا لم يكن المزود مسجلاً
+    """
+    providers = current_services().translation_engine.providers
+    if ai_provider is not None and ai_provider not in providers:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provider '{ai_provider}' is not configured, expected one of {', '.join(providers)}",
+        )
+
+async def translate_with_providers(
+    text: str, source_lang: str, target_lang: str, ai_provider: Optional[str], instructions: str = "",
+    on_delta: Optional[DeltaCallback] = None,
+) -> Tuple[str, float]:
+    """ترجمة نص بالمزود المفضل مع الرجوع إلى بقية المزودين عند الفشل أو البطء
+
+    بدون مزود مفضل يُختار الأسرع حسب الزمن المقاس. مع on_delta تُبث أجزاء
+    الترجمة من المزودين الذين يدعمون البث.
+
+    Returns:
+        Tuple[str, float]: النص المترجم (فارغ عند الفشل) ودرجة الثقة
+    """
+    result = await current_services().translation_engine.translate(
+        text, source_lang, target_lang, ai_provider, instructions, on_delta
+    )
+    previous = None
+    for attempt in result.attempts:
+        PROVIDER_REQUESTS.inc(provider=attempt.provider, outcome=attempt.outcome)
+        if attempt.outcome != "cancelled":
+            PROVIDER_LATENCY.observe(attempt.latency, provider=attempt.provider)
+        if attempt.reason == "fallback":
+            PROVIDER_FALLBACKS.inc(from_provider=previous, to_provider=attempt.provider)
+        elif attempt.reason == "hedge":
+            PROVIDER_HEDGES.inc(from_provider=previous, to_provider=attempt.provider)
+        previous = attempt.provider
+    return result.text, result.confidence
+
+async def translate_pack(
+    texts: List[str], source_lang: str, target_lang: str, ai_provider: Optional[str]
+) -> Tuple[List[str], float]:
+    """ترجمة حزمة مقاطع بطلب واحد للمزود
+
+    إذا تعذر تقسيم الرد إلى نفس عدد المقاطع تُترجم المقاطع منفردة.
+
+    Returns:
+        Tuple[List[str], float]: ترجمات المقاطع (فارغة عند الفشل) وأدنى درجة ثقة بينها
+    """
+    if len(texts) == 1:
+        translated_text, confidence = await translate_with_providers(texts[0], source_lang, target_lang, ai_provider)
+        return [translated_text], confidence
+
+    translated_text, confidence = await translate_with_providers(
+        join_segments(texts), source_lang, target_lang, ai_provider, SEGMENT_INSTRUCTIONS
+    )
+    segments = split_segments(translated_text, len(texts)) if translated_text else None
+    if segments is None:
+        results = [await translate_with_providers(text, source_lang, target_lang, ai_provider) for text in texts]
+        segments = [text for text, _ in results]
+        confidence = min(confidence for _, confidence in results)
+    return segments, confidence
+
+async def translate_sentences(
+    texts: List[str], source_lang: str, target_lang: str, ai_provider: Optional[str],
+    novel_title: Optional[str] = None,
+) -> Tuple[List[str], float]:
+    """ترجمة قائمة جمل مستقلة
+
+    يُبحث عن كل جملة في ذاكرة الترجمة (ضمن ترجمات novel_title إن حُدد)، وتُجمع الجمل غير الموجودة (دون تكرار)
+    في حزم لا تتجاوز TRANSLATE_SEGMENT_CHARS حرفاً تُترجم بالتوازي بحد أقصى
+    TRANSLATE_MAX_CONCURRENCY طلباً. الجمل الفارغة تُعاد كما هي.
+
+    Returns:
+        Tuple[List[str], float]: الترجمات بنفس الترتيب (فارغة للجمل التي فشلت) وأدنى درجة ثقة
+    """
+    translations = list(texts)
+    pending: Dict[str, List[int]] = {}
+    for position, text in enumerate(texts):
+        if not text.strip():
+            continue
+        memory_entry = await get_translation_memory_service().find_exact(
+            text, novel_title=novel_title, target_lang=target_lang
+        )
+        if memory_entry is not None:
+            translations[position] = memory_entry.translated_text
+        else:
+            pending.setdefault(text, []).append(position)
+
+    confidence = 1.0
+    unique = list(pending)
+    packs = pack_segments(unique, TRANSLATE_SEGMENT_CHARS)
+    semaphore = asyncio.Semaphore(TRANSLATE_MAX_CONCURRENCY)
+
+    async def translate_bounded(pack: List[int]) -> Tuple[List[str], float]:
+        async with semaphore:
+            return await translate_pack([unique[index] for index in pack], source_lang, target_lang, ai_provider)
+
+    results = await asyncio.gather(*(translate_bounded(pack) for pack in packs))
+    for pack, (translated, pack_confidence) in zip(packs, results):
+        confidence = min(confidence, pack_confidence)
+        for index, translated_text in zip(pack, translated):
+            for position in pending[unique[index]]:
+                translations[position] = translated_text
+    return translations, confidence
+
+async def translate_segmented(
+    text: str, source_lang: str, target_lang: str, ai_provider: Optional[str],
+    novel_title: Optional[str] = None,
+) -> Tuple[str, float]:
+    """ترجمة نص طويل جملةً جملة ثم إعادة تجميعه بمسافاته الأصلية
+
+    Returns:
+        Tuple[str, float]: النص المترجم (فارغ إذا فشلت ترجمة أي جملة) ودرجة الثقة
+    """
+    segments = split_sentences(text, TRANSLATE_SEGMENT_CHARS)
+    translations, confidence = await translate_sentences(
+        [segment.text for segment in segments], source_lang, target_lang, ai_provider, novel_title
+    )
+    if any(segment.text.strip() and not translated for segment, translated in zip(segments, translations)):
+        return "", 0.0
+    return reassemble(segments, translations), confidence
+
+async def apply_terms(text: str, terms: Optional[list[Term]], novel: Optional[NovelBundle] = None) -> str:
+    """استبدال المصطلحات في مرور واحد بمطابق مخزن مؤقتاً لكل مجموعة مصطلحات
+
+    مع novel تُضاف مصطلحات الرواية المترجمة مسبقاً، ولمصطلحات الطلب الأولوية.
+    """
+    term_pairs = tuple((term.original, term.translation) for term in terms or ())
+    if novel is not None:
+        return novel.matcher_with(term_pairs).apply(text)
+    if not term_pairs:
         return text
-    
-    for term in terms:
-        if 'original' in term and 'translation' in term:
-            text = text.replace(term['original'], term['translation'])
-    return text
 
-# إنشاء مثيل من خدمة ذاكرة الترجمة
-translation_memory_service = TranslationMemoryService()
+    return compile_glossary(term_pairs).apply(text)
+
+async def translate_job_segments(texts: List[str], options: Dict) -> List[str]:
+    """دالة الترجمة لطابور المهام: دفعة جمل من فصل بنفس مسار النصوص الطويلة في /translate"""
+    novel = (
+        await get_translation_memory_service().get_novel_bundle(options["novel_title"])
+        if options.get("novel_title") else None
+    )
+    terms = [Term(**term) for term in options.get("terms") or []]
+    translations, _ = await translate_sentences(
+        texts, options["source_lang"], options["target_lang"], options.get("ai_provider"),
+        options.get("novel_title"),
+    )
+    if terms or novel is not None:
+        translations = [
+            await apply_terms(translated_text, terms, novel) if translated_text else translated_text
+            for translated_text in translations
+        ]
+    return translations
+
+# أقصى عدد أحرف في طلب واحد للمزود عند تجميع المقاطع (حد Google هو 5000)
+BATCH_MAX_CHARS = int(os.getenv("BATCH_MAX_CHARS", "4500"))
+# عدد المقاطع الأولى المستخدمة لكشف لغة الدفعة
+BATCH_DETECTION_SEGMENTS = 20
+# أقصى عدد فقرات تُترجم في نفس الوقت في وضع البث
+STREAM_MAX_CONCURRENCY = int(os.getenv("STREAM_MAX_CONCURRENCY", "4"))
+# نصوص /translate الأطول من هذا الحد تُقسم إلى جمل وتُرسل في حزم لا تتجاوزه
+TRANSLATE_SEGMENT_CHARS = int(os.getenv("TRANSLATE_SEGMENT_CHARS", "4500"))
+# أقصى عدد طلبات مزود متزامنة لترجمة نص واحد مقسم
+TRANSLATE_MAX_CONCURRENCY = int(os.getenv("TRANSLATE_MAX_CONCURRENCY", "4"))
 
-@app.get("/")
+@router.get("/")
 async def root():
     return {"message": "Welcome to AI Translator API"}
 
-@app.post("/translate", response_model=TranslationResponse)
+@router.post("/translate", response_model=TranslationResponse)
 async def translate_text(request: TranslationRequest) -> Dict:
     """ترجمة النص مع دعم السياق والمصطلحات المخصصة
 
@@ -153,69 +696,382 @@ async def translate_text(request: TranslationRequest) -> Dict:
     Raises:
         HTTPException: في حالة وجود خطأ في الطلب أو الترجمة
     """
+    check_provider(request.ai_provider)
     try:
-        source_lang = request.source_lang
-        if not source_lang:
+        novel = (
+            await get_translation_memory_service().get_novel_bundle(request.novel_title)
+            if request.novel_title else None
+        )
+        translation_cache = current_services().translation_cache
+        # إصدار ذاكرة الترجمة ونسخة الحزمة يُبطلان النتائج المخزنة عند إضافة
+        # مدخلات أو تحديث مسرد الرواية
+        scope = f"memory@{await get_translation_memory_service().revision()}"
+        if novel is not None:
+            scope += f";{novel.title}@{novel.version}"
+        cache_key = translation_cache.make_key(
+            request.text,
+            request.source_lang,
+            request.target_lang,
+            request.ai_provider,
+            [(term.original, term.translation) for term in request.terms or []],
+            scope=scope,
+        )
+        response, cached = await translation_cache.get_or_compute(cache_key, lambda: _translate(request, novel))
+        if cached:
+            TRANSLATION_SOURCES.inc(source="cache")
+        return response
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _translate(request: TranslationRequest, novel: Optional[NovelBundle] = None) -> TranslationResponse:
+    """تنفيذ الترجمة دون المرور بذاكرة التخزين المؤقت"""
+    source_lang = request.source_lang
+    if not source_lang:
+        with STAGE_LATENCY.time(stage="detection"):
             source_lang = await detect_language(request.text)
 
-        translated_text = ""
-        confidence = 0.0
+    # المسار السريع: ترجمة مطابقة تماماً في ذاكرة الترجمة
+    with STAGE_LATENCY.time(stage="memory_lookup"):
+        memory_entry = await get_translation_memory_service().find_exact(
+            request.text, novel_title=request.novel_title, target_lang=request.target_lang
+        )
+    if memory_entry is not None:
+        translated_text = memory_entry.translated_text
+        confidence = 1.0
+        TRANSLATION_SOURCES.inc(source="memory")
+    else:
+        with STAGE_LATENCY.time(stage="provider"):
+            if len(request.text) > TRANSLATE_SEGMENT_CHARS:
+                translated_text, confidence = await translate_segmented(
+                    request.text, source_lang, request.target_lang, request.ai_provider, request.novel_title
+                )
+            else:
+                translated_text, confidence = await translate_with_providers(
+                    request.text, source_lang, request.target_lang, request.ai_provider
+                )
+        TRANSLATION_SOURCES.inc(source="provider")
 
-        if request.ai_provider == "openai":
-            translated_text = await translate_with_openai(
-                request.text, source_lang, request.target_lang, "YOUR_OPENAI_API_KEY"
-            )
-            confidence = 0.9 if translated_text else 0.0
+    if request.terms or novel is not None:
+        with STAGE_LATENCY.time(stage="terms"):
+            translated_text = await apply_terms(translated_text, request.terms, novel)
+
+    if not translated_text:
+        raise HTTPException(status_code=500, detail="Translation failed")
+
+    return TranslationResponse(
+        translated_text=translated_text,
+        detected_language=source_lang,
+        confidence=confidence
+    )
 
-        if not translated_text:
-            translated_text = await translate_with_google(
-                request.text, source_lang, request.target_lang
+@router.post("/translate/batch", response_model=BatchTranslationResponse)
+async def translate_batch(request: BatchTranslationRequest) -> BatchTranslationResponse:
+    """ترجمة دفعة من المقاطع بأقل عدد من طلبات المزود
+
+    تُخدم المقاطع الموجودة في ذاكرة الترجمة محلياً، وتُدمج المقاطع المكررة،
+    ثم تُجمع البقية في حزم لا تتجاوز max_chars_per_call حرفاً لكل طلب، تُترجم
+    بالتوازي بحد أقصى TRANSLATE_MAX_CONCURRENCY طلباً.
+
+    Returns:
+        BatchTranslationResponse: الترجمات بنفس ترتيب المقاطع، مع فهارس
+            المقاطع التي فشلت ترجمتها في failed
+    """
+    check_provider(request.ai_provider)
+    try:
+        segments = request.segments
+        source_lang = request.source_lang
+        if not source_lang:
+            source_lang = await detect_language("\n".join(segments[:BATCH_DETECTION_SEGMENTS]))
+        novel = (
+            await get_translation_memory_service().get_novel_bundle(request.novel_title)
+            if request.novel_title else None
+        )
+
+        translations = list(segments)
+        pending: Dict[str, List[int]] = {}
+        memory_hits = 0
+        for position, segment in enumerate(segments):
+            if not segment.strip():
+                continue
+            memory_entry = await get_translation_memory_service().find_exact(
+                segment, novel_title=request.novel_title, target_lang=request.target_lang
             )
-            confidence = 0.7 if translated_text else 0.0
+            if memory_entry is not None:
+                translations[position] = memory_entry.translated_text
+                memory_hits += 1
+            else:
+                pending.setdefault(segment, []).append(position)
+
+        texts = list(pending)
+        packs = pack_segments(texts, request.max_chars_per_call or BATCH_MAX_CHARS)
+        semaphore = asyncio.Semaphore(TRANSLATE_MAX_CONCURRENCY)
+
+        async def translate_bounded(pack: List[int]) -> Tuple[List[str], float]:
+            async with semaphore:
+                return await translate_pack(
+                    [texts[index] for index in pack], source_lang, request.target_lang, request.ai_provider
+                )
 
-        if request.terms:
-            translated_text = await apply_terms(translated_text, request.terms)
+        results = await asyncio.gather(*(translate_bounded(pack) for pack in packs))
 
-        if not translated_text:
-            raise HTTPException(status_code=500, detail="Translation failed")
+        failed = []
+        for pack, (translated, _) in zip(packs, results):
+            for index, translated_text in zip(pack, translated):
+                if (request.terms or novel is not None) and translated_text:
+                    translated_text = await apply_terms(translated_text, request.terms, novel)
+                for position in pending[texts[index]]:
+                    translations[position] = translated_text
+                    if not translated_text:
+                        failed.append(position)
 
-        return TranslationResponse(
-            translated_text=translated_text,
+        return BatchTranslationResponse(
+            translations=translations,
             detected_language=source_lang,
-            confidence=confidence
+            memory_hits=memory_hits,
+            provider_calls=len(packs),
+            failed=sorted(failed),
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/translation-memory/add")
+def sse_event(event: str, data: Dict) -> str:
+    """تنسيق حدث Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/translate/stream")
+async def translate_stream(request: TranslationRequest) -> StreamingResponse:
+    """ترجمة نص طويل فقرةً فقرة مع بث النتائج عبر Server-Sent Events
+
+    تُترجم الفقرات بالتوازي (بحد أقصى STREAM_MAX_CONCURRENCY) ويُرسل كل منها
+    فور جاهزيته، لذا قد تصل الفقرات بغير ترتيبها. الأحداث:
+        - start: عدد الفقرات واللغة المكتشفة
+        - delta: جزء من ترجمة فقرة من مزود يدعم البث (index, delta)
+        - segment: الترجمة النهائية لفقرة (index, translated_text, separator, leading, failed)
+        - done: انتهاء كل الفقرات
+
+    تمر كل فقرة بمحرك الترجمة (التوجيه والتحوط والرجوع إلى مزود آخر)، ويُطبق
+    عليها مسرد الرواية novel_title والمصطلحات. حدث segment هو المرجع النهائي
+    للفقرة حتى لو سبقته أحداث delta (الأجزاء قبل تطبيق المصطلحات)، ويُعاد
+    تجميع النص بترتيب index مع leading قبل الترجمة وseparator بعدها.
+    """
+    check_provider(request.ai_provider)
+    source_lang = request.source_lang
+    if not source_lang:
+        source_lang = await detect_language(request.text)
+    novel = (
+        await get_translation_memory_service().get_novel_bundle(request.novel_title)
+        if request.novel_title else None
+    )
+    segments = split_paragraphs(request.text)
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(STREAM_MAX_CONCURRENCY)
+
+    async def translate_segment(index: int, segment) -> None:
+        translated_text = ""
+        try:
+            async with semaphore:
+                if segment.text.strip():
+                    memory_entry = await get_translation_memory_service().find_exact(
+                        segment.text, novel_title=request.novel_title, target_lang=request.target_lang
+                    )
+                    if memory_entry is not None:
+                        translated_text = memory_entry.translated_text
+                    else:
+                        async def on_delta(delta: str) -> None:
+                            await queue.put((False, sse_event("delta", {"index": index, "delta": delta})))
+
+                        translated_text, _ = await translate_with_providers(
+                            segment.text, source_lang, request.target_lang, request.ai_provider, on_delta=on_delta
+                        )
+                    if translated_text and (request.terms or novel is not None):
+                        translated_text = await apply_terms(translated_text, request.terms, novel)
+        except Exception:
+            translated_text = ""
+        finally:
+            await queue.put((True, sse_event("segment", {
+                "index": index,
+                "translated_text": translated_text,
+                "separator": segment.separator,
+                "leading": segment.leading,
+                "failed": bool(segment.text.strip()) and not translated_text,
+            })))
+
+    async def events() -> AsyncIterator[str]:
+        yield sse_event("start", {"segments": len(segments), "detected_language": source_lang})
+        tasks = [asyncio.create_task(translate_segment(index, segment)) for index, segment in enumerate(segments)]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                final, event = await queue.get()
+                remaining -= final
+                yield event
+            yield sse_event("done", {"segments": len(segments)})
+        finally:
+            # عند انقطاع اتصال العميل لا داعي لإكمال بقية الفقرات
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/translate/cache/stats")
+async def translation_cache_stats():
+    """عدادات الإصابة والإخفاق لذاكرة التخزين المؤقت للترجمات"""
+    return current_services().translation_cache.stats()
+
+@router.get("/translate/providers")
+async def translation_provider_stats():
+    """الزمن المقاس ونسبة النجاح لكل مزود وترتيب التوجيه الحالي"""
+    translation_engine = current_services().translation_engine
+    return {
+        "hedge_delay": translation_engine.hedge_delay,
+        "routing": translation_engine.route(),
+        "providers": {name: stats.as_dict() for name, stats in translation_engine.stats.items()},
+    }
+
+@router.post("/jobs", status_code=202)
+async def submit_translation_job(request: TranslationJobRequest):
+    """إرسال رواية كاملة للترجمة في الخلفية
+
+    تُقسم الفصول إلى جمل وتُحفظ في الطابور فوراً؛ يُتابع التقدم عبر
+    /jobs/{job_id} وتُقرأ الترجمة عبر /jobs/{job_id}/result عند الانتهاء.
+    """
+    check_provider(request.ai_provider)
+    source_lang = request.source_lang or await detect_language(request.chapters[0].text)
+    options = request.model_dump(exclude={"chapters"})
+    options["source_lang"] = source_lang
+    queue = get_job_queue()
+    job_id = await queue.run(queue.submit, [(chapter.title, chapter.text) for chapter in request.chapters], options)
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/jobs/{job_id}")
+async def get_translation_job(job_id: str):
+    """حالة المهمة وتقدمها (الجمل والفصول والكلمات المنجزة، والجمل في الثانية)"""
+    queue = get_job_queue()
+    status = await queue.run(queue.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@router.get("/jobs/{job_id}/result")
+async def get_translation_job_result(job_id: str):
+    """الفصول المترجمة لمهمة مكتملة"""
+    queue = get_job_queue()
+    status = await queue.run(queue.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    return {"job_id": job_id, "chapters": await queue.run(queue.result, job_id)}
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_translation_job(job_id: str):
+    """إلغاء مهمة؛ تُحفظ الجمل المترجمة حتى الآن ويمكن استئنافها لاحقاً"""
+    queue = get_job_queue()
+    status = await queue.run(queue.cancel, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": status}
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_translation_job(job_id: str):
+    """إعادة مهمة فاشلة أو ملغاة إلى الطابور لترجمة الجمل المتبقية فقط"""
+    queue = get_job_queue()
+    status = await queue.run(queue.resume, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status != "queued":
+        raise HTTPException(status_code=409, detail=f"Job is {status}")
+    return {"job_id": job_id, "status": status}
+
+@router.post("/translation-memory/add")
 async def add_translation_memory(entry: TranslationMemoryEntry):
     """إضافة مدخل جديد إلى ذاكرة الترجمة"""
-    await translation_memory_service.add_entry(entry)
+    await get_translation_memory_service().add_entry(entry)
     return {"status": "success"}
 
-@app.post("/translation-memory/find-similar")
+@router.post("/translation-memory/find-similar")
 async def find_similar_translations(
     text: str,
     context: Optional[TranslationContext] = None,
-    threshold: float = 0.8
+    threshold: float = 0.8,
+    novel_title: Optional[str] = None,
+    target_lang: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """البحث عن ترجمات مشابهة (أفضل النتائج فقط، مقسمة إلى صفحات)"""
+    matches = await get_translation_memory_service().find_similar_translations(
+        text, context, threshold, novel_title, target_lang, limit=offset + limit
+    )
+    similar = await get_translation_memory_service().get_matched_entries(matches[offset:])
+    return {"translations": similar, "offset": offset, "limit": limit}
+
+@router.post("/translation-memory/import")
+async def import_translation_memory(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(jsonl|tmx)$"),
+    target_lang: Optional[str] = None,
+    batch_size: int = Query(1000, ge=1, le=10000)
+):
+    """استيراد ملف TMX أو JSONL إلى ذاكرة الترجمة على دفعات
+
+    يُقرأ الملف تدريجياً ويُحلل في مجمع الخيوط حتى لا يوقف حلقة الأحداث. عند
+    خطأ في الملف تبقى الدفعات التي سبقته مستوردة.
+    """
+    try:
+        file_format = format or detect_format(file.filename or "")
+        report = await get_translation_memory_service().import_entries(
+            iter_entries(file.file, file_format, target_lang), batch_size=batch_size,
+            read_blocking=get_blocking_pool().run,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info("Imported %s new and %s existing memory entries (%.0f entries/s)",
+                report.created, report.updated, report.entries_per_second)
+    return {
+        "created": report.created,
+        "updated": report.updated,
+        "seconds": report.seconds,
+        "entries_per_second": report.entries_per_second,
+    }
+
+@router.get("/translation-memory/export")
+async def export_translation_memory(
+    format: str = Query("jsonl", pattern="^(jsonl|tmx)$"),
+    source_lang: str = UNDETERMINED
 ):
-    """البحث عن ترجمات مشابهة"""
-    similar = await translation_memory_service.find_similar_translations(text, context, threshold)
-    return {"translations": similar}
+    """تصدير ذاكرة الترجمة كاملة بصيغة JSONL أو TMX (ببث الرد)"""
+    media_types = {"jsonl": "application/x-ndjson", "tmx": "application/x-tmx+xml"}
+    return StreamingResponse(
+        export_entries(get_translation_memory_service().memory_entries, format, source_lang),
+        media_type=media_types[format],
+        headers={"Content-Disposition": f'attachment; filename="translation-memory.{format}"'},
+    )
 
-@app.post("/novel-context/add")
+@router.post("/novel-context/add")
 async def add_novel_context(novel_title: str, context: NovelContext):
     """إضافة سياق جديد لرواية"""
-    await translation_memory_service.add_novel_context(novel_title, context)
+    await get_translation_memory_service().add_novel_context(novel_title, context)
     return {"status": "success"}
 
-@app.get("/novel-context/characters/{novel_title}")
+@router.get("/novel-context/characters/{novel_title}")
 async def get_novel_characters(novel_title: str):
-    """الحصول على قائمة الشخصيات في رواية معينة"""
-    characters = await translation_memory_service.get_character_translations(novel_title)
-    return {"characters": characters}
+    """الحصول على قائمة الشخصيات في رواية معينة (رد مسلسل مسبقاً لكل رواية)"""
+    bundle = await get_translation_memory_service().get_novel_bundle(novel_title)
+    if bundle is None:
+        return {"characters": []}
+    return Response(content=bundle.characters_json, media_type="application/json")
+
+def __getattr__(name: str):
+    # main.app (ومعه "uvicorn main:app") يبني التطبيق عند أول وصول وليس عند الاستيراد
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
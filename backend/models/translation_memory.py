@@ -30,6 +30,7 @@ class TranslationMemoryEntry(BaseModel):
     characters: List[Character] = []
     tags: List[str] = []
     novel_title: Optional[str] = None
+    target_lang: Optional[str] = None
     chapter_id: Optional[str] = None
     confidence_score: float = 1.0
 
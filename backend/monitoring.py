@@ -1,11 +1,208 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for every label combination"""
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type_name}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels"""
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time"""
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is None:
+            return []
+        try:
+            value = self._function()
+        except Exception:
+            logging.getLogger(__name__).exception("Failed to collect gauge %s", self.name)
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    """Histogram with fixed buckets; observe() is a bisect and three additions"""
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        return "".join(metric.render() for metric in self.metrics)
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint",
+    ["method", "endpoint", "status"],
+))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "translation_stage_duration_seconds", "Time spent in each stage of /translate", ["stage"],
+))
+PROVIDER_REQUESTS = REGISTRY.register(Counter(
+    "translation_provider_requests_total", "Provider calls by outcome", ["provider", "outcome"],
+))
+PROVIDER_FALLBACKS = REGISTRY.register(Counter(
+    "translation_provider_fallbacks_total", "Fallbacks from one provider to another",
+    ["from_provider", "to_provider"],
+))
+PROVIDER_HEDGES = REGISTRY.register(Counter(
+    "translation_provider_hedges_total", "Hedged requests sent to a second provider after the hedge delay",
+    ["from_provider", "to_provider"],
+))
+PROVIDER_LATENCY = REGISTRY.register(Histogram(
+    "translation_provider_duration_seconds", "Provider call latency (completed calls only)", ["provider"],
+))
+TRANSLATION_SOURCES = REGISTRY.register(Counter(
+    "translation_results_total", "Where /translate results came from (cache, memory, provider)", ["source"],
+))
+TRANSLATION_MEMORY_SIZE = REGISTRY.register(Gauge(
+    "translation_memory_entries", "Number of entries in translation memory",
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "translation_cache_hit_ratio", "Hit ratio of the server-side translation cache",
+))
 
 def init_monitoring(app: FastAPI):
-    """Initialize basic local monitoring and logging"""
+    """Initialize basic local monitoring, logging and the /metrics endpoint"""
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     logger = logging.getLogger(__name__)
+
+    @app.middleware("http")
+    async def request_latency_middleware(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Use the route template so path parameters don't explode label cardinality
+            route = request.scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                endpoint=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
     logger.info("Local monitoring initialized")
@@ -1,30 +1,97 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from jose import JWTError, jwt
+from fastapi.responses import JSONResponse
 import os
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime
+from typing import Dict
+
+class InMemoryRateLimitBackend:
+    """Per-process sliding-window counters.
+
+    Each client keeps only (window index, current count, previous count).
+    Clients idle for two full windows are evicted by a sweep that runs at
+    most once per window.
+    """
+
+    def __init__(self):
+        self.clients: Dict[str, list] = {}
+        self._last_sweep = 0
+
+    async def acquire(self, client_id: str, window: int, max_requests: int, now: float) -> bool:
+        index = int(now // window)
+        if index - self._last_sweep >= 1:
+            self._sweep(index)
+
+        state = self.clients.get(client_id)
+        if state is None:
+            state = self.clients[client_id] = [index, 0, 0]
+        elif state[0] != index:
+            state[2] = state[1] if state[0] == index - 1 else 0
+            state[1] = 0
+            state[0] = index
+
+        if sliding_count(state[2], state[1], window, now) >= max_requests:
+            return False
+        state[1] += 1
+        return True
+
+    def _sweep(self, index: int) -> None:
+        self.clients = {client_id: state for client_id, state in self.clients.items()
+                        if state[0] >= index - 1}
+        self._last_sweep = index
+
+    async def aclose(self) -> None:
+        pass
+
+class RedisRateLimitBackend:
+    """Sliding-window counters shared by all workers through Redis.
+
+    Works with any asyncio client exposing redis.asyncio's ``pipeline``
+    (``incr``, ``expire``, ``get``), ``decr`` and ``aclose``. The increment
+    and its TTL go in one MULTI transaction, so a key never outlives two
+    windows, and an allowed request costs a single round trip.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def acquire(self, client_id: str, window: int, max_requests: int, now: float) -> bool:
+        index = int(now // window)
+        current_key = f"{self.prefix}{client_id}:{index}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, 2 * window)
+            pipe.get(f"{self.prefix}{client_id}:{index - 1}")
+            current, _, previous = await pipe.execute()
+
+        # current already includes this request
+        if sliding_count(int(previous or 0), current - 1, window, now) >= max_requests:
+            await self.client.decr(current_key)
+            return False
+        return True
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+def sliding_count(previous: int, current: int, window: int, now: float) -> float:
+    """Requests in the last `window` seconds, weighting the previous window
+    by how much of it still overlaps the sliding window."""
+    elapsed = now % window
+    return previous * (1 - elapsed / window) + current
 
 class RateLimiter:
-    def __init__(self, window: int = 900, max_requests: int = 100):
+    def __init__(self, window: int = 900, max_requests: int = 100, backend=None):
         self.window = window
         self.max_requests = max_requests
-        self.requests = {}
+        self.backend = backend if backend is not None else InMemoryRateLimitBackend()
 
-    def is_allowed(self, client_id: str) -> bool:
+    async def is_allowed(self, client_id: str) -> bool:
         now = datetime.now().timestamp()
-        if client_id not in self.requests:
-            self.requests[client_id] = []
-        
-        # Clean old requests
-        self.requests[client_id] = [ts for ts in self.requests[client_id] 
-                                  if now - ts < self.window]
-        
-        if len(self.requests[client_id]) >= self.max_requests:
-            return False
-        
-        self.requests[client_id].append(now)
-        return True
+        return await self.backend.acquire(client_id, self.window, self.max_requests, now)
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
 
 def parse_time_window(time_str: str) -> int:
     """Convert time string (e.g., '15m', '1h') to seconds"""
@@ -44,12 +111,29 @@ def parse_time_window(time_str: str) -> int:
     else:
         return int(time_str)  # fallback to direct conversion
 
-rate_limiter = RateLimiter(
-    window=parse_time_window(os.getenv("RATE_LIMIT_WINDOW", "900")),
-    max_requests=int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "100"))
-)
+def create_rate_limit_backend():
+    """Redis backend when RATE_LIMIT_REDIS_URL is set, otherwise in-process
+
+    Redis is optional (``pip install redis``); it is only imported here.
+    """
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if not redis_url:
+        return InMemoryRateLimitBackend()
+    import redis.asyncio
+    return RedisRateLimitBackend(redis.asyncio.Redis.from_url(redis_url))
+
+def create_rate_limiter() -> RateLimiter:
+    """Limiter configured from RATE_LIMIT_*"""
+    return RateLimiter(
+        window=parse_time_window(os.getenv("RATE_LIMIT_WINDOW", "900")),
+        max_requests=int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "100")),
+        backend=create_rate_limit_backend()
+    )
 
 def init_security(app: FastAPI):
+    # One limiter per app, kept on app.state; bad RATE_LIMIT_* settings fail when the app is built
+    app.state.rate_limiter = create_rate_limiter()
+
     # CORS configuration
     origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
     app.add_middleware(
@@ -64,8 +148,9 @@ def init_security(app: FastAPI):
     @app.middleware("http")
     async def rate_limiting_middleware(request: Request, call_next):
         client_id = request.client.host
-        if not rate_limiter.is_allowed(client_id):
-            raise HTTPException(status_code=429, detail="Too many requests")
+        if not await request.app.state.rate_limiter.is_allowed(client_id):
+            # Exceptions raised in middleware bypass FastAPI's handlers, so respond directly
+            return JSONResponse(status_code=429, content={"error": "Too many requests"})
         return await call_next(request)
 
     # Security headers middleware
@@ -0,0 +1,61 @@
+"""
+تجميع المقاطع في أقل عدد من طلبات المزود
+
+تُرقم المقاطع بعلامات [[n]] في سطر مستقل قبل كل مقطع، ثم يُقسم الرد على
+نفس العلامات. إذا فُقدت علامة أو تكررت يعتبر التقسيم فاشلاً ويعود المستدعي
+إلى ترجمة المقاطع منفردة.
+"""
+import re
+from typing import List, Optional
+
+SEGMENT_MARKER = "[[{}]]"
+_MARKER_PATTERN = re.compile(r"\[\[(\d+)\]\]")
+
+# تعليمات إضافية لنماذج المحادثة للحفاظ على العلامات
+SEGMENT_INSTRUCTIONS = (
+    " The text consists of numbered segments, each preceded by a marker line such as [[1]]."
+    " Translate every segment separately and keep every marker line exactly as it is, in the same order."
+)
+
+
+def _marker_size(index: int) -> int:
+    return len(SEGMENT_MARKER.format(index)) + 2
+
+
+def pack_segments(texts: List[str], max_chars: int) -> List[List[int]]:
+    """تجميع فهارس المقاطع في حزم لا يتجاوز طولها المجمع max_chars
+
+    يُحسب طول العلامات والفواصل ضمن الميزانية. المقطع الذي يتجاوز الميزانية
+    وحده يوضع في حزمة مستقلة.
+    """
+    packs: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    for index, text in enumerate(texts):
+        cost = len(text) + _marker_size(len(current) + 1)
+        if current and size + cost > max_chars:
+            packs.append(current)
+            current, size = [], 0
+            cost = len(text) + _marker_size(1)
+        current.append(index)
+        size += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def join_segments(texts: List[str]) -> str:
+    """دمج المقاطع في نص واحد مع علامات الترقيم"""
+    return "\n".join(f"{SEGMENT_MARKER.format(number)}\n{text}" for number, text in enumerate(texts, 1))
+
+
+def split_segments(text: str, count: int) -> Optional[List[str]]:
+    """تقسيم الرد المترجم إلى count مقطعاً حسب العلامات، أو None عند الفشل"""
+    parts = _MARKER_PATTERN.split(text)
+    # parts = [ما قبل العلامة الأولى، رقم، نص، رقم، نص، ...]
+    if parts[0].strip():
+        return None
+    numbers = [int(number) for number in parts[1::2]]
+    if numbers != list(range(1, count + 1)):
+        return None
+    return [segment.strip() for segment in parts[2::2]]
@@ -0,0 +1,48 @@
+"""
+تشغيل الاستدعاءات المتزامنة (المعطِّلة) خارج حلقة الأحداث
+
+مكتبات مثل deep_translator وlangdetect متزامنة، واستدعاؤها مباشرة داخل دالة
+async يوقف حلقة أحداث uvicorn بالكامل حتى تنتهي. هذا المجمع يشغلها في عدد
+محدود من الخيوط فتبقى الحلقة حرة لخدمة بقية الطلبات.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class BlockingPool:
+    """مجمع خيوط محدود لتشغيل الاستدعاءات المتزامنة
+
+    Attributes:
+        max_workers (int): أقصى عدد استدعاءات تعمل في نفس الوقت؛ الباقي ينتظر دوره
+    """
+
+    def __init__(self, max_workers: int = 16, name: str = "blocking"):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    @classmethod
+    def from_env(cls) -> "BlockingPool":
+        """إنشاء المجمع بحجم BLOCKING_POOL_SIZE"""
+        return cls(max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "16")))
+
+    @classmethod
+    def storage_from_env(cls) -> "BlockingPool":
+        """مجمع منفصل لاستعلامات التخزين (SQLite) بحجم STORAGE_POOL_SIZE
+
+        حتى لا تنتظر قراءات ذاكرة الترجمة وطابور المهام خلف استدعاءات مزود
+        بطيئة تشغل كل خيوط المجمع الرئيسي.
+        """
+        return cls(max_workers=int(os.getenv("STORAGE_POOL_SIZE", "4")), name="storage")
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """تشغيل func في أحد خيوط المجمع وانتظار نتيجتها دون إيقاف الحلقة"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
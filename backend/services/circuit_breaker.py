@@ -0,0 +1,95 @@
+"""
+قواطع الدائرة لمزودي الترجمة
+
+قاطع لكل مزود يتخطى المزود المتعطل مباشرة حتى يعود المستدعي إلى المزود
+البديل. السجل مستقل عن عميل HTTP لأن بعض المزودين (Google عبر deep_translator)
+لا يمرون به، فلا يُنشأ العميل (ولا تُستورد httpx) لمجرد قراءة حالة قاطع.
+"""
+import os
+import time
+from typing import Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """المزود معطل مؤقتاً ولم يُرسل الطلب"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit open for provider '{provider}'")
+        self.provider = provider
+
+
+class CircuitBreaker:
+    """قاطع دائرة بثلاث حالات: closed وopen وhalf_open
+
+    يُفتح بعد failure_threshold إخفاقات متتالية، ويسمح بعد reset_timeout ثانية
+    بطلب تجريبي واحد: نجاحه يغلق القاطع وإخفاقه يعيد فتحه.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """هل يُسمح بإرسال طلب الآن"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """إلغاء الطلب التجريبي دون نتيجة (مثلاً عند إلغاء الطلب)"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+
+
+class CircuitBreakers:
+    """سجل قواطع الدائرة لكل مزود بنفس الإعدادات"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakers":
+        """إنشاء السجل من متغيرات البيئة CIRCUIT_*"""
+        return cls(
+            failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30")),
+        )
+
+    def get(self, provider: str) -> CircuitBreaker:
+        """قاطع الدائرة الخاص بمزود (يُنشأ عند أول استخدام)"""
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[provider]
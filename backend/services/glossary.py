@@ -0,0 +1,61 @@
+"""
+استبدال مصطلحات المسرد في مرور واحد
+
+تُبنى من المصطلحات شجرة بادئات (trie) تُحوَّل إلى تعبير نمطي واحد، فيُمسح
+النص مرة واحدة بدلاً من استدعاء str.replace لكل مصطلح. عند تداخل المصطلحات
+يُختار الأطول بدءاً من أقصى اليسار، ولا يُعاد استبدال نص سبق استبداله.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+# علامة نهاية المصطلح في عقد الشجرة
+_END = ""
+
+
+def _trie_pattern(node: Dict) -> str:
+    """تحويل عقدة الشجرة إلى تعبير نمطي يفضل المطابقة الأطول"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != _END]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if _END in node:
+        # المصطلح ينتهي هنا: الامتداد اختياري، والتكرار الجشع يجرب الأطول أولاً
+        return "(?:" + pattern + ")?"
+    return pattern
+
+
+class GlossaryMatcher:
+    """مطابق مصطلحات مترجم مسبقاً
+
+    Attributes:
+        terms (Dict[str, str]): المصطلح الأصلي -> ترجمته
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, str]]):
+        self.terms: Dict[str, str] = {}
+        for original, translation in terms:
+            # عند التكرار يبقى أول مصطلح كما في الاستبدال المتتالي السابق
+            if original and original not in self.terms:
+                self.terms[original] = translation
+
+        trie: Dict = {}
+        for original in self.terms:
+            node = trie
+            for char in original:
+                node = node.setdefault(char, {})
+            node[_END] = True
+        self._pattern = re.compile(_trie_pattern(trie)) if self.terms else None
+
+    def apply(self, text: str) -> str:
+        """استبدال كل المصطلحات في النص في مرور واحد"""
+        if self._pattern is None or not text:
+            return text
+        terms = self.terms
+        return self._pattern.sub(lambda match: terms[match.group()], text)
+
+
+@lru_cache(maxsize=128)
+def compile_glossary(terms: Tuple[Tuple[str, str], ...]) -> GlossaryMatcher:
+    """مطابق مخزن مؤقتاً لكل مجموعة مصطلحات (نسخة المسرد)"""
+    return GlossaryMatcher(terms)
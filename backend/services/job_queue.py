@@ -0,0 +1,443 @@
+"""
+طابور مهام دائم لترجمة روايات كاملة في الخلفية
+
+تُقسم فصول المهمة إلى جمل عند الإرسال وتُحفظ في SQLite، ثم يأخذ العمال
+المهام من الطابور ويترجمون الجمل المتبقية على دفعات. تُحفظ ترجمة كل دفعة
+فور انتهائها (نقطة استئناف)، فإذا توقفت العملية تستأنف المهمة من أول جملة
+لم تُترجم بدلاً من البداية.
+
+يحجز العامل المهمة بعقد إيجار (lease) يُجدد دورياً أثناء ترجمة كل دفعة ومع
+حفظها؛ المهمة الجارية التي انتهى عقدها (توقف عاملها) يأخذها أي عامل آخر،
+حتى في عملية أخرى تتشارك نفس ملف قاعدة البيانات.
+
+الحالات: queued -> running -> completed | failed | cancelled
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services.segmentation import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# (ترجمات الجمل بالترتيب، خيارات المهمة) -> الترجمات ("" للجملة التي فشلت)
+TranslateFunc = Callable[[List[str], Dict], Awaitable[List[str]]]
+
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    error TEXT,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    active_seconds REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_chapters (
+    job_id TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    title TEXT,
+    PRIMARY KEY (job_id, chapter)
+);
+CREATE TABLE IF NOT EXISTS job_segments (
+    job_id TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    separator TEXT NOT NULL,
+    leading TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    translation TEXT,
+    PRIMARY KEY (job_id, chapter, position)
+);
+"""
+
+
+class JobQueue:
+    """طابور المهام ومجمع العمال
+
+    Attributes:
+        concurrency (int): عدد المهام التي تُترجم في نفس الوقت
+        chunk_size (int): عدد الجمل في كل دفعة (وبين كل نقطتي استئناف)
+        lease_seconds (float): مدة حجز المهمة دون تجديد قبل أن يأخذها عامل آخر؛
+            يُجدد العقد كل ثلث هذه المدة ما دامت الدفعة تُترجم
+    """
+
+    def __init__(
+        self,
+        path: str,
+        translate: TranslateFunc,
+        concurrency: int = 2,
+        chunk_size: int = 50,
+        max_segment_chars: Optional[int] = None,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        clock: Callable[[], float] = time.time,
+        run_blocking: Optional[Callable[..., Awaitable]] = None,
+    ):
+        self.path = path
+        self.translate = translate
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.max_segment_chars = max_segment_chars
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._clock = clock
+        # تشغيل استعلامات SQLite خارج حلقة الأحداث (مثل BlockingPool.run)
+        self.run_blocking = run_blocking
+        self._owner = uuid.uuid4().hex
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(
+        cls,
+        translate: TranslateFunc,
+        max_segment_chars: Optional[int] = None,
+        run_blocking: Optional[Callable[..., Awaitable]] = None,
+    ) -> "JobQueue":
+        """إنشاء الطابور من TRANSLATION_JOBS_DB (مطلوب) ومتغيرات JOB_*"""
+        return cls(
+            os.environ["TRANSLATION_JOBS_DB"],
+            translate,
+            concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
+            chunk_size=int(os.getenv("JOB_CHUNK_SEGMENTS", "50")),
+            max_segment_chars=max_segment_chars,
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+            run_blocking=run_blocking,
+        )
+
+    async def run(self, func: Callable, *args: Any):
+        """تنفيذ عملية متزامنة على قاعدة البيانات خارج حلقة الأحداث إن أمكن"""
+        if self.run_blocking is None:
+            return func(*args)
+        return await self.run_blocking(func, *args)
+
+    def _transaction(self, statements: Callable[[sqlite3.Connection], object]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _query(self, sql: str, parameters: Sequence = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
+
+    def submit(self, chapters: Sequence[Tuple[Optional[str], str]], options: Dict) -> str:
+        """إضافة مهمة إلى الطابور
+
+        Args:
+            chapters: (عنوان الفصل، نصه) بالترتيب
+            options (dict): خيارات تُمرر إلى دالة الترجمة (اللغات، المزود، المصطلحات...)
+
+        Returns:
+            str: معرف المهمة
+        """
+        job_id = uuid.uuid4().hex
+        rows = []
+        for chapter, (_, text) in enumerate(chapters):
+            for position, segment in enumerate(split_sentences(text, self.max_segment_chars)):
+                # الجمل الفارغة لا تحتاج ترجمة
+                blank = not segment.text.strip()
+                rows.append((
+                    job_id, chapter, position, segment.text, segment.separator, segment.leading,
+                    len(segment.text.split()), segment.text if blank else None,
+                ))
+
+        def insert(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO jobs (id, status, options, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(options, ensure_ascii=False), self._clock()),
+            )
+            conn.executemany(
+                "INSERT INTO job_chapters (job_id, chapter, title) VALUES (?, ?, ?)",
+                [(job_id, chapter, title) for chapter, (title, _) in enumerate(chapters)],
+            )
+            conn.executemany("INSERT INTO job_segments VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        self._transaction(insert)
+        self._wake()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """حالة المهمة وتقدمها، أو None إذا لم توجد"""
+        rows = self._query(
+            "SELECT status, error, created_at, started_at, finished_at, active_seconds FROM jobs WHERE id = ?",
+            (job_id,),
+        )
+        if not rows:
+            return None
+        status, error, created_at, started_at, finished_at, active_seconds = rows[0]
+        chapters = self._query(
+            """
+            SELECT chapter, COUNT(*), COUNT(translation), SUM(words),
+                   SUM(CASE WHEN translation IS NOT NULL THEN words ELSE 0 END)
+            FROM job_segments WHERE job_id = ? GROUP BY chapter
+            """,
+            (job_id,),
+        )
+        total = sum(row[1] for row in chapters)
+        done = sum(row[2] for row in chapters)
+        speed = done / active_seconds if active_seconds > 0 else 0.0
+        return {
+            "job_id": job_id,
+            "status": status,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "total_segments": total,
+            "segments_done": done,
+            "total_chapters": len(chapters),
+            "chapters_completed": sum(1 for row in chapters if row[1] == row[2]),
+            "total_words": sum(row[3] for row in chapters),
+            "translated_words": sum(row[4] for row in chapters),
+            "elapsed_seconds": active_seconds,
+            "segments_per_second": speed,
+            "eta_seconds": (total - done) / speed if speed and status not in FINAL_STATUSES else None,
+        }
+
+    def result(self, job_id: str) -> Optional[List[Dict]]:
+        """الفصول المترجمة مع المسافات الأصلية، أو None إذا لم توجد المهمة"""
+        titles = self._query("SELECT chapter, title FROM job_chapters WHERE job_id = ? ORDER BY chapter", (job_id,))
+        if not titles:
+            return None
+        parts: Dict[int, List[str]] = {chapter: [] for chapter, _ in titles}
+        for chapter, leading, translation, separator in self._query(
+            """
+            SELECT chapter, leading, translation, separator FROM job_segments
+            WHERE job_id = ? ORDER BY chapter, position
+            """,
+            (job_id,),
+        ):
+            parts[chapter].append(leading + (translation or "") + separator)
+        return [{"title": title, "translated_text": "".join(parts[chapter])} for chapter, title in titles]
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """إلغاء مهمة لم تنته؛ يتوقف عاملها عند نقطة الاستئناف التالية
+
+        Returns:
+            str: حالة المهمة بعد الطلب، أو None إذا لم توجد
+        """
+        def update(conn: sqlite3.Connection) -> Optional[str]:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, owner = NULL "
+                "WHERE id = ? AND status NOT IN (?, ?, ?)",
+                (self._clock(), job_id, *FINAL_STATUSES),
+            )
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return row[0] if row else None
+
+        return self._transaction(update)
+
+    def resume(self, job_id: str) -> Optional[str]:
+        """إعادة مهمة فاشلة أو ملغاة إلى الطابور لإكمال الجمل المتبقية فقط"""
+        def update(conn: sqlite3.Connection) -> Optional[str]:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', error = NULL, finished_at = NULL "
+                "WHERE id = ? AND status IN ('failed', 'cancelled')",
+                (job_id,),
+            )
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return row[0] if row else None
+
+        status = self._transaction(update)
+        if status == "queued":
+            self._wake()
+        return status
+
+    def _wake(self) -> None:
+        """إيقاظ العمال المنتظرين؛ آمن من أي خيط (submit قد يعمل في مجمع الخيوط)"""
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim(self) -> Optional[Tuple[str, Dict]]:
+        """حجز أقدم مهمة في الطابور أو مهمة جارية انتهى عقد عاملها"""
+        now = self._clock()
+
+        def claim(conn: sqlite3.Connection) -> Optional[Tuple[str, Dict]]:
+            row = conn.execute(
+                """
+                SELECT id, options FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)
+                ORDER BY created_at LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (self._owner, now + self.lease_seconds, now, row[0]),
+            )
+            return row[0], json.loads(row[1])
+
+        return self._transaction(claim)
+
+    def _checkpoint(self, job_id: str, translated: List[Tuple[str, int, int]], seconds: float) -> bool:
+        """حفظ ترجمات دفعة وتجديد العقد؛ False إذا لم تعد المهمة لهذا العامل (أُلغيت مثلاً)"""
+        def save(conn: sqlite3.Connection) -> bool:
+            owned = conn.execute(
+                "UPDATE jobs SET lease_until = ?, active_seconds = active_seconds + ? "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (self._clock() + self.lease_seconds, seconds, job_id, self._owner),
+            ).rowcount
+            if owned:
+                conn.executemany(
+                    "UPDATE job_segments SET translation = ? WHERE job_id = ? AND chapter = ? AND position = ?",
+                    [(translation, job_id, chapter, position) for translation, chapter, position in translated],
+                )
+            return bool(owned)
+
+        return self._transaction(save)
+
+    def _renew(self, job_id: str) -> bool:
+        """تجديد عقد المهمة؛ False إذا لم تعد لهذا العامل"""
+        return bool(self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running' AND owner = ?",
+            (self._clock() + self.lease_seconds, job_id, self._owner),
+        ).rowcount))
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """تجديد العقد دورياً أثناء ترجمة دفعة، وينتهي إذا فقد العامل المهمة"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self.run(self._renew, job_id):
+                return
+
+    async def _translate_chunk(self, job_id: str, texts: List[str], options: Dict) -> Optional[List[str]]:
+        """ترجمة دفعة مع تجديد العقد حتى لا يأخذها عامل آخر إذا طالت عن مدة العقد
+
+        Returns:
+            List[str]: الترجمات، أو None إذا فقد العامل المهمة أثناء الترجمة (أُلغيت مثلاً)
+        """
+        translation = asyncio.ensure_future(self.translate(texts, options))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await asyncio.wait({translation, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            heartbeat.cancel()
+            if not translation.done():
+                translation.cancel()
+            await asyncio.gather(translation, heartbeat, return_exceptions=True)
+        if translation.cancelled():
+            return None
+        return translation.result()
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL "
+            "WHERE id = ? AND status = 'running' AND owner = ?",
+            (status, error, self._clock(), job_id, self._owner),
+        ))
+
+    async def _process(self, job_id: str, options: Dict) -> None:
+        failed = 0
+        # الجمل التي فشلت تبقى دون ترجمة، فيتقدم المؤشر بعد كل دفعة حتى لا تُعاد
+        last = (-1, -1)
+        while True:
+            rows = await self.run(
+                self._query,
+                """
+                SELECT chapter, position, text FROM job_segments
+                WHERE job_id = ? AND translation IS NULL AND (chapter, position) > (?, ?)
+                ORDER BY chapter, position LIMIT ?
+                """,
+                (job_id, *last, self.chunk_size),
+            )
+            if not rows:
+                break
+            started = time.perf_counter()
+            try:
+                translations = await self._translate_chunk(job_id, [text for _, _, text in rows], options)
+            except Exception as e:
+                logger.exception("Job %s failed", job_id)
+                await self.run(self._finish, job_id, "failed", str(e))
+                return
+            if translations is None:
+                return
+            translated = [
+                (translation, chapter, position)
+                for (chapter, position, _), translation in zip(rows, translations)
+                if translation
+            ]
+            failed += len(rows) - len(translated)
+            last = rows[-1][:2]
+            if not await self.run(self._checkpoint, job_id, translated, time.perf_counter() - started):
+                return
+        if failed:
+            await self.run(self._finish, job_id, "failed", f"{failed} segments failed to translate")
+        else:
+            await self.run(self._finish, job_id, "completed")
+
+    async def run_once(self) -> bool:
+        """تنفيذ مهمة واحدة من الطابور إن وُجدت"""
+        claimed = await self.run(self._claim)
+        if claimed is None:
+            return False
+        await self._process(*claimed)
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """تشغيل العمال في حلقة الأحداث الحالية"""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """إيقاف العمال؛ المهام الجارية تُستأنف من آخر نقطة عند التشغيل التالي"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+        self._loop = None
+        # إعادة المهام الجارية إلى الطابور فوراً بدلاً من انتظار انتهاء عقدها
+        await self.run(self._transaction, lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND owner = ?",
+            (self._owner,),
+        ))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
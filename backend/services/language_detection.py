@@ -0,0 +1,155 @@
+"""
+كشف لغة النص بسرعة وبنتائج ثابتة
+
+- يُفحص جزء محدود من بداية النص فقط (max_chars) بدلاً من النص كاملاً
+- مصنف أولي رخيص حسب نطاقات يونيكود (العربية، اليابانية، الكورية، الروسية
+  والأوكرانية) يتخطى الكاشف الإحصائي عندما تكون الإجابة واضحة
+- تُخزن النتائج مؤقتاً حسب بصمة الجزء المفحوص
+- تثبيت بذرة langdetect مرة واحدة حتى يعطي نفس النص نفس الإجابة دائماً
+- langdetect (وملفات نماذجه) لا يُحمّل إلا عند أول نص يحتاج الكاشف الإحصائي
+"""
+import hashlib
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.translation_cache import TranslationCache
+
+# نسبة الأحرف المنتمية لنص كتابي معين التي تكفي للحكم دون الكاشف الإحصائي
+SCRIPT_RATIO = 0.6
+
+# أحرف عربية الخط خاصة بالفارسية والأردية؛ وجودها يعني أن النص ليس عربياً بالضرورة
+_NON_ARABIC_LETTERS = frozenset("پچژگکیۀےٹڈڑںھ")
+# أحرف سيريلية خاصة بالأوكرانية، وأخرى خاصة بالروسية (والبيلاروسية)
+_UKRAINIAN_LETTERS = frozenset("їєґі")
+_RUSSIAN_LETTERS = frozenset("ыэёъ")
+_OTHER_CYRILLIC_LETTERS = frozenset("ўјљњћџѓќѕ")
+
+
+_langdetect = None
+
+
+def _load_langdetect():
+    """استيراد langdetect عند أول استخدام"""
+    global _langdetect
+    if _langdetect is None:
+        import langdetect
+        # langdetect يستخدم احتمالات عشوائية؛ البذرة الثابتة تجعل نتائجه حتمية
+        langdetect.DetectorFactory.seed = 0
+        _langdetect = langdetect
+    return _langdetect
+
+
+def _script(char: str) -> Optional[str]:
+    code = ord(char)
+    if 0x0600 <= code <= 0x06FF or 0x0750 <= code <= 0x077F or 0x08A0 <= code <= 0x08FF \
+            or 0xFB50 <= code <= 0xFDFF or 0xFE70 <= code <= 0xFEFF:
+        return "arabic"
+    if 0x3040 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF:
+        return "kana"
+    if 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+        return "hangul"
+    if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+        return "han"
+    if 0x0400 <= code <= 0x04FF:
+        return "cyrillic"
+    return None
+
+
+def classify_script(text: str) -> Optional[str]:
+    """تخمين اللغة من نطاقات يونيكود، أو None إذا لم تكن الإجابة واضحة"""
+    counts: Dict[Optional[str], int] = {}
+    letters = 0
+    for char in text:
+        if char.isalpha():
+            letters += 1
+            script = _script(char)
+            counts[script] = counts.get(script, 0) + 1
+    if not letters:
+        return None
+
+    def share(*scripts: str) -> float:
+        return sum(counts.get(script, 0) for script in scripts) / letters
+
+    if share("arabic") >= SCRIPT_RATIO:
+        return None if _NON_ARABIC_LETTERS.intersection(text) else "ar"
+    # الكانا تميز اليابانية حتى لو اختلطت بالرموز الصينية (كانجي)
+    if counts.get("kana") and share("kana", "han") >= SCRIPT_RATIO:
+        return "ja"
+    if share("hangul", "han") >= SCRIPT_RATIO and counts.get("hangul"):
+        return "ko"
+    if share("cyrillic") >= SCRIPT_RATIO:
+        lowered = set(text.lower())
+        if lowered & _OTHER_CYRILLIC_LETTERS:
+            return None
+        if lowered & _UKRAINIAN_LETTERS and not lowered & _RUSSIAN_LETTERS:
+            return "uk"
+        if lowered & _RUSSIAN_LETTERS and not lowered & _UKRAINIAN_LETTERS:
+            return "ru"
+    return None
+
+
+class LanguageDetector:
+    """كاشف لغة مع عينة محدودة ومصنف أولي وذاكرة مؤقتة
+
+    Attributes:
+        max_chars (int): أقصى عدد أحرف يُفحص من بداية النص
+        default (str): اللغة المعادة عند تعذر الكشف
+    """
+
+    def __init__(self, max_chars: int = 1000, cache_size: int = 10000, default: str = "en"):
+        self.max_chars = max_chars
+        self.default = default
+        self.cache = TranslationCache(max_size=cache_size, ttl=float("inf"), single_flight=False)
+        self.statistical_calls = 0
+
+    @classmethod
+    def from_env(cls) -> "LanguageDetector":
+        """إنشاء الكاشف من DETECTION_MAX_CHARS وDETECTION_CACHE_SIZE"""
+        return cls(
+            max_chars=int(os.getenv("DETECTION_MAX_CHARS", "1000")),
+            cache_size=int(os.getenv("DETECTION_CACHE_SIZE", "10000")),
+        )
+
+    def sample(self, text: str) -> str:
+        """الجزء المفحوص: أول max_chars حرف مقطوعاً عند آخر مسافة"""
+        text = text.strip()
+        if len(text) <= self.max_chars:
+            return text
+        cut = text.rfind(" ", 0, self.max_chars)
+        return text[:cut if cut > self.max_chars // 2 else self.max_chars]
+
+    def detect_statistical(self, sample: str) -> str:
+        """الكاشف الإحصائي (متزامن؛ يُفضل تشغيله خارج حلقة الأحداث)"""
+        self.statistical_calls += 1
+        langdetect = _load_langdetect()
+        try:
+            return langdetect.detect(sample)
+        except langdetect.LangDetectException:
+            return self.default
+
+    async def detect(
+        self, text: str, run_blocking: Optional[Callable[..., Awaitable[str]]] = None
+    ) -> str:
+        """كشف لغة النص
+
+        Args:
+            text (str): النص
+            run_blocking (callable, optional): دالة لتشغيل الكاشف الإحصائي خارج
+                حلقة الأحداث مثل BlockingPool.run
+        """
+        sample = self.sample(text)
+        if not sample:
+            return self.default
+        key = hashlib.blake2b(sample.encode("utf-8"), digest_size=16).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        language = classify_script(sample)
+        if language is None:
+            if run_blocking is not None:
+                language = await run_blocking(self.detect_statistical, sample)
+            else:
+                language = self.detect_statistical(sample)
+        self.cache.set(key, language)
+        return language
@@ -0,0 +1,269 @@
+"""
+استيراد وتصدير ذاكرة الترجمة بصيغتي TMX وJSONL
+
+القراءة تدريجية: JSONL سطراً بسطر، وTMX عبر iterparse مع حذف كل وحدة
+ترجمة (tu) بعد معالجتها، فلا يُحمَّل ملف بحجم عدة غيغابايتات في الذاكرة.
+الكتابة كذلك تُنتج النص قطعة بعد قطعة.
+
+- JSONL: سطر لكل TranslationMemoryEntry كاملاً (model_dump_json)
+- TMX 1.4: النص الأصلي في tuv بلغة srclang وكل tuv آخر ترجمة. تُحفظ
+  الرواية والسياق والوسوم في عناصر prop بأسماء x-*، والتكرار وآخر استخدام
+  في السمتين usagecount وlastusagedate. لا تُنقل الشخصيات في TMX.
+
+سطر الأوامر (من مجلد backend، ويستخدم TRANSLATION_MEMORY_DB إن لم يُحدد --db، ويرفض
+العمل دونهما):
+    python -m services.memory_io import memory.tmx --db memory.db --target-lang ar
+    python -m services.memory_io export memory.jsonl --db memory.db
+"""
+import argparse
+import asyncio
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from pydantic import ValidationError
+
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+
+FORMATS = ("jsonl", "tmx")
+
+# لغة غير محددة (BCP 47) للنص الأصلي لأن المدخلات لا تحفظ لغة المصدر
+UNDETERMINED = "und"
+
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+_TMX_DATE = "%Y%m%dT%H%M%SZ"
+# prop -> حقل السياق
+_CONTEXT_PROPS = {
+    "x-previous-paragraph": "previous_paragraph",
+    "x-next-paragraph": "next_paragraph",
+    "x-scene-type": "scene_type",
+    "x-chapter-number": "chapter_number",
+    "x-chapter-title": "chapter_title",
+}
+
+
+def detect_format(filename: str) -> str:
+    """الصيغة من امتداد الملف
+
+    Raises:
+        ValueError: إذا لم يكن الامتداد .tmx أو .jsonl
+    """
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "tmx":
+        return "tmx"
+    raise ValueError(f"Unsupported file type '{filename}', expected .tmx or .jsonl")
+
+
+def iter_jsonl(stream: BinaryIO) -> Iterator[TranslationMemoryEntry]:
+    """قراءة المدخلات سطراً بسطر
+
+    Raises:
+        ValueError: عند سطر غير صالح، مع رقمه
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield TranslationMemoryEntry.model_validate_json(line)
+        except ValidationError as exc:
+            raise ValueError(f"Invalid entry on line {line_number}: {exc}") from exc
+
+
+def _primary_language(lang: Optional[str]) -> Optional[str]:
+    # en-US -> en؛ واللغة غير المحددة تعني بلا لغة هدف
+    if not lang or lang.lower() in (UNDETERMINED, "*all*"):
+        return None
+    return lang.split("-")[0].split("_")[0].lower()
+
+
+def _tmx_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, _TMX_DATE)
+    except ValueError:
+        return None
+
+
+def _tu_entries(tu: ET.Element, srclang: Optional[str], target_lang: Optional[str]) -> List[TranslationMemoryEntry]:
+    variants = []
+    for tuv in tu.findall("tuv"):
+        seg = tuv.find("seg")
+        if seg is not None:
+            variants.append((tuv.get(_XML_LANG) or tuv.get("lang"), "".join(seg.itertext())))
+    if len(variants) < 2:
+        return []
+
+    source_lang = tu.get("srclang") or srclang
+    source_index = 0
+    if source_lang and source_lang.lower() != "*all*":
+        matching = [i for i, (lang, _) in enumerate(variants) if (lang or "").lower() == source_lang.lower()]
+        if not matching:
+            return []
+        source_index = matching[0]
+    original_text = variants[source_index][1]
+
+    props: Dict[str, List[str]] = {}
+    for prop in tu.findall("prop"):
+        props.setdefault(prop.get("type", ""), []).append(prop.text or "")
+    context = {field: props[name][0] for name, field in _CONTEXT_PROPS.items() if name in props}
+
+    entries = []
+    for i, (lang, text) in enumerate(variants):
+        language = _primary_language(lang)
+        if i == source_index or (target_lang and language != target_lang.lower()):
+            continue
+        fields = {}
+        last_used = _tmx_date(tu.get("lastusagedate") or tu.get("changedate"))
+        if last_used is not None:
+            fields["last_used"] = last_used
+        if tu.get("usagecount", "").isdigit() and int(tu.get("usagecount")) > 0:
+            fields["frequency"] = int(tu.get("usagecount"))
+        entries.append(TranslationMemoryEntry(
+            original_text=original_text,
+            translated_text=text,
+            context=TranslationContext(**context),
+            novel_title=props.get("x-novel-title", [None])[0],
+            chapter_id=props.get("x-chapter-id", [None])[0],
+            tags=props.get("x-tag", []),
+            target_lang=language,
+            **fields,
+        ))
+    return entries
+
+
+def iter_tmx(stream: BinaryIO, target_lang: Optional[str] = None) -> Iterator[TranslationMemoryEntry]:
+    """قراءة وحدات الترجمة من ملف TMX تدريجياً
+
+    Args:
+        target_lang (str, optional): استيراد الترجمات إلى هذه اللغة فقط
+            (مقارنة باللغة الأساسية: ar تطابق ar-SA)
+
+    Raises:
+        ValueError: إذا لم يكن الملف XML صالحاً أو كانت وحدة ترجمة غير صالحة
+    """
+    srclang = None
+    body = None
+    try:
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if element.tag == "header":
+                    srclang = element.get("srclang")
+                elif element.tag == "body":
+                    body = element
+                continue
+            if element.tag == "tu":
+                try:
+                    yield from _tu_entries(element, srclang, target_lang)
+                except ValidationError as exc:
+                    raise ValueError(f"Invalid translation unit: {exc}") from exc
+                # حذف الوحدات المعالجة حتى لا تتراكم الشجرة في الذاكرة
+                if body is not None:
+                    body.clear()
+    except ET.ParseError as exc:
+        raise ValueError(f"Invalid TMX file: {exc}") from exc
+
+
+def iter_entries(stream: BinaryIO, file_format: str, target_lang: Optional[str] = None) -> Iterator[TranslationMemoryEntry]:
+    """قراءة المدخلات بالصيغة المحددة (jsonl أو tmx)"""
+    if file_format == "jsonl":
+        return iter_jsonl(stream)
+    if file_format == "tmx":
+        return iter_tmx(stream, target_lang)
+    raise ValueError(f"Unsupported format '{file_format}', expected one of {', '.join(FORMATS)}")
+
+
+def export_jsonl(entries: Iterable[TranslationMemoryEntry]) -> Iterator[str]:
+    for entry in entries:
+        yield entry.model_dump_json() + "\n"
+
+
+def _prop(name: str, value) -> str:
+    return f'    <prop type="{name}">{escape(str(value))}</prop>\n'
+
+
+def export_tmx(entries: Iterable[TranslationMemoryEntry], source_lang: str = UNDETERMINED) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<tmx version="1.4">\n'
+        f'<header creationtool="ai-translator" creationtoolversion="1.0" datatype="plaintext" '
+        f'segtype="paragraph" adminlang="en" srclang={quoteattr(source_lang)} o-tmf="ai-translator"/>\n'
+        '<body>\n'
+    )
+    for entry in entries:
+        last_used = entry.last_used
+        if last_used.tzinfo is not None:
+            last_used = last_used.astimezone(timezone.utc).replace(tzinfo=None)
+        parts = [f'  <tu usagecount="{entry.frequency}" lastusagedate="{last_used.strftime(_TMX_DATE)}">\n']
+        if entry.novel_title is not None:
+            parts.append(_prop("x-novel-title", entry.novel_title))
+        if entry.chapter_id is not None:
+            parts.append(_prop("x-chapter-id", entry.chapter_id))
+        for name, field in _CONTEXT_PROPS.items():
+            value = getattr(entry.context, field)
+            if value is not None:
+                parts.append(_prop(name, value))
+        for tag in entry.tags:
+            parts.append(_prop("x-tag", tag))
+        parts.append(f"    <tuv xml:lang={quoteattr(source_lang)}><seg>{escape(entry.original_text)}</seg></tuv>\n")
+        parts.append(
+            f"    <tuv xml:lang={quoteattr(entry.target_lang or UNDETERMINED)}>"
+            f"<seg>{escape(entry.translated_text)}</seg></tuv>\n"
+        )
+        parts.append("  </tu>\n")
+        yield "".join(parts)
+    yield "</body>\n</tmx>\n"
+
+
+def export_entries(
+    entries: Iterable[TranslationMemoryEntry], file_format: str, source_lang: str = UNDETERMINED
+) -> Iterator[str]:
+    """كتابة المدخلات بالصيغة المحددة قطعة بعد قطعة"""
+    if file_format == "jsonl":
+        return export_jsonl(entries)
+    if file_format == "tmx":
+        return export_tmx(entries, source_lang)
+    raise ValueError(f"Unsupported format '{file_format}', expected one of {', '.join(FORMATS)}")
+
+
+def main() -> None:
+    from services.translation_memory_service import TranslationMemoryService
+    from services.translation_memory_store import create_store
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path")
+    # دون ملف SQLite تكون الذاكرة داخل العملية فيضيع الاستيراد عند خروجها
+    default_db = os.getenv("TRANSLATION_MEMORY_DB")
+    parser.add_argument(
+        "--db", default=default_db, required=not default_db,
+        help="ملف SQLite (مطلوب إن لم يُضبط TRANSLATION_MEMORY_DB)",
+    )
+    parser.add_argument("--format", choices=FORMATS, help="افتراضياً حسب امتداد الملف")
+    parser.add_argument("--target-lang", help="TMX: استيراد الترجمات إلى هذه اللغة فقط")
+    parser.add_argument("--source-lang", default=UNDETERMINED, help="TMX: لغة النص الأصلي عند التصدير")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    file_format = args.format or detect_format(args.path)
+    service = TranslationMemoryService(create_store(args.db))
+    if args.command == "import":
+        with open(args.path, "rb") as stream:
+            report = asyncio.run(service.import_entries(
+                iter_entries(stream, file_format, args.target_lang), batch_size=args.batch_size
+            ))
+        print(f"Imported {report.created} new and {report.updated} existing entries "
+              f"in {report.seconds:.2f}s ({report.entries_per_second:,.0f} entries/s)")
+    else:
+        with open(args.path, "w", encoding="utf-8") as output:
+            for chunk in export_entries(service.memory_entries, file_format, args.source_lang):
+                output.write(chunk)
+        print(f"Exported {len(service.memory_entries)} entries to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
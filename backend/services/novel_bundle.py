@@ -0,0 +1,76 @@
+"""
+حزمة مترجمة مسبقاً لكل رواية
+
+تُبنى من NovelContext مرة واحدة (وعند كل تحديث للرواية) بدلاً من إعادة
+معالجة الشخصيات والمسرد في كل طلب:
+- جدول بحث من الاسم الأصلي وكل الأسماء البديلة إلى الشخصية
+- مطابق مسرد مترجم يضم مصطلحات المسرد وأسماء الشخصيات وأسماءها البديلة
+- رد /novel-context/characters مسلسلاً بصيغة JSON جاهزاً للإرسال
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+from models.translation_memory import Character, NovelContext
+from services.glossary import GlossaryMatcher, compile_glossary
+
+
+def novel_terms(context: NovelContext) -> Tuple[Tuple[str, str], ...]:
+    """مصطلحات الرواية بترتيب الأولوية: المسرد ثم أسماء الشخصيات ثم أسماؤها البديلة"""
+    terms = list(context.glossary.items())
+    terms.extend((character.name_original, character.name_translated) for character in context.characters)
+    terms.extend(
+        (alias, character.name_translated)
+        for character in context.characters
+        for alias in character.aliases
+    )
+    return tuple(terms)
+
+
+def _characters_payload(characters: List[Character]) -> bytes:
+    return json.dumps(
+        {"characters": [character.model_dump() for character in characters]},
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class NovelBundle:
+    """سياق رواية مترجم مسبقاً
+
+    Attributes:
+        title (str): عنوان الرواية
+        version (int): يزداد مع كل تحديث للرواية (يدخل في مفاتيح التخزين المؤقت)
+        terms (tuple): مصطلحات الرواية (الأصل، الترجمة)
+        matcher (GlossaryMatcher): مطابق مصطلحات الرواية
+        characters_json (bytes): رد قائمة الشخصيات مسلسلاً
+    """
+
+    def __init__(self, title: str, context: NovelContext, previous: Optional["NovelBundle"] = None):
+        self.title = title
+        self.context = context
+        self.version = previous.version + 1 if previous is not None else 1
+        self.terms = novel_terms(context)
+        # إعادة استخدام ما لم يتغير من الحزمة السابقة
+        if previous is not None and previous.terms == self.terms:
+            self.matcher = previous.matcher
+        else:
+            self.matcher = compile_glossary(self.terms)
+        if previous is not None and previous.context.characters == context.characters:
+            self.characters_json = previous.characters_json
+            self._aliases = previous._aliases
+        else:
+            self.characters_json = _characters_payload(context.characters)
+            self._aliases: Dict[str, Character] = {}
+            for character in context.characters:
+                for name in [character.name_original, *character.aliases]:
+                    # عند التكرار يبقى أول ظهور كما في المطابق
+                    self._aliases.setdefault(name.casefold(), character)
+
+    def character(self, name: str) -> Optional[Character]:
+        """الشخصية التي يشير إليها الاسم الأصلي أو أحد أسمائها البديلة"""
+        return self._aliases.get(name.casefold())
+
+    def matcher_with(self, terms: Tuple[Tuple[str, str], ...]) -> GlossaryMatcher:
+        """مطابق يجمع مصطلحات الطلب (الأولوية لها) مع مصطلحات الرواية"""
+        if not terms:
+            return self.matcher
+        return compile_glossary(terms + self.terms)
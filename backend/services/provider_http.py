@@ -0,0 +1,135 @@
+"""
+طبقة HTTP مشتركة لمزودي الترجمة
+
+عميل httpx واحد طويل العمر يُنشأ عند بدء التطبيق ويعيد استخدام الاتصالات
+(HTTP/2 عند توفر حزمة h2)، مع مهلات قابلة للضبط، وإعادة المحاولة بتأخير
+أسّي عشوائي عند 429 و5xx وأخطاء الشبكة. يسجل نتيجة كل طلب في قاطع دائرة
+المزود (services.circuit_breaker) فيتخطى المزود المتعطل مباشرة حتى يعود
+المستدعي إلى المزود البديل.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from services.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitOpenError  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class ProviderHTTPClient:
+    """عميل HTTP مشترك لكل المزودين مع إعادة المحاولة وقواطع الدائرة"""
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        max_connections: int = 100,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breakers: Optional[CircuitBreakers] = None,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # القواطع قد تكون مشتركة مع مزودين لا يمرون بهذا العميل (Google)
+        self.breakers = breakers if breakers is not None else CircuitBreakers(failure_threshold, reset_timeout)
+        self.client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    @classmethod
+    def from_env(cls, breakers: Optional[CircuitBreakers] = None) -> "ProviderHTTPClient":
+        """إنشاء العميل من متغيرات البيئة PROVIDER_* (وCIRCUIT_* إن لم تُمرر القواطع)"""
+        return cls(
+            timeout=float(os.getenv("PROVIDER_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "5")),
+            max_retries=int(os.getenv("PROVIDER_MAX_RETRIES", "2")),
+            max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100")),
+            breakers=breakers if breakers is not None else CircuitBreakers.from_env(),
+        )
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        """قاطع الدائرة الخاص بمزود (يُنشأ عند أول استخدام)"""
+        return self.breakers.get(provider)
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """تأخير عشوائي كامل (full jitter) مع احترام Retry-After إن وُجد"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _send(self, provider: str, request: httpx.Request, stream: bool) -> httpx.Response:
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            raise CircuitOpenError(provider)
+
+        settled = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    response = await self.client.send(request, stream=stream)
+                except httpx.TransportError as exc:
+                    if attempt == self.max_retries:
+                        settled = True
+                        breaker.record_failure()
+                        raise
+                    logger.warning("%s request failed (%s), retrying", provider, exc)
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        settled = True
+                        breaker.record_success()
+                        return response
+                    if attempt == self.max_retries:
+                        settled = True
+                        breaker.record_failure()
+                        return response
+                    logger.warning("%s returned %s, retrying", provider, response.status_code)
+                    await response.aclose()
+                await asyncio.sleep(self._backoff(attempt, response))
+        finally:
+            # إلغاء الطلب أو خطأ غير متوقع (ليس من الشبكة) لا يحكم على صحة المزود،
+            # لكن يجب تحرير الطلب التجريبي وإلا بقي القاطع نصف مفتوح ويرفض كل الطلبات
+            if not settled:
+                breaker.release()
+
+    async def request(self, provider: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """إرسال طلب مع إعادة المحاولة
+
+        Raises:
+            CircuitOpenError: إذا كانت دائرة المزود مفتوحة
+            httpx.TransportError: إذا فشلت كل المحاولات بخطأ شبكة
+        """
+        return await self._send(provider, self.client.build_request(method, url, **kwargs), stream=False)
+
+    async def post(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(provider, "POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, provider: str, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """طلب ببث الرد؛ تُعاد المحاولة فقط قبل بدء قراءة الرد"""
+        response = await self._send(provider, self.client.build_request(method, url, **kwargs), stream=True)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,109 @@
+"""
+تقسيم النصوص الطويلة إلى مقاطع للترجمة
+
+يحتفظ كل مقطع بالمسافات التي تليه حتى يمكن إعادة تجميع النص المترجم
+بنفس تنسيق النص الأصلي.
+
+نهايات الجمل:
+- اللاتينية والعربية (. ! ? … ؟ ۔) متبوعة بمسافة، ولا يُقسم إذا بدأ ما
+  بعدها بحرف لاتيني صغير (اختصارات مثل "e.g. the") أو بعد الألقاب (Mr. Dr.)
+- الصينية واليابانية (。！？) دون حاجة إلى مسافة بعدها
+وتبقى علامات التنصيص والأقواس الختامية مع الجملة.
+"""
+import re
+from typing import List, NamedTuple, Optional
+
+# سطر فارغ واحد أو أكثر يفصل بين الفقرات
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+
+_SENTENCE_END = re.compile(
+    r"[.!?…؟۔]+[\"'»”’)\]]*(\s+)(?![a-z])"
+    r"|[。！？]+[」』）】”’\"]*(\s*)"
+)
+_TITLE_ABBREVIATION = re.compile(r"\b(?:Mr|Mrs|Ms|Dr|Prof|St|Jr|Sr|vs)\.$")
+
+
+class Segment(NamedTuple):
+    """مقطع من النص مع المسافات المحيطة به"""
+    text: str
+    separator: str = ""
+    leading: str = ""
+
+
+def split_paragraphs(text: str) -> List[Segment]:
+    """تقسيم النص إلى فقرات على الأسطر الفارغة
+
+    المسافات في بداية النص تُحفظ في leading للمقطع الأول، والمسافات بين
+    الفقرات في separator للمقطع السابق لها.
+    """
+    stripped = text.lstrip()
+    leading = text[:len(text) - len(stripped)]
+    segments: List[Segment] = []
+    position = 0
+    for match in _PARAGRAPH_BREAK.finditer(stripped):
+        segments.append(Segment(stripped[position:match.start()], match.group(), leading if not segments else ""))
+        position = match.end()
+    tail = stripped[position:]
+    body = tail.rstrip()
+    if body or not segments:
+        segments.append(Segment(body, tail[len(body):], leading if not segments else ""))
+    else:
+        last = segments[-1]
+        segments[-1] = last._replace(separator=last.separator + tail)
+    return segments
+
+
+def reassemble(segments: List[Segment], texts: List[str]) -> str:
+    """إعادة تجميع النص من ترجمات المقاطع مع المسافات الأصلية"""
+    return "".join(segment.leading + text + segment.separator for segment, text in zip(segments, texts))
+
+
+def _split_oversized(text: str, max_chars: int) -> List[Segment]:
+    """تقسيم جملة أطول من max_chars عند آخر مسافة قبل الحد (أو عند الحد إن لم توجد)"""
+    pieces: List[Segment] = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 1, max_chars + 1)
+        if cut <= 0:
+            pieces.append(Segment(text[:max_chars]))
+            text = text[max_chars:]
+            continue
+        end = len(text[:cut].rstrip())
+        rest = text[cut:].lstrip()
+        pieces.append(Segment(text[:end], text[end:len(text) - len(rest)]))
+        text = rest
+    pieces.append(Segment(text))
+    return pieces
+
+
+def split_sentences(text: str, max_chars: Optional[int] = None) -> List[Segment]:
+    """تقسيم النص إلى جمل مع الحفاظ على كل المسافات
+
+    تُقسم الفقرات أولاً ثم الجمل داخل كل فقرة، فيكون الفاصل بين الفقرات
+    separator لآخر جملة فيها. مع max_chars تُقسم الجمل الأطول منه عند المسافات.
+    """
+    segments: List[Segment] = []
+    for paragraph in split_paragraphs(text):
+        sentences: List[Segment] = []
+        position = 0
+        for match in _SENTENCE_END.finditer(paragraph.text):
+            whitespace = match.group(1) if match.group(1) is not None else match.group(2)
+            end = match.end() - len(whitespace)
+            if match.end() == len(paragraph.text):
+                break
+            if _TITLE_ABBREVIATION.search(paragraph.text, position, end):
+                continue
+            sentences.append(Segment(paragraph.text[position:end], whitespace))
+            position = match.end()
+        sentences.append(Segment(paragraph.text[position:]))
+        if max_chars is not None:
+            sentences = [
+                piece._replace(separator=piece.separator or sentence.separator)
+                if i == len(pieces) - 1 else piece
+                for sentence in sentences
+                for pieces in [_split_oversized(sentence.text, max_chars)]
+                for i, piece in enumerate(pieces)
+            ]
+        sentences[0] = sentences[0]._replace(leading=paragraph.leading)
+        sentences[-1] = sentences[-1]._replace(separator=sentences[-1].separator + paragraph.separator)
+        segments.extend(sentences)
+    return segments
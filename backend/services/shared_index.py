@@ -0,0 +1,333 @@
+"""
+فهرس قراءة مشترك لذاكرة الترجمة بين عدة عمليات (عمال uvicorn)
+
+بدونه تبني كل عملية فهارسها الخاصة (المطابقة التامة والبحث التقريبي) لكل
+مدخلات SQLiteStore، فتتضاعف الذاكرة بعدد العمال. مع الفهرس المشترك:
+
+- كاتب واحد (العملية التي تحصل على قفل writer.lock) يبني من واجهة التخزين
+  فهرساً ثابتاً بإصدار متزايد: بصمات مفاتيح المطابقة التامة مرتبة، ومصفوفات
+  VectorScorer.freeze، ويكتبه في ملف index-<version>.bin ثم يحدّث المؤشر
+  CURRENT بإعادة تسمية ذرية (os.replace)
+- كل العمليات تفتح الملف عبر mmap وتستعلم عليه مباشرة دون نسخ (FrozenScorer)،
+  فتتشارك صفحاته من ذاكرة نظام التشغيل
+- عند ظهور إصدار جديد يُفتح ويحل محل السابق دفعة واحدة؛ الاستعلام الجاري يكمل
+  على الإصدار الذي بدأ به، ولا يُحذف ملف مفتوح من عرض عملية أخرى على POSIX
+- المدخلات المضافة بعد آخر إصدار تبقى في فهارس محلية صغيرة لدى كل عملية
+  (TranslationMemoryService) حتى ينشر الكاتب إصداراً يشملها
+
+إذا توقف الكاتب يحصل عامل آخر على القفل في الدورة التالية ويتابع الإصدارات.
+عند تحديث سياق مدخل (update_context) من أي عملية يعيد الكاتب بناء الفهرس من
+البداية في الدورة التالية وينشر إصداراً جديداً.
+
+تنسيق الملف: MAGIC، ثم طول الترويسة (8 بايت)، ثم ترويسة JSON، ثم المصفوفات
+محاذاة على 8 بايت بالإزاحات المذكورة في الترويسة.
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from services.translation_memory_service import exact_key, tokenize
+from services.translation_memory_store import TranslationMemoryStore
+from services.vector_scoring import FrozenScorer, VectorScorer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TMINDEX1"
+POINTER = "CURRENT"
+LOCK = "writer.lock"
+_ALIGNMENT = 8
+
+
+def exact_digest(key: str) -> bytes:
+    """بصمة 16 بايت لمفتاح المطابقة التامة (exact_key)"""
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _codes_to_json(codes: Dict[str, Dict]) -> Dict[str, list]:
+    # مفاتيح الرموز قد تكون None أو أعداداً، فتُحفظ أزواجاً لا قاموس JSON
+    return {name: [[value, code] for value, code in table.items()] for name, table in codes.items()}
+
+
+def write_index(path: str, version: int, arrays: Dict[str, np.ndarray], codes: Dict[str, Dict]) -> None:
+    """كتابة إصدار فهرس في ملف جديد (يظهر كاملاً أو لا يظهر)"""
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = _align(offset)
+        layout[name] = [offset, values.dtype.str, len(values)]
+        offset += values.nbytes
+    header = json.dumps({
+        "version": version,
+        "count": len(arrays["scenes"]),
+        "codes": _codes_to_json(codes),
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, values in arrays.items():
+            f.seek(data_start + layout[name][0])
+            f.write(np.ascontiguousarray(values).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class SharedIndex:
+    """إصدار واحد ثابت من الفهرس، مفتوح عبر mmap للقراءة فقط
+
+    Attributes:
+        version (int): رقم الإصدار
+        count (int): عدد المدخلات المفهرسة (المعرفات من 0 إلى count - 1)
+        scorer (FrozenScorer): البحث التقريبي على مصفوفات الملف مباشرة
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a translation memory index")
+        (header_size,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_size])
+        data_start = _align(header_start + header_size)
+
+        arrays = {}
+        for name, (offset, dtype, length) in header["arrays"].items():
+            if length:
+                arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=length, offset=data_start + offset)
+            else:
+                arrays[name] = np.empty(0, dtype=dtype)
+        codes = {
+            name: {value: code for value, code in pairs} for name, pairs in header["codes"].items()
+        }
+        self.version: int = header["version"]
+        self.count: int = header["count"]
+        self.scorer = FrozenScorer(arrays, codes)
+        self._digests = arrays["digests"]
+        self._digest_ids = arrays["digest_ids"]
+
+    def find_exact(self, key: str) -> Optional[int]:
+        """معرف المدخل ذي مفتاح المطابقة التامة key، أو None"""
+        digest = np.array(exact_digest(key), dtype="S16")
+        position = int(np.searchsorted(self._digests, digest))
+        if position < len(self._digests) and self._digests[position] == digest:
+            return int(self._digest_ids[position])
+        return None
+
+
+class SharedIndexReader:
+    """أحدث إصدار منشور في مجلد الفهرس، مع التبديل إلى الإصدارات الجديدة"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._pointer = os.path.join(directory, POINTER)
+        self._stamp = None
+        self._index: Optional[SharedIndex] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[SharedIndex]:
+        """الإصدار الحالي، أو None إذا لم يُنشر أي إصدار بعد
+
+        تكلفة الاستدعاء عند عدم تغير الإصدار هي stat واحدة لملف المؤشر.
+        """
+        for _ in range(3):
+            try:
+                stat = os.stat(self._pointer)
+            except FileNotFoundError:
+                return self._index
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stamp == self._stamp:
+                return self._index
+            with self._lock:
+                if stamp == self._stamp:
+                    return self._index
+                try:
+                    with open(self._pointer, encoding="utf-8") as f:
+                        name = f.read().strip()
+                    index = SharedIndex(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    # نُشر إصدار أحدث وحُذف هذا بين قراءة المؤشر وفتح الملف
+                    continue
+                self._index, self._stamp = index, stamp
+                return index
+        return self._index
+
+
+class SharedIndexWriter:
+    """بناء إصدارات الفهرس ونشرها من واجهة التخزين
+
+    تشغّل كل عملية الكاتب (start)، لكن العملية التي تحصل على قفل writer.lock
+    وحدها تبني الفهرس؛ البقية تحاول الحصول على القفل في كل دورة فتتولى
+    البناء إذا توقفت العملية الكاتبة.
+
+    Attributes:
+        interval (float): الثواني بين محاولتي نشر
+        keep (int): عدد الإصدارات التي تبقى ملفاتها على القرص
+    """
+
+    def __init__(self, directory: str, store: TranslationMemoryStore, interval: float = 5.0, keep: int = 2):
+        self.directory = directory
+        self.store = store
+        self.interval = interval
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None
+        self._scorer: Optional[VectorScorer] = None
+        self._digests: List[bytes] = []
+        # context_revision لواجهة التخزين عند بناء الفهرس الحالي
+        self._context_revision: Optional[int] = None
+        # (عدد المدخلات، context_revision) لآخر إصدار منشور
+        self._published: Optional[tuple] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, directory: str, store: TranslationMemoryStore) -> "SharedIndexWriter":
+        return cls(directory, store, interval=float(os.getenv("TRANSLATION_MEMORY_INDEX_INTERVAL", "5")))
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_file is not None
+
+    def acquire(self) -> bool:
+        """محاولة الحصول على دور الكاتب دون انتظار"""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(os.path.join(self.directory, LOCK), "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _latest_version(self) -> int:
+        try:
+            with open(os.path.join(self.directory, POINTER), encoding="utf-8") as f:
+                return int(f.read().strip()[len("index-"):-len(".bin")])
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _sync(self) -> None:
+        revision = self.store.context_revision()
+        if revision != self._context_revision:
+            # لا تُحفظ السياقات القديمة اللازمة لتحديث المقيم، فيُعاد بناؤه
+            self._scorer = None
+            self._digests = []
+            self._context_revision = revision
+        if self._scorer is None:
+            self._scorer = VectorScorer()
+        keys = list(self.store.iter_keys(len(self._scorer) - 1))
+        contexts = self.store.contexts([entry_id for entry_id, *_ in keys])
+        for (_, original_text, novel_title, target_lang), context in zip(keys, contexts):
+            self._digests.append(exact_digest(exact_key(original_text, novel_title, target_lang)))
+            self._scorer.add(tokenize(original_text), context)
+
+    def publish(self) -> Optional[int]:
+        """نشر إصدار جديد إذا أضيفت مدخلات أو تغيرت سياقات منذ آخر إصدار
+
+        Returns:
+            int: رقم الإصدار المنشور، أو None إذا لم يتغير شيء أو لم تكن هذه
+                العملية هي الكاتب
+        """
+        if not self.acquire():
+            return None
+        self._sync()
+        count = len(self._scorer)
+        if (count, self._context_revision) == self._published:
+            return None
+
+        arrays, codes = self._scorer.freeze()
+        digests = np.array(self._digests, dtype="S16")
+        order = np.argsort(digests, kind="stable")
+        arrays["digests"] = digests[order]
+        arrays["digest_ids"] = order.astype(np.int32)
+
+        version = self._latest_version() + 1
+        name = f"index-{version:010d}.bin"
+        write_index(os.path.join(self.directory, name), version, arrays, codes)
+        temporary = os.path.join(self.directory, f"{POINTER}.tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(self.directory, POINTER))
+        self._published = (count, self._context_revision)
+        self._remove_old_versions()
+        logger.info("Published translation memory index version %d (%d entries)", version, count)
+        return version
+
+    def _remove_old_versions(self) -> None:
+        for path in sorted(glob.glob(os.path.join(self.directory, "index-*.bin")))[:-self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                # Windows لا يسمح بحذف ملف مفتوح عبر mmap؛ يُحذف في دورة لاحقة
+                pass
+
+    async def _loop(self, run_blocking: Optional[Callable[..., Awaitable]]) -> None:
+        while True:
+            try:
+                if run_blocking is not None:
+                    await run_blocking(self.publish)
+                else:
+                    self.publish()
+            except Exception:
+                logger.exception("Translation memory index publish failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self, run_blocking: Optional[Callable[..., Awaitable]] = None) -> None:
+        """النشر الدوري في حلقة الأحداث الحالية
+
+        Args:
+            run_blocking (callable, optional): تشغيل البناء خارج حلقة الأحداث
+                مثل BlockingPool.run
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(run_blocking))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.close()
+
+    def close(self) -> None:
+        """التخلي عن دور الكاتب"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self._scorer = None
+            self._digests = []
+            self._context_revision = None
+            self._published = None
@@ -0,0 +1,137 @@
+"""
+ذاكرة تخزين مؤقت لنتائج الترجمة على الخادم
+
+تخزين مؤقت محدود الحجم (LRU) مع صلاحية زمنية (TTL)، ودمج اختياري للطلبات
+المتزامنة المتطابقة (single-flight) بحيث يُرسل طلب واحد فقط إلى المزود.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+class TranslationCache:
+    """ذاكرة تخزين مؤقت LRU مع صلاحية زمنية
+
+    Attributes:
+        hits (int): عدد الطلبات التي وُجدت نتيجتها في الذاكرة المؤقتة
+        misses (int): عدد الطلبات التي لم توجد نتيجتها
+        coalesced (int): عدد الطلبات التي انتظرت طلباً مطابقاً قيد التنفيذ
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 86400,
+        single_flight: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.single_flight = single_flight
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(
+        text: str,
+        source_lang: Optional[str],
+        target_lang: str,
+        provider: Optional[str],
+        terms: Optional[Iterable[Tuple[str, str]]] = None,
+        scope: Optional[str] = None,
+    ) -> str:
+        """مفتاح التخزين: بصمة SHA-256 للنص واللغتين والمزود والمصطلحات
+
+        scope يميز النتائج التي تعتمد على حالة أخرى على الخادم (مثل نسخة مسرد الرواية).
+        """
+        parts = [text, source_lang, target_lang, provider, [list(term) for term in terms or ()]]
+        if scope is not None:
+            # بدون scope يبقى المفتاح كما كان
+            parts.append(scope)
+        payload = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """قراءة نتيجة مخزنة وتحديث ترتيب استخدامها، أو None"""
+        item = self._entries.get(key)
+        if item is not None and item[0] > self._clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+        if item is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        """تخزين نتيجة مع حذف الأقدم استخداماً عند تجاوز الحجم الأقصى"""
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """إرجاع النتيجة المخزنة أو حسابها وتخزينها
+
+        عند تفعيل single_flight تنتظر الطلبات المتزامنة بنفس المفتاح نتيجة
+        الحساب الجاري بدلاً من تكراره. الأخطاء لا تُخزن وتصل لكل المنتظرين.
+
+        Returns:
+            Tuple[Any, bool]: النتيجة، وما إذا جاءت من الذاكرة المؤقتة أو من
+                حساب جارٍ لطلب آخر (أي لم يُستدعَ compute لهذا الطلب)
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        if not self.single_flight:
+            value = await compute()
+            self.set(key, value)
+            return value, False
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # تجنب تحذير "exception was never retrieved" عند عدم وجود منتظرين
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value, False
+        finally:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        """حذف كل النتائج المخزنة"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """عدادات الإصابة والإخفاق وحجم الذاكرة المؤقتة"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,238 @@
+"""
+محرك ترجمة مستقل عن المزودين
+
+سجل مزودين يُضاف إليه كل مزود بدالة ترجمة غير متزامنة (تعيد نصاً فارغاً
+عند الفشل) ودرجة ثقة. لكل طلب:
+- يُرتَّب المزودون: المزود المطلوب أولاً إن كان مسجلاً، ثم البقية حسب
+  الزمن المقاس (متوسط أسي للزمن مقسوماً على نسبة النجاح)
+- يُرسل الطلب للأول؛ إذا لم يرد خلال hedge_delay ثانية يُرسل أيضاً للتالي
+  (طلب تحوطي) وتُعتمد أول ترجمة ناجحة ويُلغى الباقي
+- عند الفشل يُنتقل مباشرة إلى المزود التالي
+
+المزود الذي يدعم البث يُسجل أيضاً بدالة بث تُستخدم عندما يطلب المستدعي
+أجزاء الترجمة أثناء وصولها (on_delta)، مع نفس التوجيه والتحوط والرجوع.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# (النص، لغة المصدر، اللغة الهدف، تعليمات إضافية) -> الترجمة أو "" عند الفشل
+ProviderFunc = Callable[[str, str, str, str], Awaitable[str]]
+# نفس المعاملات -> أجزاء الترجمة بالترتيب (ينتهي البث مبكراً عند الفشل)
+StreamFunc = Callable[[str, str, str, str], AsyncIterator[str]]
+# جزء من ترجمة تُبث أثناء وصولها
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+# أدنى نسبة نجاح في حساب الترتيب حتى لا يُقسم على صفر
+_MIN_SUCCESS_RATE = 0.05
+
+
+class Provider(NamedTuple):
+    name: str
+    translate: ProviderFunc
+    confidence: float
+    stream: Optional[StreamFunc] = None
+
+
+class Attempt(NamedTuple):
+    """محاولة واحدة ضمن طلب
+
+    reason: primary أو fallback (بعد فشل السابق) أو hedge (بعد انقضاء المهلة)
+    outcome: success أو failure أو cancelled (ألغيت بعد نجاح مزود آخر)
+    """
+    provider: str
+    reason: str
+    outcome: str
+    latency: float
+
+
+class EngineResult(NamedTuple):
+    text: str
+    confidence: float
+    provider: Optional[str]
+    attempts: List[Attempt]
+
+
+class ProviderStats:
+    """زمن ونسبة نجاح مزود بمتوسطات أسية"""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.success_rate = 1.0
+        self.successes = 0
+        self.failures = 0
+
+    def record(self, latency: float, success: bool) -> None:
+        if success:
+            self.successes += 1
+            # زمن الإخفاق لا يمثل زمن الترجمة (قد يكون رفضاً فورياً من قاطع الدائرة)
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        else:
+            self.failures += 1
+        self.success_rate += self.alpha * ((1.0 if success else 0.0) - self.success_rate)
+
+    @property
+    def expected_latency(self) -> float:
+        """الزمن المتوقع حتى ترجمة ناجحة؛ صفر لمزود لم يُقس بعد حتى يُجرَّب"""
+        if self.latency is None:
+            return 0.0 if self.failures == 0 else float("inf")
+        return self.latency / max(self.success_rate, _MIN_SUCCESS_RATE)
+
+    def as_dict(self) -> Dict:
+        return {
+            "latency": self.latency,
+            "success_rate": self.success_rate,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+class TranslationEngine:
+    """سجل المزودين وتوجيه الطلبات بينهم
+
+    Attributes:
+        hedge_delay (float, optional): الثواني قبل إرسال طلب تحوطي للمزود التالي؛
+            None لتعطيل الطلبات التحوطية
+    """
+
+    def __init__(
+        self,
+        hedge_delay: Optional[float] = 2.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.hedge_delay = hedge_delay
+        self.alpha = alpha
+        self._clock = clock
+        self.providers: Dict[str, Provider] = {}
+        self.stats: Dict[str, ProviderStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "TranslationEngine":
+        """إنشاء المحرك من PROVIDER_HEDGE_DELAY (فارغ أو off لتعطيل التحوط)"""
+        value = os.getenv("PROVIDER_HEDGE_DELAY", "2").strip().lower()
+        return cls(hedge_delay=None if value in ("", "off") else float(value))
+
+    def register(
+        self, name: str, translate: ProviderFunc, confidence: float, stream: Optional[StreamFunc] = None
+    ) -> None:
+        self.providers[name] = Provider(name, translate, confidence, stream)
+        self.stats.setdefault(name, ProviderStats(self.alpha))
+
+    def route(self, preferred: Optional[str] = None) -> List[str]:
+        """ترتيب تجربة المزودين لطلب جديد"""
+        # sorted مستقر: المزودون غير المقاسين يبقون بترتيب التسجيل
+        ranked = sorted(self.providers, key=lambda name: self.stats[name].expected_latency)
+        if preferred in self.providers:
+            ranked.remove(preferred)
+            ranked.insert(0, preferred)
+        elif preferred:
+            logger.warning("Unknown provider '%s', routing by measured latency", preferred)
+        return ranked
+
+    async def _call(
+        self,
+        provider: Provider,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        instructions: str,
+        on_delta: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    ):
+        start = self._clock()
+        try:
+            if on_delta is not None and provider.stream is not None:
+                parts = []
+                async for delta in provider.stream(text, source_lang, target_lang, instructions):
+                    parts.append(delta)
+                    await on_delta(provider.name, delta)
+                translated_text = "".join(parts).strip()
+            else:
+                translated_text = await provider.translate(text, source_lang, target_lang, instructions)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("%s translation failed: %s", provider.name, e)
+            translated_text = ""
+        latency = self._clock() - start
+        self.stats[provider.name].record(latency, bool(translated_text))
+        return translated_text, latency
+
+    async def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        preferred: Optional[str] = None,
+        instructions: str = "",
+        on_delta: Optional[DeltaCallback] = None,
+    ) -> EngineResult:
+        """ترجمة نص بأول مزود ينجح (نص فارغ إذا فشل الجميع)
+
+        المحاولات في النتيجة مرتبة حسب وقت إطلاقها.
+
+        Args:
+            on_delta (callable, optional): يُستدعى بأجزاء الترجمة من المزودين الذين
+                يدعمون البث. تُمرر أجزاء أول مزود يبدأ البث فقط حتى لا تختلط أجزاء
+                الطلبات التحوطية؛ النص في النتيجة هو المرجع النهائي إذا فشل ذلك
+                المزود بعد بدء البث ونجح غيره.
+        """
+        remaining = iter(self.route(preferred))
+        pending: Dict[asyncio.Task, tuple] = {}
+        attempts: Dict[int, Attempt] = {}
+        winner: Optional[Provider] = None
+        translated_text = ""
+        streaming: Optional[str] = None
+
+        async def forward(name: str, delta: str) -> None:
+            nonlocal streaming
+            if streaming is None:
+                streaming = name
+            if name == streaming:
+                await on_delta(delta)
+
+        def launch(reason: str) -> bool:
+            name = next(remaining, None)
+            if name is None:
+                return False
+            provider = self.providers[name]
+            task = asyncio.create_task(self._call(
+                provider, text, source_lang, target_lang, instructions, forward if on_delta is not None else None
+            ))
+            pending[task] = (len(attempts) + len(pending), provider, reason, self._clock())
+            return True
+
+        launch("primary")
+        try:
+            while pending and winner is None:
+                done, _ = await asyncio.wait(
+                    pending, timeout=self.hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                # انقضت مهلة التحوط دون رد: إرسال الطلب للمزود التالي أيضاً،
+                # أو انتظار الطلبات الجارية دون مهلة إذا لم يبق مزودون
+                if not done and launch("hedge"):
+                    continue
+                if not done:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, provider, reason, _ = pending.pop(task)
+                    result, latency = task.result()
+                    attempts[index] = Attempt(provider.name, reason, "success" if result else "failure", latency)
+                    if result and winner is None:
+                        winner, translated_text = provider, result
+                if winner is None and not pending:
+                    launch("fallback")
+        finally:
+            for task, (index, provider, reason, started) in pending.items():
+                task.cancel()
+                attempts[index] = Attempt(provider.name, reason, "cancelled", self._clock() - started)
+
+        ordered = [attempts[index] for index in sorted(attempts)]
+        if winner is None:
+            return EngineResult("", 0.0, None, ordered)
+        return EngineResult(translated_text, winner.confidence, winner.name, ordered)
@@ -1,69 +1,467 @@
 """
 خدمة إدارة ذاكرة الترجمة والسياق
 """
-from typing import List, Optional
-from datetime import datetime
+import asyncio
+import heapq
+import importlib.util
+import itertools
+import json
+import math
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import Any, Awaitable, Callable, Iterable, List, NamedTuple, Optional, Tuple
 from models.translation_memory import TranslationMemoryEntry, TranslationContext, Character, NovelContext
+from services.novel_bundle import NovelBundle
+from services.translation_memory_store import CompactStore, TranslationMemoryStore
+
+# أقصى مساهمة لدرجة السياق في الدرجة المجمعة
+CONTEXT_WEIGHT = 0.3
+TEXT_WEIGHT = 0.7
+# هامش لتفادي استبعاد مرشح صالح بسبب أخطاء التقريب العشري
+_EPSILON = 1e-9
+
+
+def tokenize(text: str) -> frozenset:
+    """تقسيم النص إلى مجموعة كلمات بنفس قواعد حساب التشابه"""
+    return frozenset(text.lower().split())
+
+
+def normalize_text(text: str) -> str:
+    """توحيد النص المصدر للمطابقة التامة (صيغة يونيكود والمسافات)"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def exact_key(text: str, novel_title: Optional[str], target_lang: Optional[str]) -> str:
+    """مفتاح فهرس المطابقة التامة"""
+    return json.dumps([normalize_text(text), novel_title, target_lang], ensure_ascii=False)
+
+
+def jaccard(words1: frozenset, words2: frozenset) -> float:
+    """معامل جاكارد بين مجموعتي كلمات"""
+    if not words1 and not words2:
+        return 0
+    intersection = len(words1 & words2)
+    return intersection / (len(words1) + len(words2) - intersection)
+
+
+class MemoryMatch(NamedTuple):
+    """نتيجة بحث خفيفة تشير إلى المدخل المخزن دون نسخه أو تعديله"""
+    entry_id: int
+    score: float
+    frequency: int
+
+
+class ImportReport(NamedTuple):
+    """نتيجة استيراد دفعات من المدخلات"""
+    created: int
+    updated: int
+    seconds: float
+
+    @property
+    def entries_per_second(self) -> float:
+        total = self.created + self.updated
+        return total / self.seconds if self.seconds > 0 else float(total)
+
+
+def _rank(match: MemoryMatch) -> tuple:
+    # الأعلى درجة ثم الأكثر تكراراً، وعند التساوي الأقدم إضافة
+    return -match.score, -match.frequency, match.entry_id
+
+
+class _EntryView(Sequence):
+    """عرض للقراءة فقط لمدخلات واجهة التخزين يبني النماذج عند الوصول إليها"""
+
+    def __init__(self, store: TranslationMemoryStore):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, entry_id: int) -> TranslationMemoryEntry:
+        if entry_id < 0:
+            entry_id += len(self)
+        return self._store.get(entry_id)
+
 
 class TranslationMemoryService:
-    def __init__(self):
-        self.memory_entries: List[TranslationMemoryEntry] = []
-        self.novel_contexts: dict[str, NovelContext] = {}
-        
+    def __init__(
+        self,
+        store: Optional[TranslationMemoryStore] = None,
+        vectorized: Optional[bool] = None,
+        shared_index=None,
+        run_blocking: Optional[Callable[..., Awaitable]] = None,
+    ):
+        """
+        Args:
+            store (TranslationMemoryStore, optional): واجهة التخزين (CompactStore افتراضياً)
+            vectorized (bool, optional): تقييم التشابه التقريبي عبر NumPy
+                (services.vector_scoring)؛ افتراضياً عند توفر numpy
+            shared_index (SharedIndexReader, optional): فهرس مشترك بين العمليات
+                (services.shared_index) يغطي أول مدخلات واجهة التخزين، فلا تُفهرس
+                محلياً إلا المدخلات المضافة بعد آخر إصدار منه
+            run_blocking (callable, optional): تشغيل دالة متزامنة خارج حلقة الأحداث
+                (مثل BlockingPool.run)؛ تُستخدم لعمليات واجهات التخزين المعطِّلة (SQLite)
+        """
+        self.store = store if store is not None else CompactStore()
+        self.run_blocking = run_blocking
+        # العمليات المنفذة في الخيوط تتسلسل كما كانت تتسلسل على حلقة الأحداث،
+        # فلا تُفهرس نفس الصفوف مرتين ولا تُقرأ الفهارس أثناء إعادة بنائها
+        self._lock = threading.RLock()
+        self.shared_index = shared_index
+        # إصدار الفهرس المشترك المستخدم في الاستعلام الحالي، وعدد المدخلات التي يغطيها؛
+        # الفهارس المحلية أدناه تبدأ من المعرف _base
+        self._shared = None
+        self._base = 0
+        if vectorized is None:
+            vectorized = importlib.util.find_spec("numpy") is not None
+        self.vectorized = vectorized
+        # يُبنى عند أول بحث تقريبي حتى لا تُقرأ سياقات المدخلات عند بدء التشغيل
+        self._scorer = None
+        # حزم الروايات المترجمة مسبقاً: عنوان الرواية -> (نسخة السياق في واجهة
+        # التخزين، NovelBundle)؛ تُبنى عند أول طلب وتُعاد عند تغير النسخة
+        self._novel_bundles: dict[str, Tuple[int, NovelBundle]] = {}
+        # فهرس مقلوب: كلمة -> معرفات المدخلات
+        self._token_index: defaultdict[str, List[int]] = defaultdict(list)
+        # مجموعات الكلمات المحسوبة مسبقاً لكل مدخل
+        self._entry_tokens: List[frozenset] = []
+        # فهرس المطابقة التامة: (النص الموحد، الرواية، اللغة الهدف) -> معرف المدخل
+        self._exact_index: dict[str, int] = {}
+        # الفهارس تُبنى من المفاتيح النصية فقط دون بناء نماذج المدخلات
+        self._sync_index()
+
+    @property
+    def entry_count(self) -> int:
+        """عدد المدخلات المفهرسة (دون عدّ الصفوف في واجهة التخزين)"""
+        with self._lock:
+            self._sync_index()
+            return self._base + len(self._entry_tokens)
+
+    async def revision(self) -> int:
+        """رقم يتغير كلما أُضيف مدخل جديد من هذه العملية أو غيرها
+
+        تُستخدم في مفاتيح التخزين المؤقت حتى لا تُعاد ترجمة مزود خُزنت قبل
+        إضافة مدخل مطابق (زيادة تكرار مدخل موجود لا تغيّرها).
+        """
+        return await self._run(lambda: self.entry_count)
+
+    @property
+    def memory_entries(self) -> Sequence:
+        """المدخلات المخزنة بترتيب الإضافة"""
+        return _EntryView(self.store)
+
+    async def _run(self, func: Callable, *args: Any):
+        """تنفيذ عملية متزامنة على الفهارس وواجهة التخزين
+
+        مع واجهة تخزين معطِّلة وrun_blocking تُنفذ في خيط تحت قفل الخدمة حتى
+        لا توقف استعلامات SQLite حلقة الأحداث، وإلا تُنفذ مباشرة.
+        """
+        if self.run_blocking is None or not self.store.blocking:
+            return func(*args)
+        return await self.run_blocking(self._locked, func, *args)
+
+    def _locked(self, func: Callable, *args: Any):
+        with self._lock:
+            return func(*args)
+
     async def add_entry(self, entry: TranslationMemoryEntry) -> None:
         """إضافة مدخل جديد إلى ذاكرة الترجمة"""
-        # البحث عن مدخل مشابه
-        for existing in self.memory_entries:
-            if existing.original_text == entry.original_text:
-                existing.frequency += 1
-                existing.last_used = datetime.now()
-                return
-        self.memory_entries.append(entry)
+        await self._run(self._add_entry, entry)
+
+    def _add_entry(self, entry: TranslationMemoryEntry) -> None:
+        self._sync_index()
+        # البحث عن مدخل مطابق
+        key = exact_key(entry.original_text, entry.novel_title, entry.target_lang)
+        entry_id = self._find_exact_id(key)
+        if entry_id is not None:
+            self.store.touch(entry_id)
+            return
+        # قد تكون عملية أخرى أضافت نفس المدخل، وتتولى واجهة التخزين ذلك
+        self.store.add(key, entry)
+        self._sync_index()
     
+    async def import_entries(
+        self,
+        entries: Iterable[TranslationMemoryEntry],
+        batch_size: int = 1000,
+        read_blocking: Optional[Callable[..., Awaitable]] = None,
+    ) -> ImportReport:
+        """إضافة عدد كبير من المدخلات على دفعات
+
+        تُكتب كل دفعة في واجهة التخزين دفعة واحدة (معاملة واحدة في SQLite)
+        وتُحدَّث فهارس المطابقة التامة والبحث التقريبي مرة واحدة لكل دفعة.
+        المدخلات الموجودة مسبقاً يزداد تكرارها كما في add_entry. تُستهلك
+        entries تدريجياً، فيمكن أن تكون مولداً يقرأ ملفاً كبيراً.
+
+        Args:
+            read_blocking (callable, optional): تشغيل قراءة كل دفعة من entries
+                خارج حلقة الأحداث (مثل BlockingPool.run) عندما يحلل المولد ملفاً
+                ويتحقق من مدخلاته
+        """
+        start = time.perf_counter()
+        created = updated = 0
+        iterator = iter(entries)
+        while True:
+            if read_blocking is not None:
+                batch = await read_blocking(list, itertools.islice(iterator, batch_size))
+            else:
+                batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                break
+            results = await self._run(self._import_batch, batch)
+            batch_created = sum(1 for _, is_new in results if is_new)
+            created += batch_created
+            updated += len(results) - batch_created
+            # إفساح المجال لبقية الطلبات بين الدفعات
+            await asyncio.sleep(0)
+        return ImportReport(created, updated, time.perf_counter() - start)
+
+    def _import_batch(self, batch: List[TranslationMemoryEntry]) -> list:
+        results = self.store.add_many([
+            (exact_key(entry.original_text, entry.novel_title, entry.target_lang), entry)
+            for entry in batch
+        ])
+        self._sync_index()
+        return results
+
     async def find_similar_translations(
         self,
         text: str,
         context: Optional[TranslationContext] = None,
-        threshold: float = 0.8
-    ) -> List[TranslationMemoryEntry]:
-        """البحث عن ترجمات مشابهة"""
-        similar_entries = []
-        for entry in self.memory_entries:
-            similarity_score = self._calculate_similarity(text, entry.original_text)
-            context_score = self._calculate_context_similarity(context, entry.context) if context else 1.0
-            
-            combined_score = similarity_score * 0.7 + context_score * 0.3
+        threshold: float = 0.8,
+        novel_title: Optional[str] = None,
+        target_lang: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[MemoryMatch]:
+        """البحث عن ترجمات مشابهة
+
+        يُستخدم الفهرس المقلوب لاستبعاد المدخلات التي لا يمكن أن تبلغ العتبة قبل
+        حساب التشابه الدقيق. المدخل المطابق تماماً (بعد توحيد النص) يُرتب ضمن
+        النتائج بتشابه نصي كامل حتى لو اختلفت كلماته بعد التوحيد.
+
+        لا تُعدَّل المدخلات المخزنة؛ تُعاد سجلات (المعرف، الدرجة، التكرار) مرتبة
+        تنازلياً حسب الدرجة ثم التكرار، ويُستخدم get_matched_entries لبناء المدخلات.
+
+        Args:
+            limit (int, optional): أقصى عدد نتائج؛ تُختار عبر كومة محدودة بدلاً
+                من ترتيب كل النتائج
+        """
+        return await self._run(self._find_similar, text, context, threshold, novel_title, target_lang, limit)
+
+    def _find_similar(
+        self,
+        text: str,
+        context: Optional[TranslationContext],
+        threshold: float,
+        novel_title: Optional[str],
+        target_lang: Optional[str],
+        limit: Optional[int],
+    ) -> List[MemoryMatch]:
+        self._sync_index()
+        query_tokens = tokenize(text)
+        # بلا سياق يكفي مرشحا الطول والبادئة للعتبات المعتادة وهما أسرع؛ أما مع
+        # السياق أو العتبات المنخفضة فكل مدخل تقريباً مرشح ويُقيَّم الجميع دفعة واحدة
+        if self._shared is not None:
+            # المدخلات المشمولة بالفهرس المشترك تُقيَّم على مصفوفاته، والأحدث محلياً
+            entry_ids, scores = self._shared.scorer.top_k(
+                query_tokens, context, threshold, k=limit, keep_ties=True
+            )
+            scored = list(zip(entry_ids.tolist(), scores.tolist()))
+            scored += self._score_candidates(query_tokens, context, threshold)
+        elif self.vectorized and (context is not None or threshold <= CONTEXT_WEIGHT):
+            entry_ids, scores = self._vector_scorer().top_k(
+                query_tokens, context, threshold, k=limit, keep_ties=True
+            )
+            scored = list(zip(entry_ids.tolist(), scores.tolist()))
+        else:
+            scored = self._score_candidates(query_tokens, context, threshold)
+
+        exact_id = self._find_exact_id(exact_key(text, novel_title, target_lang))
+        if exact_id is not None:
+            exact = self.store.get(exact_id)
+            context_score = self._calculate_context_similarity(context, exact.context) if context else 1.0
+            combined_score = TEXT_WEIGHT + context_score * CONTEXT_WEIGHT
+            scored = [(entry_id, score) for entry_id, score in scored if entry_id != exact_id]
             if combined_score >= threshold:
-                entry.confidence_score = combined_score
-                similar_entries.append(entry)
-        
-        return sorted(similar_entries, key=lambda x: (x.confidence_score, x.frequency), reverse=True)
+                scored.append((exact_id, combined_score))
+
+        entry_ids, scores = zip(*scored) if scored else ((), ())
+        matches = map(MemoryMatch, entry_ids, scores, self.store.frequencies(entry_ids))
+        if limit is not None:
+            return heapq.nsmallest(limit, matches, key=_rank)
+        return sorted(matches, key=_rank)
+
+    async def get_matched_entries(self, matches: List[MemoryMatch]) -> List[TranslationMemoryEntry]:
+        """نسخ من المدخلات المطابقة تحمل درجة التشابه في confidence_score"""
+        return await self._run(lambda: [
+            self.store.get(match.entry_id).model_copy(update={"confidence_score": match.score})
+            for match in matches
+        ])
     
+    async def find_exact(
+        self,
+        text: str,
+        novel_title: Optional[str] = None,
+        target_lang: Optional[str] = None
+    ) -> Optional[TranslationMemoryEntry]:
+        """البحث عن مدخل مطابق تماماً للنص في نفس الرواية واللغة الهدف"""
+        return await self._run(self._find_exact, exact_key(text, novel_title, target_lang))
+
+    def _find_exact(self, key: str) -> Optional[TranslationMemoryEntry]:
+        self._sync_index()
+        entry_id = self._find_exact_id(key)
+        return self.store.get(entry_id) if entry_id is not None else None
+
     async def add_novel_context(self, novel_title: str, context: NovelContext) -> None:
-        """إضافة سياق جديد لرواية"""
-        self.novel_contexts[novel_title] = context
+        """إضافة سياق جديد لرواية وإعادة بناء حزمتها فقط"""
+        await self._run(self._add_novel_context, novel_title, context)
+
+    def _add_novel_context(self, novel_title: str, context: NovelContext) -> None:
+        version = self.store.save_novel_context(novel_title, context)
+        self._build_novel_bundle(novel_title, version, context)
+
+    async def get_novel_bundle(self, novel_title: str) -> Optional[NovelBundle]:
+        """الحزمة المترجمة مسبقاً لرواية، أو None إذا لم يُحفظ لها سياق
+
+        تُقارن نسخة السياق في واجهة التخزين عند كل طلب، فتُعاد بناء الحزمة
+        عندما تحدّث عملية أخرى سياق الرواية على SQLite.
+        """
+        return await self._run(self._get_novel_bundle, novel_title)
+
+    def _get_novel_bundle(self, novel_title: str) -> Optional[NovelBundle]:
+        version = self.store.novel_context_version(novel_title)
+        if version is None:
+            return None
+        cached = self._novel_bundles.get(novel_title)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        context = self.store.get_novel_context(novel_title)
+        if context is None:
+            return None
+        return self._build_novel_bundle(novel_title, version, context)
+
+    def _build_novel_bundle(self, novel_title: str, version: int, context: NovelContext) -> NovelBundle:
+        cached = self._novel_bundles.get(novel_title)
+        bundle = NovelBundle(novel_title, context, cached[1] if cached is not None else None)
+        self._novel_bundles[novel_title] = (version, bundle)
+        return bundle
     
     async def get_character_translations(self, novel_title: str) -> List[Character]:
         """الحصول على ترجمات الشخصيات في رواية معينة"""
-        if novel_title in self.novel_contexts:
-            return self.novel_contexts[novel_title].characters
+        bundle = await self.get_novel_bundle(novel_title)
+        if bundle is not None:
+            return bundle.context.characters
         return []
     
     async def update_context(self, entry_id: int, context: TranslationContext) -> None:
         """تحديث سياق مدخل معين"""
-        if 0 <= entry_id < len(self.memory_entries):
-            self.memory_entries[entry_id].context = context
+        await self._run(self._update_context, entry_id, context)
+
+    def _update_context(self, entry_id: int, context: TranslationContext) -> None:
+        self._sync_index()
+        if 0 <= entry_id < self._base + len(self._entry_tokens):
+            if self._scorer is not None and entry_id < len(self._scorer):
+                self._scorer.update_context(entry_id, self.store.get(entry_id).context, context)
+            self.store.update_context(entry_id, context)
     
+    def _sync_index(self) -> None:
+        """فهرسة المدخلات التي أضيفت إلى واجهة التخزين منذ آخر مزامنة
+
+        عند مشاركة SQLite بين عدة عمليات تظهر هنا المدخلات التي أضافتها
+        العمليات الأخرى. مع الفهرس المشترك تُفهرس محلياً فقط المدخلات التي
+        لم يشملها إصداره الحالي، وتُحذف من الفهارس المحلية عند نشر إصدار يشملها.
+        """
+        if self.shared_index is not None:
+            self._shared = self.shared_index.current()
+            base = self._shared.count if self._shared is not None else 0
+            if base != self._base:
+                self._base = base
+                self._token_index = defaultdict(list)
+                self._entry_tokens = []
+                self._exact_index = {}
+        after_id = self._base + len(self._entry_tokens) - 1
+        for entry_id, original_text, novel_title, target_lang in self.store.iter_keys(after_id):
+            self._exact_index[exact_key(original_text, novel_title, target_lang)] = entry_id
+            tokens = tokenize(original_text)
+            self._entry_tokens.append(tokens)
+            for token in tokens:
+                self._token_index[token].append(entry_id)
+
+    def _find_exact_id(self, key: str) -> Optional[int]:
+        entry_id = self._exact_index.get(key)
+        if entry_id is None and self._shared is not None:
+            entry_id = self._shared.find_exact(key)
+        return entry_id
+
+    def _score_candidates(
+        self, query_tokens: frozenset, context: Optional[TranslationContext], threshold: float
+    ) -> List[tuple]:
+        """(المعرف، الدرجة) للمدخلات المفهرسة محلياً التي تبلغ العتبة، مدخلاً مدخلاً"""
+        scored = []
+        for entry_id in self._candidate_ids(query_tokens, threshold):
+            similarity_score = jaccard(query_tokens, self._entry_tokens[entry_id - self._base])
+            context_score = (
+                self._calculate_context_similarity(context, self.store.get(entry_id).context)
+                if context else 1.0
+            )
+            combined_score = similarity_score * TEXT_WEIGHT + context_score * CONTEXT_WEIGHT
+            if combined_score >= threshold:
+                scored.append((entry_id, combined_score))
+        return scored
+
+    def _vector_scorer(self):
+        """المقيم المتجه بعد فهرسة المدخلات الجديدة فيه
+
+        تُقرأ سياقات المدخلات مرة واحدة عند فهرستها؛ تحديثات السياق التي
+        تجريها عمليات أخرى على SQLite لا تظهر هنا حتى إعادة التشغيل.
+        """
+        if self._scorer is None:
+            from services.vector_scoring import VectorScorer
+            self._scorer = VectorScorer()
+        self._sync_index()
+        new_ids = range(len(self._scorer), len(self._entry_tokens))
+        for entry_id, context in zip(new_ids, self.store.contexts(new_ids)):
+            self._scorer.add(self._entry_tokens[entry_id], context)
+        return self._scorer
+
+    def _candidate_ids(self, query_tokens: frozenset, threshold: float) -> List[int]:
+        """المدخلات المرشحة التي قد تبلغ العتبة، مرتبة حسب ترتيب الإضافة
+
+        درجة السياق لا تتجاوز 1، لذا يجب أن يبلغ تشابه النص على الأقل
+        (threshold - 0.3) / 0.7. من هذا الحد الأدنى نشتق:
+        - مرشح الطول: s * |A| <= |B| <= |A| / s
+        - مرشح البادئة: يكفي البحث في أندر |A| - ceil(s * |A|) + 1 كلمة
+          من كلمات الاستعلام، فأي مدخل يحقق الحد الأدنى يشترك في إحداها.
+        """
+        min_similarity = (threshold - CONTEXT_WEIGHT) / TEXT_WEIGHT - _EPSILON
+        if min_similarity <= 0:
+            # حتى المدخلات بلا كلمات مشتركة قد تبلغ العتبة
+            return list(range(self._base, self._base + len(self._entry_tokens)))
+        if not query_tokens:
+            return []
+
+        query_size = len(query_tokens)
+        min_overlap = max(1, math.ceil(min_similarity * query_size))
+        prefix_size = query_size - min_overlap + 1
+        rarest = sorted(query_tokens, key=lambda token: len(self._token_index.get(token, ())))
+
+        min_size = min_similarity * query_size
+        max_size = query_size / min_similarity
+        candidates = set()
+        for token in rarest[:prefix_size]:
+            for entry_id in self._token_index.get(token, ()):
+                if min_size <= len(self._entry_tokens[entry_id - self._base]) <= max_size:
+                    candidates.add(entry_id)
+        return sorted(candidates)
+
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """حساب درجة التشابه بين نصين"""
         # يمكن استخدام خوارزميات مثل Levenshtein distance
         # أو استخدام نماذج التشابه الدلالي
         # هذا تنفيذ بسيط للتوضيح
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        return len(intersection) / len(union) if union else 0
+        return jaccard(tokenize(text1), tokenize(text2))
     
     def _calculate_context_similarity(self, context1: TranslationContext, context2: TranslationContext) -> float:
         """حساب درجة التشابه بين سياقين"""
@@ -0,0 +1,580 @@
+"""
+واجهات تخزين ذاكرة الترجمة
+
+- CompactStore: التخزين الافتراضي داخل العملية بتمثيل عمودي مضغوط (يفقد عند إعادة التشغيل)
+- InMemoryStore: يحتفظ بنماذج Pydantic نفسها داخل العملية
+- SQLiteStore: تخزين دائم في SQLite بوضع WAL تتشاركه عدة عمليات
+
+معرفات المدخلات أعداد صحيحة متتالية تبدأ من صفر، وتُقرأ المفاتيح النصية فقط
+عند بناء الفهارس (iter_keys) بينما تُبنى نماذج Pydantic عند الطلب (get).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from models.translation_memory import Character, NovelContext, TranslationContext, TranslationMemoryEntry
+
+# (المعرف، النص الأصلي، عنوان الرواية، اللغة الهدف)
+EntryKey = Tuple[int, str, Optional[str], Optional[str]]
+
+
+class TranslationMemoryStore(ABC):
+    """الواجهة المشتركة لواجهات تخزين ذاكرة الترجمة"""
+
+    # هل تنتظر العمليات قرصاً أو أقفال عمليات أخرى (فتُنفذ خارج حلقة الأحداث)
+    blocking = False
+
+    @abstractmethod
+    def add(self, key: str, entry: TranslationMemoryEntry) -> Tuple[int, bool]:
+        """إضافة مدخل، أو زيادة تكراره إن وُجد مدخل بنفس المفتاح.
+
+        Returns:
+            Tuple[int, bool]: معرف المدخل وما إذا كان قد أُنشئ للتو
+        """
+
+    def add_many(self, items: Sequence[Tuple[str, TranslationMemoryEntry]]) -> List[Tuple[int, bool]]:
+        """إضافة دفعة من (المفتاح، المدخل) بنفس دلالة add لكل عنصر"""
+        return [self.add(key, entry) for key, entry in items]
+
+    @abstractmethod
+    def get(self, entry_id: int) -> TranslationMemoryEntry:
+        """قراءة مدخل بمعرفه"""
+
+    def frequencies(self, entry_ids: Sequence[int]) -> List[int]:
+        """تكرار عدة مدخلات دون بناء النماذج حيث أمكن"""
+        return [self.get(entry_id).frequency for entry_id in entry_ids]
+
+    def contexts(self, entry_ids: Sequence[int]) -> List[TranslationContext]:
+        """سياقات عدة مدخلات دون بناء النماذج حيث أمكن"""
+        return [self.get(entry_id).context for entry_id in entry_ids]
+
+    @abstractmethod
+    def touch(self, entry_id: int) -> None:
+        """زيادة تكرار مدخل موجود وتحديث آخر استخدام له"""
+
+    @abstractmethod
+    def update_context(self, entry_id: int, context: TranslationContext) -> None:
+        """تحديث سياق مدخل موجود (يزيد context_revision)"""
+
+    @abstractmethod
+    def context_revision(self) -> int:
+        """عدد تحديثات السياق منذ إنشاء واجهة التخزين (من كل العمليات)"""
+
+    @abstractmethod
+    def iter_keys(self, after_id: int = -1) -> Iterator[EntryKey]:
+        """المفاتيح النصية للمدخلات ذات المعرف الأكبر من after_id بترتيب تصاعدي"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """عدد المدخلات"""
+
+    @abstractmethod
+    def save_novel_context(self, novel_title: str, context: NovelContext) -> int:
+        """حفظ سياق رواية (يستبدل السياق السابق)
+
+        Returns:
+            int: نسخة السياق المحفوظ (تزداد مع كل حفظ للرواية)
+        """
+
+    @abstractmethod
+    def get_novel_context(self, novel_title: str) -> Optional[NovelContext]:
+        """قراءة سياق رواية"""
+
+    @abstractmethod
+    def novel_context_version(self, novel_title: str) -> Optional[int]:
+        """نسخة سياق رواية دون قراءته، أو None إذا لم يُحفظ لها سياق"""
+
+
+class InMemoryStore(TranslationMemoryStore):
+    """تخزين داخل العملية يحتفظ بالنماذج نفسها"""
+
+    def __init__(self):
+        self.entries: List[TranslationMemoryEntry] = []
+        self.keys: Dict[str, int] = {}
+        self._context_revision = 0
+        self.novel_contexts: Dict[str, NovelContext] = {}
+        self.novel_versions: Dict[str, int] = {}
+
+    def add(self, key: str, entry: TranslationMemoryEntry) -> Tuple[int, bool]:
+        entry_id = self.keys.get(key)
+        if entry_id is not None:
+            self.touch(entry_id)
+            return entry_id, False
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self.keys[key] = entry_id
+        return entry_id, True
+
+    def get(self, entry_id: int) -> TranslationMemoryEntry:
+        return self.entries[entry_id]
+
+    def frequencies(self, entry_ids: Sequence[int]) -> List[int]:
+        return [self.entries[entry_id].frequency for entry_id in entry_ids]
+
+    def touch(self, entry_id: int) -> None:
+        entry = self.entries[entry_id]
+        entry.frequency += 1
+        entry.last_used = datetime.now()
+
+    def update_context(self, entry_id: int, context: TranslationContext) -> None:
+        self.entries[entry_id].context = context
+        self._context_revision += 1
+
+    def context_revision(self) -> int:
+        return self._context_revision
+
+    def iter_keys(self, after_id: int = -1) -> Iterator[EntryKey]:
+        for entry_id in range(after_id + 1, len(self.entries)):
+            entry = self.entries[entry_id]
+            yield entry_id, entry.original_text, entry.novel_title, entry.target_lang
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save_novel_context(self, novel_title: str, context: NovelContext) -> int:
+        self.novel_contexts[novel_title] = context
+        version = self.novel_versions[novel_title] = self.novel_versions.get(novel_title, 0) + 1
+        return version
+
+    def get_novel_context(self, novel_title: str) -> Optional[NovelContext]:
+        return self.novel_contexts.get(novel_title)
+
+    def novel_context_version(self, novel_title: str) -> Optional[int]:
+        return self.novel_versions.get(novel_title)
+
+
+class _Interner:
+    """جدول قيم مكررة: كل قيمة تُحفظ مرة واحدة ويُشار إليها برمز صحيح"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Hashable, int] = {}
+
+    def code(self, value: Hashable) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _TextColumn:
+    """نصوص متتالية في مخزن UTF-8 واحد بدلاً من كائن str لكل نص
+
+    استبدال نص يضيف النص الجديد في آخر المخزن دون استعادة مساحة القديم،
+    وهذا مقبول لأن الاستبدال نادر (تحديث السياق فقط).
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._starts = array("q")
+        # -1 تعني None
+        self._lengths = array("q")
+
+    def _write(self, value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return 0, -1
+        encoded = value.encode("utf-8")
+        start = len(self._data)
+        self._data += encoded
+        return start, len(encoded)
+
+    def append(self, value: Optional[str]) -> None:
+        start, length = self._write(value)
+        self._starts.append(start)
+        self._lengths.append(length)
+
+    def set(self, index: int, value: Optional[str]) -> None:
+        self._starts[index], self._lengths[index] = self._write(value)
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        length = self._lengths[index]
+        if length < 0:
+            return None
+        start = self._starts[index]
+        return self._data[start:start + length].decode("utf-8")
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class CompactStore(TranslationMemoryStore):
+    """تخزين عمودي مضغوط داخل العملية
+
+    لا تُحفظ نماذج Pydantic: النصوص في مخازن UTF-8 متصلة، والقيم المتكررة
+    (عنوان الرواية، اللغة، نوع المشهد، الوسوم، الشخصيات...) تُحفظ مرة واحدة
+    ويُشار إليها برموز صحيحة، والحقول الرقمية في مصفوفات array. يُبنى النموذج
+    فقط عند قراءة المدخل (get)، لذا تعديل النموذج المعاد لا يغير المخزن.
+    """
+
+    def __init__(self):
+        self._texts = {name: _TextColumn() for name in ("original", "translated", "previous", "next")}
+        self._interned = {
+            name: _Interner()
+            for name in ("novel_title", "target_lang", "chapter_id", "scene_type",
+                         "chapter_number", "chapter_title", "tags", "characters", "tzinfo")
+        }
+        self._codes = {name: array("i") for name in self._interned}
+        self._frequency = array("q")
+        # آخر استخدام بالميكروثانية منذ 1970 (بالتوقيت المحلي للقيمة نفسها، وtzinfo منفصلة)
+        self._last_used = array("q")
+        self._confidence = array("d")
+        # بصمة المفتاح بدلاً منه لأن المفتاح يحتوي النص الأصلي كاملاً
+        self._keys: Dict[bytes, int] = {}
+        self._context_revision = 0
+        self.novel_contexts: Dict[str, NovelContext] = {}
+        self.novel_versions: Dict[str, int] = {}
+
+    def _set_code(self, name: str, value: Hashable, index: Optional[int] = None) -> None:
+        code = self._interned[name].code(value)
+        if index is None:
+            self._codes[name].append(code)
+        else:
+            self._codes[name][index] = code
+
+    def _value(self, name: str, entry_id: int) -> Any:
+        return self._interned[name].values[self._codes[name][entry_id]]
+
+    def _set_context(self, context: TranslationContext, index: Optional[int] = None) -> None:
+        if index is None:
+            self._texts["previous"].append(context.previous_paragraph)
+            self._texts["next"].append(context.next_paragraph)
+        else:
+            self._texts["previous"].set(index, context.previous_paragraph)
+            self._texts["next"].set(index, context.next_paragraph)
+        self._set_code("scene_type", context.scene_type, index)
+        self._set_code("chapter_number", context.chapter_number, index)
+        self._set_code("chapter_title", context.chapter_title, index)
+
+    def _set_last_used(self, value: datetime, index: Optional[int] = None) -> None:
+        micros = (value.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+        if index is None:
+            self._last_used.append(micros)
+        else:
+            self._last_used[index] = micros
+        self._set_code("tzinfo", value.tzinfo, index)
+
+    def add(self, key: str, entry: TranslationMemoryEntry) -> Tuple[int, bool]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        entry_id = self._keys.get(digest)
+        if entry_id is not None:
+            self.touch(entry_id)
+            return entry_id, False
+        entry_id = len(self._frequency)
+        self._texts["original"].append(entry.original_text)
+        self._texts["translated"].append(entry.translated_text)
+        self._set_context(entry.context)
+        self._set_code("novel_title", entry.novel_title)
+        self._set_code("target_lang", entry.target_lang)
+        self._set_code("chapter_id", entry.chapter_id)
+        self._set_code("tags", tuple(entry.tags))
+        self._set_code("characters", tuple(
+            (c.name_original, c.name_translated, c.description, tuple(c.aliases)) for c in entry.characters
+        ))
+        self._frequency.append(entry.frequency)
+        self._set_last_used(entry.last_used)
+        self._confidence.append(entry.confidence_score)
+        self._keys[digest] = entry_id
+        return entry_id, True
+
+    def get(self, entry_id: int) -> TranslationMemoryEntry:
+        if not 0 <= entry_id < len(self._frequency):
+            raise IndexError(entry_id)
+        # القيم تحققت منها Pydantic عند الإضافة، فيكفي model_construct هنا
+        context = TranslationContext.model_construct(
+            previous_paragraph=self._texts["previous"][entry_id],
+            next_paragraph=self._texts["next"][entry_id],
+            scene_type=self._value("scene_type", entry_id),
+            chapter_number=self._value("chapter_number", entry_id),
+            chapter_title=self._value("chapter_title", entry_id),
+        )
+        characters = [
+            Character.model_construct(
+                name_original=name_original, name_translated=name_translated,
+                description=description, aliases=list(aliases),
+            )
+            for name_original, name_translated, description, aliases in self._value("characters", entry_id)
+        ]
+        last_used = (_EPOCH + self._last_used[entry_id] * _MICROSECOND).replace(
+            tzinfo=self._value("tzinfo", entry_id)
+        )
+        return TranslationMemoryEntry.model_construct(
+            original_text=self._texts["original"][entry_id],
+            translated_text=self._texts["translated"][entry_id],
+            context=context,
+            frequency=self._frequency[entry_id],
+            last_used=last_used,
+            characters=characters,
+            tags=list(self._value("tags", entry_id)),
+            novel_title=self._value("novel_title", entry_id),
+            target_lang=self._value("target_lang", entry_id),
+            chapter_id=self._value("chapter_id", entry_id),
+            confidence_score=self._confidence[entry_id],
+        )
+
+    def frequencies(self, entry_ids: Sequence[int]) -> List[int]:
+        frequency = self._frequency
+        return [frequency[entry_id] for entry_id in entry_ids]
+
+    def touch(self, entry_id: int) -> None:
+        self._frequency[entry_id] += 1
+        self._set_last_used(datetime.now(), entry_id)
+
+    def update_context(self, entry_id: int, context: TranslationContext) -> None:
+        self._set_context(context, entry_id)
+        self._context_revision += 1
+
+    def context_revision(self) -> int:
+        return self._context_revision
+
+    def iter_keys(self, after_id: int = -1) -> Iterator[EntryKey]:
+        for entry_id in range(after_id + 1, len(self._frequency)):
+            yield (
+                entry_id,
+                self._texts["original"][entry_id],
+                self._value("novel_title", entry_id),
+                self._value("target_lang", entry_id),
+            )
+
+    def __len__(self) -> int:
+        return len(self._frequency)
+
+    def save_novel_context(self, novel_title: str, context: NovelContext) -> int:
+        self.novel_contexts[novel_title] = context
+        version = self.novel_versions[novel_title] = self.novel_versions.get(novel_title, 0) + 1
+        return version
+
+    def get_novel_context(self, novel_title: str) -> Optional[NovelContext]:
+        return self.novel_contexts.get(novel_title)
+
+    def novel_context_version(self, novel_title: str) -> Optional[int]:
+        return self.novel_versions.get(novel_title)
+
+
+class SQLiteStore(TranslationMemoryStore):
+    """تخزين دائم في SQLite بوضع WAL
+
+    يسمح وضع WAL لعدة عمليات (عمال uvicorn) بالقراءة المتزامنة مع كاتب واحد،
+    فتتشارك كل العمليات نفس الذاكرة. يُحفظ المدخل كاملاً بصيغة JSON مع أعمدة
+    منفصلة للمفاتيح والحقول المتغيرة (التكرار وآخر استخدام) حتى لا يلزم فك
+    JSON إلا عند قراءة المدخل نفسه.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS memory_entries (
+                id INTEGER PRIMARY KEY,
+                exact_key TEXT NOT NULL UNIQUE,
+                original_text TEXT NOT NULL,
+                novel_title TEXT,
+                target_lang TEXT,
+                frequency INTEGER NOT NULL,
+                last_used TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS novel_contexts (
+                novel_title TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE TABLE IF NOT EXISTS memory_meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        # قواعد أُنشئت قبل إضافة عمود النسخة
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(novel_contexts)")}
+        if "version" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE novel_contexts ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            except sqlite3.OperationalError:
+                # أضافته عملية أخرى في نفس اللحظة
+                pass
+
+    # معرفات SQLite تبدأ من 1 بينما تبدأ معرفات المدخلات من صفر
+    def _insert(self, key: str, entry: TranslationMemoryEntry) -> Tuple[int, bool]:
+        row = self._conn.execute(
+            "SELECT id FROM memory_entries WHERE exact_key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute(
+                "UPDATE memory_entries SET frequency = frequency + 1, last_used = ? WHERE id = ?",
+                (datetime.now().isoformat(), row[0]),
+            )
+            return row[0] - 1, False
+        row_id = self._conn.execute(
+            """
+            INSERT INTO memory_entries
+                (exact_key, original_text, novel_title, target_lang, frequency, last_used, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                key,
+                entry.original_text,
+                entry.novel_title,
+                entry.target_lang,
+                entry.frequency,
+                entry.last_used.isoformat(),
+                entry.model_dump_json(),
+            ),
+        ).lastrowid
+        return row_id - 1, True
+
+    def add(self, key: str, entry: TranslationMemoryEntry) -> Tuple[int, bool]:
+        return self.add_many([(key, entry)])[0]
+
+    def add_many(self, items: Sequence[Tuple[str, TranslationMemoryEntry]]) -> List[Tuple[int, bool]]:
+        # معاملة واحدة للدفعة كلها بدلاً من معاملة (وfsync) لكل مدخل
+        with self._lock:
+            # BEGIN IMMEDIATE يحجز قفل الكتابة فلا تضيف عملية أخرى نفس المفتاح بيننا
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                results = [self._insert(key, entry) for key, entry in items]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def get(self, entry_id: int) -> TranslationMemoryEntry:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT frequency, last_used, payload FROM memory_entries WHERE id = ?",
+                (entry_id + 1,),
+            ).fetchone()
+        if row is None:
+            raise IndexError(entry_id)
+        entry = TranslationMemoryEntry.model_validate_json(row[2])
+        entry.frequency = row[0]
+        entry.last_used = datetime.fromisoformat(row[1])
+        return entry
+
+    def frequencies(self, entry_ids: Sequence[int]) -> List[int]:
+        found: Dict[int, int] = {}
+        with self._lock:
+            # حد SQLite لعدد المعاملات في استعلام واحد
+            for start in range(0, len(entry_ids), 500):
+                chunk = [entry_id + 1 for entry_id in entry_ids[start:start + 500]]
+                found.update(self._conn.execute(
+                    f"SELECT id, frequency FROM memory_entries WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall())
+        return [found[entry_id + 1] for entry_id in entry_ids]
+
+    def contexts(self, entry_ids: Sequence[int]) -> List[TranslationContext]:
+        found: Dict[int, str] = {}
+        with self._lock:
+            for start in range(0, len(entry_ids), 500):
+                chunk = [entry_id + 1 for entry_id in entry_ids[start:start + 500]]
+                found.update(self._conn.execute(
+                    "SELECT id, json_extract(payload, '$.context') FROM memory_entries"
+                    f" WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall())
+        return [TranslationContext.model_validate_json(found[entry_id + 1]) for entry_id in entry_ids]
+
+    def touch(self, entry_id: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE memory_entries SET frequency = frequency + 1, last_used = ? WHERE id = ?",
+                (datetime.now().isoformat(), entry_id + 1),
+            )
+
+    def update_context(self, entry_id: int, context: TranslationContext) -> None:
+        entry = self.get(entry_id)
+        entry.context = context
+        with self._lock:
+            # المدخل والعداد في معاملة واحدة حتى لا يفوت التحديث الفهرس المشترك
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE memory_entries SET payload = ? WHERE id = ?",
+                    (entry.model_dump_json(), entry_id + 1),
+                )
+                self._conn.execute(
+                    """
+                    INSERT INTO memory_meta (name, value) VALUES ('context_revision', 1)
+                    ON CONFLICT (name) DO UPDATE SET value = value + 1
+                    """
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def context_revision(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM memory_meta WHERE name = 'context_revision'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def iter_keys(self, after_id: int = -1) -> Iterator[EntryKey]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, original_text, novel_title, target_lang FROM memory_entries WHERE id > ? ORDER BY id",
+                (after_id + 1,),
+            ).fetchall()
+        for row_id, original_text, novel_title, target_lang in rows:
+            yield row_id - 1, original_text, novel_title, target_lang
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM memory_entries").fetchone()[0]
+
+    def save_novel_context(self, novel_title: str, context: NovelContext) -> int:
+        with self._lock:
+            # النسخة تزداد في نفس العبارة فتلاحظ العمليات الأخرى التحديث
+            return self._conn.execute(
+                """
+                INSERT INTO novel_contexts (novel_title, payload) VALUES (?, ?)
+                ON CONFLICT (novel_title) DO UPDATE SET payload = excluded.payload, version = version + 1
+                RETURNING version
+                """,
+                (novel_title, context.model_dump_json()),
+            ).fetchone()[0]
+
+    def get_novel_context(self, novel_title: str) -> Optional[NovelContext]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM novel_contexts WHERE novel_title = ?", (novel_title,)
+            ).fetchone()
+        return NovelContext.model_validate_json(row[0]) if row else None
+
+    def novel_context_version(self, novel_title: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM novel_contexts WHERE novel_title = ?", (novel_title,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_store(path: Optional[str] = None) -> TranslationMemoryStore:
+    """إنشاء واجهة التخزين حسب الإعدادات
+
+    Args:
+        path (str, optional): مسار ملف SQLite. إن لم يُحدد يُقرأ من متغير البيئة
+            TRANSLATION_MEMORY_DB، وإن لم يوجد يُستخدم التخزين المضغوط داخل العملية.
+    """
+    path = path or os.getenv("TRANSLATION_MEMORY_DB")
+    return SQLiteStore(path) if path else CompactStore()
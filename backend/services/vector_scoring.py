@@ -0,0 +1,318 @@
+"""
+تقييم تشابه ذاكرة الترجمة دفعة واحدة باستخدام NumPy
+
+تُحوَّل كلمات النص والفقرتين السابقة واللاحقة لكل مدخل مرة واحدة عند
+الفهرسة إلى بصمات 64 بت ثابتة، وتُحفظ في قوائم تضمين (بصمة -> معرفات
+المدخلات) مع أحجام المجموعات ورموز نوع المشهد ورقم الفصل في مصفوفات
+متجاورة. عند الاستعلام يُحسب التقاطع مع كل المدخلات بعملية bincount واحدة
+لكل حقل ثم تُحسب الدرجة المجمعة لكل المرشحين معاً، ويُختار أفضل k عبر
+argpartition.
+
+FrozenScorer يطبق نفس الحساب على نسخة ثابتة من المصفوفات (VectorScorer.freeze)
+يمكن فتحها من ملف مشترك بين العمليات دون نسخ (services.shared_index).
+
+الدقة: العمليات العشرية هي نفسها وبنفس الترتيب في
+TranslationMemoryService._calculate_similarity و_calculate_context_similarity،
+فالدرجات مطابقة للتنفيذ النصي ضمن SCORE_TOLERANCE. الاختلاف الوحيد الممكن
+هو تصادم بصمتين لكلمتين مختلفتين، واحتماله نحو V²/2^65 لمفردات حجمها V
+(أقل من 10^-8 لمليون كلمة).
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from models.translation_memory import TranslationContext
+from services.translation_memory_service import CONTEXT_WEIGHT, TEXT_WEIGHT, tokenize
+
+# أقصى فرق بين درجات هذا المقيم ودرجات التنفيذ النصي
+SCORE_TOLERANCE = 1e-9
+
+_FIELDS = ("text", "previous", "next")
+
+
+def _tokens(text: Optional[str]) -> frozenset:
+    return tokenize(text or "")
+
+
+def token_hash(token: str) -> int:
+    """بصمة 64 بت ثابتة للكلمة (نفسها في كل العمليات وبين التشغيلات)"""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class _Scorer(ABC):
+    """حساب الدرجات على مصفوفات؛ تحدد الأصناف الفرعية مصدر المصفوفات
+
+    على الصنف الفرعي أيضاً توفير القواميس _hashes و_scene_codes و_chapter_codes.
+    """
+
+    _hashes: Dict[str, int] = {}
+    _scene_codes: Dict[Optional[str], int]
+    _chapter_codes: Dict[Optional[int], int]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """عدد المدخلات المفهرسة"""
+
+    @abstractmethod
+    def _postings_for(self, field: str, hashes: List[int]) -> np.ndarray:
+        """معرفات المدخلات لكل بصمة موجودة، متتالية في مصفوفة واحدة"""
+
+    @abstractmethod
+    def _sizes_array(self, field: str) -> np.ndarray:
+        """عدد بصمات الحقل لكل مدخل"""
+
+    @abstractmethod
+    def _scene_array(self) -> np.ndarray:
+        """رمز نوع المشهد لكل مدخل"""
+
+    @abstractmethod
+    def _chapter_array(self) -> np.ndarray:
+        """رمز رقم الفصل لكل مدخل"""
+
+    def _query_hashes(self, tokens: Iterable[str]) -> List[int]:
+        # لا تُضاف كلمات الاستعلام إلى الذاكرة الدائمة للبصمات
+        hashes = set()
+        for token in tokens:
+            value = self._hashes.get(token)
+            if value is None:
+                value = token_hash(token)
+            hashes.add(value)
+        return list(hashes)
+
+    @staticmethod
+    def _divide(intersection: np.ndarray, union: np.ndarray) -> np.ndarray:
+        # مجموعتان فارغتان تعطيان صفراً كما في jaccard
+        return np.divide(intersection, union, out=np.zeros(len(union)), where=union > 0)
+
+    def _jaccard(self, field: str, tokens: Iterable[str]) -> np.ndarray:
+        """تشابه جاكارد بين الكلمات وحقل كل المدخلات"""
+        hashes = self._query_hashes(tokens)
+        sizes = self._sizes_array(field).astype(np.int64)
+        intersection = np.bincount(self._postings_for(field, hashes), minlength=len(self))
+        return self._divide(intersection, len(hashes) + sizes - intersection)
+
+    def _sparse_jaccard(self, tokens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """تشابه جاكارد للنص مع المدخلات التي تشترك في كلمة واحدة على الأقل فقط"""
+        hashes = self._query_hashes(tokens)
+        ids, intersection = np.unique(self._postings_for("text", hashes), return_counts=True)
+        sizes = self._sizes_array("text")[ids].astype(np.int64)
+        return ids, self._divide(intersection, len(hashes) + sizes - intersection)
+
+    def _context_scores(self, context: TranslationContext) -> np.ndarray:
+        scenes = self._scene_array()
+        chapters = self._chapter_array()
+        # نفس ترتيب الجمع في _calculate_context_similarity حتى تتطابق النتائج بتاً ببت
+        score = np.zeros(len(self))
+        score += np.where(scenes == self._scene_codes.get(context.scene_type, -1), 0.4, 0.0)
+        score += np.where(chapters == self._chapter_codes.get(context.chapter_number, -1), 0.2, 0.0)
+        previous = self._jaccard("previous", _tokens(context.previous_paragraph))
+        following = self._jaccard("next", _tokens(context.next_paragraph))
+        score += (previous + following) * 0.2
+        return np.minimum(score, 1.0)
+
+    def scores(self, tokens: frozenset, context: Optional[TranslationContext] = None) -> np.ndarray:
+        """الدرجة المجمعة للاستعلام مع كل المدخلات (مصفوفة بطول عدد المدخلات)"""
+        context_scores = self._context_scores(context) if context else 1.0
+        return self._jaccard("text", tokens) * TEXT_WEIGHT + context_scores * CONTEXT_WEIGHT
+
+    def top_k(
+        self,
+        tokens: frozenset,
+        context: Optional[TranslationContext] = None,
+        threshold: float = 0.0,
+        k: Optional[int] = None,
+        keep_ties: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """أفضل k مدخلات تبلغ العتبة
+
+        Args:
+            keep_ties (bool): إبقاء كل المدخلات المساوية في الدرجة للمدخل رقم k
+                حتى يحسم المستدعي التعادل بمعيار آخر (مثل التكرار)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: المعرفات ودرجاتها مرتبة تنازلياً حسب
+                الدرجة ثم تصاعدياً حسب المعرف
+        """
+        if context is None and threshold > CONTEXT_WEIGHT:
+            # بلا سياق لا يبلغ العتبة إلا مدخل يشترك في كلمة مع الاستعلام،
+            # فيكفي حساب الدرجات للمدخلات الموجودة في قوائم التضمين
+            candidates, text_scores = self._sparse_jaccard(tokens)
+            scores = text_scores * TEXT_WEIGHT + 1.0 * CONTEXT_WEIGHT
+        else:
+            candidates = np.arange(len(self))
+            scores = self.scores(tokens, context)
+
+        passing = scores >= threshold
+        candidates, scores = candidates[passing], scores[passing]
+        if k is not None and k < len(scores):
+            if k <= 0:
+                return candidates[:0], scores[:0]
+            # أصغر درجة بين أفضل k؛ كل المساوين لها يبقون حتى يُحسم التعادل بالمعرف
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            keep = scores >= kth
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.lexsort((candidates, -scores))
+        if not keep_ties:
+            order = order[:k]
+        return candidates[order], scores[order]
+
+
+class VectorScorer(_Scorer):
+    """مقيم تشابه متجه لمدخلات ذاكرة الترجمة
+
+    معرفات المدخلات أعداد متتالية تبدأ من صفر بترتيب الإضافة، مثل معرفات
+    واجهات التخزين.
+    """
+
+    def __init__(self):
+        # بصمة الكلمة محسوبة مسبقاً (تتكرر الكلمات نفسها كثيراً)
+        self._hashes: Dict[str, int] = {}
+        # حقل -> بصمة -> معرفات المدخلات التي تحتوي الكلمة
+        self._postings: Dict[str, Dict[int, array]] = {field: {} for field in _FIELDS}
+        # حقل -> عدد الكلمات المختلفة لكل مدخل
+        self._sizes: Dict[str, array] = {field: array("i") for field in _FIELDS}
+        # نوع المشهد ورقم الفصل كرموز صحيحة (None قيمة مثل غيرها كما في المقارنة ==)
+        self._scene_codes: Dict[Optional[str], int] = {}
+        self._chapter_codes: Dict[Optional[int], int] = {}
+        self._scenes = array("i")
+        self._chapters = array("i")
+
+    def __len__(self) -> int:
+        return len(self._scenes)
+
+    def _hash(self, token: str) -> int:
+        value = self._hashes.get(token)
+        if value is None:
+            value = self._hashes[token] = token_hash(token)
+        return value
+
+    def _index(self, field: str, entry_id: int, tokens: frozenset) -> None:
+        postings = self._postings[field]
+        hashes = {self._hash(token) for token in tokens}
+        for value in hashes:
+            ids = postings.get(value)
+            if ids is None:
+                ids = postings[value] = array("i")
+            ids.append(entry_id)
+        self._sizes[field].append(len(hashes))
+
+    @staticmethod
+    def _code(codes: Dict, value) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(self, tokens: frozenset, context: TranslationContext) -> int:
+        """فهرسة مدخل جديد وإرجاع معرفه
+
+        Args:
+            tokens (frozenset): كلمات النص الأصلي (tokenize)
+            context (TranslationContext): سياق المدخل
+        """
+        entry_id = len(self)
+        self._index("text", entry_id, tokens)
+        self._index("previous", entry_id, _tokens(context.previous_paragraph))
+        self._index("next", entry_id, _tokens(context.next_paragraph))
+        self._scenes.append(self._code(self._scene_codes, context.scene_type))
+        self._chapters.append(self._code(self._chapter_codes, context.chapter_number))
+        return entry_id
+
+    def update_context(self, entry_id: int, old: TranslationContext, new: TranslationContext) -> None:
+        """استبدال سياق مدخل مفهرس"""
+        for field, old_text, new_text in (
+            ("previous", old.previous_paragraph, new.previous_paragraph),
+            ("next", old.next_paragraph, new.next_paragraph),
+        ):
+            postings = self._postings[field]
+            for value in {self._hash(token) for token in _tokens(old_text)}:
+                postings[value].remove(entry_id)
+            hashes = {self._hash(token) for token in _tokens(new_text)}
+            for value in hashes:
+                ids = postings.setdefault(value, array("i"))
+                # الإبقاء على القائمة مرتبة تصاعدياً
+                ids.insert(int(np.searchsorted(np.frombuffer(ids, dtype=np.int32), entry_id)), entry_id)
+            self._sizes[field][entry_id] = len(hashes)
+        self._scenes[entry_id] = self._code(self._scene_codes, new.scene_type)
+        self._chapters[entry_id] = self._code(self._chapter_codes, new.chapter_number)
+
+    def _postings_for(self, field: str, hashes: List[int]) -> np.ndarray:
+        postings = self._postings[field]
+        # نسخ فوري حتى لا يبقى عرض على ذاكرة array يمنع الإضافة إليها لاحقاً
+        parts = [np.frombuffer(postings[value], dtype=np.int32).copy() for value in hashes if value in postings]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    def _sizes_array(self, field: str) -> np.ndarray:
+        return np.frombuffer(self._sizes[field], dtype=np.int32)
+
+    def _scene_array(self) -> np.ndarray:
+        return np.frombuffer(self._scenes, dtype=np.int32)
+
+    def _chapter_array(self) -> np.ndarray:
+        return np.frombuffer(self._chapters, dtype=np.int32)
+
+    def freeze(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict]]:
+        """نسخة ثابتة من الفهرس في مصفوفات متجاورة لـ FrozenScorer
+
+        قوائم التضمين لكل حقل بصيغة CSR: البصمات مرتبة ({field}_keys)، وبداية
+        قائمة كل بصمة ({field}_offsets)، ومعرفات كل القوائم متتالية ({field}_ids).
+
+        Returns:
+            Tuple[dict, dict]: المصفوفات، ورموز نوع المشهد ورقم الفصل
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        for field in _FIELDS:
+            postings = {value: ids for value, ids in self._postings[field].items() if ids}
+            keys = sorted(postings)
+            offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+            np.cumsum([len(postings[value]) for value in keys], out=offsets[1:])
+            arrays[f"{field}_keys"] = np.array(keys, dtype=np.int64)
+            arrays[f"{field}_offsets"] = offsets
+            arrays[f"{field}_ids"] = np.concatenate(
+                [np.frombuffer(postings[value], dtype=np.int32) for value in keys]
+            ) if keys else np.empty(0, dtype=np.int32)
+            arrays[f"{field}_sizes"] = np.frombuffer(self._sizes[field], dtype=np.int32).copy()
+        arrays["scenes"] = np.frombuffer(self._scenes, dtype=np.int32).copy()
+        arrays["chapters"] = np.frombuffer(self._chapters, dtype=np.int32).copy()
+        codes = {"scene_type": dict(self._scene_codes), "chapter_number": dict(self._chapter_codes)}
+        return arrays, codes
+
+
+class FrozenScorer(_Scorer):
+    """مقيم للقراءة فقط على مصفوفات VectorScorer.freeze
+
+    لا يَنسخ المصفوفات، فيمكن أن تكون عروضاً على ملف مفتوح عبر mmap تتشاركه
+    عدة عمليات (services.shared_index).
+    """
+
+    def __init__(self, arrays: Mapping[str, np.ndarray], codes: Mapping[str, Dict]):
+        self._arrays = arrays
+        self._scene_codes = codes["scene_type"]
+        self._chapter_codes = codes["chapter_number"]
+
+    def __len__(self) -> int:
+        return len(self._arrays["scenes"])
+
+    def _postings_for(self, field: str, hashes: List[int]) -> np.ndarray:
+        keys = self._arrays[f"{field}_keys"]
+        query = np.array(hashes, dtype=np.int64)
+        positions = np.searchsorted(keys, query)
+        found = positions < len(keys)
+        positions = positions[found]
+        positions = positions[keys[positions] == query[found]]
+        offsets, ids = self._arrays[f"{field}_offsets"], self._arrays[f"{field}_ids"]
+        parts = [ids[offsets[position]:offsets[position + 1]] for position in positions.tolist()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    def _sizes_array(self, field: str) -> np.ndarray:
+        return self._arrays[f"{field}_sizes"]
+
+    def _scene_array(self) -> np.ndarray:
+        return self._arrays["scenes"]
+
+    def _chapter_array(self) -> np.ndarray:
+        return self._arrays["chapters"]
@@ -0,0 +1,21 @@
+import httpx
+import pytest
+
+import main
+from services.provider_http import ProviderHTTPClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_app(monkeypatch):
+    """كل اختبار يبدأ بتطبيق جديد: موارد وذاكرة مؤقتة وعدادات تحديد معدل فارغة
+
+    المحرك يجرّب المزودين غير المقاسين أولاً، لذا يرد OpenAI دون اتصال بالشبكة
+    (401) ما لم يستبدله الاختبار.
+    """
+    app = main.create_app()
+    services = app.state.services
+    services.provider_http = ProviderHTTPClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(401)), breakers=services.breakers
+    )
+    monkeypatch.setattr(main, "app", app, raising=False)
+    yield app
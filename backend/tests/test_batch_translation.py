@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+from services.batching import join_segments, pack_segments, split_segments
+from services.translation_memory_service import TranslationMemoryService
+
+
+def test_pack_segments_respects_budget():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 200]
+    packs = pack_segments(texts, max_chars=100)
+    assert packs == [[0, 1], [2], [3]]
+    for pack in packs[:-1]:
+        assert len(join_segments([texts[i] for i in pack])) <= 100
+
+
+def test_split_segments_round_trip_and_mismatch():
+    texts = ["First line.", "Second\nparagraph.", "Third."]
+    assert split_segments(join_segments(texts), 3) == texts
+    assert split_segments("[[1]]\nOne\n[[3]]\nThree", 3) is None
+    assert split_segments("preamble [[1]] One", 1) is None
+
+
+def test_batch_packs_segments_and_serves_memory(monkeypatch):
+    calls = []
+
+    async def fake_google(text, source_lang, target_lang):
+        calls.append(text)
+        # "ترجمة" تحافظ على العلامات كما يفعل المزود
+        return text.replace("Paragraph", "فقرة")
+
+    service = TranslationMemoryService()
+    asyncio.run(service.add_entry(TranslationMemoryEntry(
+        original_text="Known line", translated_text="سطر معروف",
+        context=TranslationContext(), target_lang="ar",
+    )))
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+
+    segments = [f"Paragraph {i}" for i in range(30)] + ["Known line", "", "Paragraph 0"]
+    response = TestClient(main.app).post("/translate/batch", json={
+        "segments": segments, "target_lang": "ar", "source_lang": "en", "max_chars_per_call": 200,
+    })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["translations"][:30] == [f"فقرة {i}" for i in range(30)]
+    assert data["translations"][30:] == ["سطر معروف", "", "فقرة 0"]
+    assert data["memory_hits"] == 1
+    assert data["failed"] == []
+    assert data["provider_calls"] == len(calls) < 30
+    assert all(len(call) <= 200 for call in calls)
+
+
+def test_batch_falls_back_to_single_calls_when_markers_are_lost(monkeypatch):
+    async def fake_google(text, source_lang, target_lang):
+        return "" if text == "B" else text.replace("[[", "(").lower()
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+
+    response = TestClient(main.app).post("/translate/batch", json={
+        "segments": ["A", "B", "C"], "target_lang": "ar", "source_lang": "en",
+    })
+    data = response.json()
+    assert data["translations"] == ["a", "", "c"]
+    assert data["failed"] == [1]
+
+
+def test_batch_limits_concurrent_provider_calls(monkeypatch):
+    active, peak = 0, 0
+
+    async def fake_google(text, source_lang, target_lang):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return text
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main, "TRANSLATE_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+    client = TestClient(main.app)
+
+    response = client.post("/translate/batch", json={
+        "segments": [f"Line {i}" for i in range(12)], "target_lang": "ar", "source_lang": "en",
+        "max_chars_per_call": 1,
+    })
+    assert response.json()["provider_calls"] == 12
+    assert peak == 2
+    response = client.post("/translate/batch", json={
+        "segments": ["Line"], "target_lang": "ar", "source_lang": "en", "max_chars_per_call": 100_000,
+    })
+    assert response.status_code == 422
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import main
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+from services.blocking_pool import BlockingPool
+from services.job_queue import JobQueue
+from services.translation_memory_service import TranslationMemoryService
+from services.translation_memory_store import SQLiteStore
+
+
+class SlowTranslator:
+    instances = 0
+
+    def __init__(self, source, target):
+        SlowTranslator.instances += 1
+        self.target = target
+
+    def translate(self, text):
+        time.sleep(0.2)
+        return f"[{self.target}] {text}"
+
+
+def test_google_calls_do_not_block_event_loop(monkeypatch):
+    monkeypatch.setattr(main, "GoogleTranslator", SlowTranslator)
+    services = main.app.state.services
+    services.blocking_pool = BlockingPool(max_workers=4)
+    # بدون عميل OpenAI البديل من conftest
+    services.provider_http = None
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(main.translate_with_google(f"t{i}", "en", "ar") for i in range(4)))
+        elapsed = time.perf_counter() - start
+        ticking.cancel()
+        services.blocking_pool.shutdown()
+        return results, elapsed, ticks
+
+    with main.use_services(services):
+        results, elapsed, ticks = asyncio.run(scenario())
+    # Google لا يمر بعميل HTTP فلا يُنشأ لأجله
+    assert services.provider_http is None
+    assert results == [f"[ar] t{i}" for i in range(4)]
+    # الاستدعاءات الأربعة تعمل بالتوازي والحلقة تبقى حرة أثناءها
+    assert elapsed < 0.6
+    assert ticks >= 10
+
+
+def test_translators_are_reused_per_language_pair(monkeypatch):
+    monkeypatch.setattr(main, "GoogleTranslator", SlowTranslator)
+    SlowTranslator.instances = 0
+    pool = BlockingPool(max_workers=1)
+
+    async def scenario():
+        for _ in range(3):
+            await pool.run(main.get_google_translator, "en", "ar")
+        await pool.run(main.get_google_translator, "en", "fr")
+
+    asyncio.run(scenario())
+    pool.shutdown()
+    assert SlowTranslator.instances == 2
+
+
+def test_sqlite_calls_run_outside_event_loop(tmp_path, monkeypatch):
+    pool = BlockingPool(max_workers=2)
+    threads = []
+
+    def record(func):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return func(*args, **kwargs)
+        return wrapper
+
+    store = SQLiteStore(str(tmp_path / "memory.db"))
+    for name in ("add_many", "get", "iter_keys", "frequencies"):
+        monkeypatch.setattr(store, name, record(getattr(store, name)))
+    service = TranslationMemoryService(store, run_blocking=pool.run)
+    queue = JobQueue(str(tmp_path / "jobs.db"), lambda texts, options: asyncio.sleep(0, texts), run_blocking=pool.run)
+    monkeypatch.setattr(queue, "_transaction", record(queue._transaction))
+
+    async def scenario():
+        # الفهرسة الأولى في المنشئ تسبق حلقة الأحداث
+        threads.clear()
+        await service.add_entry(TranslationMemoryEntry(
+            original_text="The gate opened", translated_text="انفتحت البوابة", context=TranslationContext(),
+        ))
+        assert (await service.find_exact("The gate opened")).translated_text == "انفتحت البوابة"
+        assert len(await service.find_similar_translations("The gate opened", threshold=0.5)) == 1
+        await queue.run(queue.submit, [("One", "First line.")], {})
+        assert await queue.run_once()
+
+    asyncio.run(scenario())
+    pool.shutdown()
+    assert threads and all(name.startswith("blocking") for name in threads)
+
+
+def test_memory_lookups_do_not_wait_for_provider_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "GoogleTranslator", SlowTranslator)
+    monkeypatch.setenv("TRANSLATION_MEMORY_DB", str(tmp_path / "memory.db"))
+    services = main.app.state.services
+    services.blocking_pool = BlockingPool(max_workers=1)
+
+    async def scenario():
+        service = services.get_translation_memory_service()
+        await service.add_entry(TranslationMemoryEntry(
+            original_text="Known", translated_text="معروف", context=TranslationContext(),
+        ))
+        # استدعاءات Google تشغل كل خيوط المجمع الرئيسي
+        calls = [asyncio.create_task(main.translate_with_google(f"Text {i}", "en", "ar")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        entry = await service.find_exact("Known")
+        elapsed = time.perf_counter() - start
+        await asyncio.gather(*calls)
+        return entry, elapsed
+
+    try:
+        with main.use_services(services):
+            entry, elapsed = asyncio.run(scenario())
+    finally:
+        asyncio.run(services.stop())
+    assert entry.translated_text == "معروف"
+    assert elapsed < 0.1
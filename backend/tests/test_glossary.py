@@ -0,0 +1,43 @@
+import asyncio
+import random
+
+import main
+from services.glossary import GlossaryMatcher, compile_glossary
+
+
+def test_longest_match_wins():
+    matcher = GlossaryMatcher([("Dragon", "تنين"), ("Dragon King", "ملك التنانين")])
+    assert matcher.apply("The Dragon King met a Dragon.") == "The ملك التنانين met a تنين."
+
+
+def test_replacements_are_not_replaced_again():
+    matcher = GlossaryMatcher([("Lin", "Wei"), ("Wei", "وي")])
+    assert matcher.apply("Lin and Wei") == "Wei and وي"
+
+
+def test_special_characters_and_empty_terms():
+    matcher = GlossaryMatcher([("a.b", "X"), ("(c)", "Y"), ("", "Z")])
+    assert matcher.apply("a.b aXb (c) c") == "X aXb Y c"
+    assert GlossaryMatcher([]).apply("unchanged") == "unchanged"
+
+
+def test_matches_sequential_replace_for_distinct_terms():
+    rng = random.Random(3)
+    words = [f"Term{i}x" for i in range(300)]
+    terms = [(word, f"<{i}>") for i, word in enumerate(words)]
+    text = " ".join(rng.choice(words + ["plain", "text"]) for _ in range(2000))
+
+    expected = text
+    for original, translation in terms:
+        expected = expected.replace(original, translation)
+    assert GlossaryMatcher(terms).apply(text) == expected
+
+
+def test_compiled_glossary_is_cached():
+    terms = (("cat", "قطة"), ("dog", "كلب"))
+    assert compile_glossary(terms) is compile_glossary(terms)
+
+
+def test_apply_terms_uses_term_models():
+    terms = [main.Term(original="world", translation="عالم")]
+    assert asyncio.run(main.apply_terms("Hello world", terms)) == "Hello عالم"
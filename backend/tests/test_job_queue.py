@@ -0,0 +1,212 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from services.job_queue import JobQueue
+from services.translation_cache import TranslationCache
+from services.translation_memory_service import TranslationMemoryService
+
+CHAPTERS = [
+    ("One", "  First line. Second line.\n\nThird line!\n"),
+    ("Two", "Fourth line. Fifth line.\n\n\nSixth line."),
+]
+
+
+def upper(calls: list):
+    async def translate(texts, options):
+        calls.append(list(texts))
+        return [text.upper() for text in texts]
+    return translate
+
+
+def test_job_translates_chapters_and_reports_progress(tmp_path):
+    calls = []
+    queue = JobQueue(str(tmp_path / "jobs.db"), upper(calls), chunk_size=4)
+    job_id = queue.submit(CHAPTERS, {"target_lang": "ar"})
+    assert queue.status(job_id)["status"] == "queued"
+
+    assert asyncio.run(queue.run_once())
+    assert not asyncio.run(queue.run_once())
+
+    assert [len(chunk) for chunk in calls] == [4, 2]
+    status = queue.status(job_id)
+    assert status["status"] == "completed"
+    assert (status["segments_done"], status["total_segments"]) == (6, 6)
+    assert (status["chapters_completed"], status["total_chapters"]) == (2, 2)
+    assert status["translated_words"] == status["total_words"] == 12
+    assert status["segments_per_second"] > 0
+    assert queue.result(job_id) == [
+        {"title": title, "translated_text": text.upper()} for title, text in CHAPTERS
+    ]
+
+
+def test_crashed_job_resumes_from_last_checkpoint(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first_calls = []
+
+    async def crash_after_first_chunk(texts, options):
+        first_calls.append(list(texts))
+        if len(first_calls) > 1:
+            # العامل يتوقف دون إنهاء المهمة (كأن العملية انتهت فجأة)
+            await asyncio.sleep(3600)
+        return [text.upper() for text in texts]
+
+    crashed = JobQueue(path, crash_after_first_chunk, chunk_size=2, lease_seconds=30)
+    job_id = crashed.submit(CHAPTERS, {})
+
+    async def run_until_second_chunk():
+        task = asyncio.create_task(crashed.run_once())
+        while len(first_calls) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run_until_second_chunk())
+    assert crashed.status(job_id)["segments_done"] == 2
+
+    # عامل آخر لا يأخذ المهمة قبل انتهاء عقد العامل الأول
+    later = [time.time()]
+    calls = []
+    resumed = JobQueue(path, upper(calls), chunk_size=2, clock=lambda: later[0])
+    assert not asyncio.run(resumed.run_once())
+    later[0] += 31
+    assert asyncio.run(resumed.run_once())
+
+    assert calls == [["Third line!", "Fourth line."], ["Fifth line.", "Sixth line."]]
+    assert resumed.status(job_id)["status"] == "completed"
+    assert resumed.result(job_id)[1]["translated_text"] == CHAPTERS[1][1].upper()
+
+
+def test_lease_is_renewed_while_chunk_translates(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    other = JobQueue(path, upper([]))
+    claims = []
+
+    async def slow(texts, options):
+        # الدفعة أطول من عقد الإيجار، والعامل الآخر يحاول أخذ المهمة في منتصفها
+        for _ in range(4):
+            await asyncio.sleep(0.15)
+            claims.append(other._claim())
+        return [text.upper() for text in texts]
+
+    queue = JobQueue(path, slow, chunk_size=10, lease_seconds=0.3)
+    job_id = queue.submit(CHAPTERS, {})
+    assert asyncio.run(queue.run_once())
+    assert claims == [None] * 4
+    assert queue.status(job_id)["status"] == "completed"
+
+
+def test_cancel_stops_running_chunk(tmp_path):
+    started = []
+
+    async def hang(texts, options):
+        started.append(1)
+        await asyncio.sleep(3600)
+
+    queue = JobQueue(str(tmp_path / "jobs.db"), hang, lease_seconds=0.15)
+    job_id = queue.submit(CHAPTERS, {})
+
+    async def cancel_while_translating():
+        task = asyncio.create_task(queue.run_once())
+        while not started:
+            await asyncio.sleep(0.01)
+        queue.cancel(job_id)
+        # يلاحظ التجديد التالي للعقد أن المهمة لم تعد للعامل فيوقف الترجمة
+        return await asyncio.wait_for(task, 2)
+
+    assert asyncio.run(cancel_while_translating())
+    assert queue.status(job_id)["status"] == "cancelled"
+
+
+def test_cancel_and_resume(tmp_path):
+    queue = None
+
+    async def cancel_during_first_chunk(texts, options):
+        if len(calls) == 0:
+            queue.cancel(job_id)
+        calls.append(list(texts))
+        return [text.upper() for text in texts]
+
+    calls = []
+    queue = JobQueue(str(tmp_path / "jobs.db"), cancel_during_first_chunk, chunk_size=2)
+    job_id = queue.submit(CHAPTERS, {})
+    asyncio.run(queue.run_once())
+
+    status = queue.status(job_id)
+    assert status["status"] == "cancelled"
+    # ترجمة الدفعة الجارية لم تُحفظ لأن المهمة أُلغيت قبل نقطة الاستئناف
+    assert status["segments_done"] == 0
+    assert len(calls) == 1
+
+    assert queue.resume(job_id) == "queued"
+    asyncio.run(queue.run_once())
+    assert queue.status(job_id)["status"] == "completed"
+    assert queue.cancel(job_id) == "completed"
+
+
+def test_failed_segments_fail_the_job_and_can_be_retried(tmp_path):
+    attempts = []
+
+    async def flaky(texts, options):
+        attempts.append(list(texts))
+        return ["" if text == "Fifth line." and len(attempts) == 2 else text.upper() for text in texts]
+
+    queue = JobQueue(str(tmp_path / "jobs.db"), flaky, chunk_size=4)
+    job_id = queue.submit(CHAPTERS, {})
+    asyncio.run(queue.run_once())
+    status = queue.status(job_id)
+    assert status["status"] == "failed"
+    assert status["error"] == "1 segments failed to translate"
+    assert status["segments_done"] == 5
+
+    queue.resume(job_id)
+    asyncio.run(queue.run_once())
+    assert attempts[-1] == ["Fifth line."]
+    assert queue.status(job_id)["status"] == "completed"
+
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    async def fake_google(text, source_lang, target_lang):
+        return text.replace("line", "سطر")
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+    monkeypatch.setattr(main.app.state.services, "job_queue", JobQueue(
+        str(tmp_path / "jobs.db"), main.translate_job_segments, poll_interval=0.05
+    ))
+
+    with TestClient(main.app) as client:
+        payload = {
+            "chapters": [{"title": title, "text": text} for title, text in CHAPTERS],
+            "target_lang": "ar", "source_lang": "en",
+            "terms": [{"original": "Sixth", "translation": "السادس"}],
+        }
+        submitted = client.post("/jobs", json=payload)
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+
+        deadline = time.time() + 5
+        while client.get(f"/jobs/{job_id}").json()["status"] != "completed" and time.time() < deadline:
+            time.sleep(0.02)
+
+        result = client.get(f"/jobs/{job_id}/result").json()
+        assert result["chapters"][1] == {"title": "Two", "translated_text": "Fourth سطر. Fifth سطر.\n\n\nالسادس سطر."}
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.post("/jobs/missing/cancel").status_code == 404
+
+        rejected = client.post("/jobs", json={**payload, "ai_provider": "anthropic"})
+        assert rejected.status_code == 400
+
+
+def test_jobs_are_disabled_without_database(tmp_path, monkeypatch):
+    monkeypatch.delenv("TRANSLATION_JOBS_DB", raising=False)
+    monkeypatch.chdir(tmp_path)
+    app = main.create_app()
+    with TestClient(app) as client:
+        response = client.post("/jobs", json={"chapters": [{"text": "One."}], "target_lang": "ar", "source_lang": "en"})
+        assert response.status_code == 503
+        assert client.get("/jobs/any").status_code == 503
+    assert app.state.services.job_queue is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from services.language_detection import LanguageDetector, classify_script
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("مرحبا بك في عالم الروايات", "ar"),
+    ("こんにちは、世界", "ja"),
+    ("안녕하세요 세계", "ko"),
+    ("Съешь же ещё этих мягких булок", "ru"),
+    ("Привіт, як справи? Їжак і ґанок", "uk"),
+    ("Hello world", None),
+    ("سلام، حال شما چطور است؟ من خوبم", None),  # فارسية
+    ("你好世界", None),  # صينية: يقررها الكاشف الإحصائي (zh-cn/zh-tw)
+])
+def test_script_pre_classifier(text, expected):
+    assert classify_script(text) == expected
+
+
+def test_obvious_scripts_skip_statistical_detector():
+    detector = LanguageDetector()
+    assert asyncio.run(detector.detect("مرحبا")) == "ar"
+    assert detector.statistical_calls == 0
+
+
+def test_results_are_cached_and_deterministic():
+    detector = LanguageDetector()
+    text = "Bonjour tout le monde, comment allez-vous aujourd'hui ?"
+    results = {asyncio.run(detector.detect(text)) for _ in range(5)}
+    assert results == {"fr"}
+    assert detector.statistical_calls == 1
+    assert detector.cache.stats()["hits"] == 4
+
+    # كاشف جديد بنفس البذرة يعطي نفس الإجابة
+    assert asyncio.run(LanguageDetector().detect(text)) == "fr"
+
+
+def test_long_texts_are_sampled():
+    detector = LanguageDetector(max_chars=100)
+    sample = detector.sample("word " * 10_000)
+    assert 50 < len(sample) <= 100
+    assert not sample.endswith(" ")
+    assert asyncio.run(detector.detect("")) == "en"
@@ -0,0 +1,156 @@
+import asyncio
+import io
+import threading
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+from services import memory_io
+from services.memory_io import export_entries, iter_entries, iter_tmx
+from services.translation_memory_service import TranslationMemoryService
+from services.translation_memory_store import SQLiteStore
+
+THIRD_PARTY_TMX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tmx version="1.4">
+<header creationtool="CAT" creationtoolversion="2" datatype="plaintext" segtype="sentence"
+        adminlang="en-US" srclang="en-US" o-tmf="CAT"/>
+<body>
+  <tu usagecount="3" lastusagedate="20240105T101500Z">
+    <prop type="x-novel-title">Tales</prop>
+    <tuv xml:lang="en-US"><seg>Press <ph>&lt;b&gt;</ph>start &amp; go</seg></tuv>
+    <tuv xml:lang="ar-SA"><seg>\xd8\xa7\xd8\xb6\xd8\xba\xd8\xb7</seg></tuv>
+    <tuv xml:lang="fr-FR"><seg>Appuyez</seg></tuv>
+  </tu>
+  <tu>
+    <tuv xml:lang="en-US"><seg>Only source</seg></tuv>
+  </tu>
+</body>
+</tmx>
+"""
+
+
+def make_entries(count: int) -> list:
+    return [
+        TranslationMemoryEntry(
+            original_text=f"Line {i} of <the> story & more",
+            translated_text=f"السطر {i}",
+            context=TranslationContext(previous_paragraph=f"Before {i}", scene_type="حوار", chapter_number=i % 7),
+            frequency=1 + i % 3,
+            last_used=datetime(2024, 1, 1, 12, 0, i % 60),
+            tags=["draft", f"t{i % 2}"],
+            novel_title="Tales" if i % 2 else None,
+            target_lang="ar",
+            chapter_id=f"c{i}",
+        )
+        for i in range(count)
+    ]
+
+
+def round_trip(entries: list, file_format: str) -> list:
+    data = "".join(export_entries(entries, file_format, "en")).encode("utf-8")
+    return list(iter_entries(io.BytesIO(data), file_format))
+
+
+@pytest.mark.parametrize("file_format", ["jsonl", "tmx"])
+def test_export_import_round_trip(file_format):
+    entries = make_entries(20)
+    assert round_trip(entries, file_format) == entries
+
+
+def test_tmx_reads_third_party_files():
+    entries = list(iter_tmx(io.BytesIO(THIRD_PARTY_TMX)))
+    assert [(e.original_text, e.translated_text, e.target_lang) for e in entries] == [
+        ("Press <b>start & go", "اضغط", "ar"),
+        ("Press <b>start & go", "Appuyez", "fr"),
+    ]
+    assert entries[0].frequency == 3
+    assert entries[0].last_used == datetime(2024, 1, 5, 10, 15)
+    assert entries[0].novel_title == "Tales"
+    assert [e.target_lang for e in iter_tmx(io.BytesIO(THIRD_PARTY_TMX), target_lang="ar")] == ["ar"]
+
+
+def test_tmx_is_parsed_incrementally():
+    data = "".join(export_entries(make_entries(5000), "tmx")).encode("utf-8")
+    stream = io.BytesIO(data)
+    entries = iter_tmx(stream)
+    next(entries)
+    assert stream.tell() < len(data) // 10
+
+
+def test_invalid_input_reports_location():
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_entries(io.BytesIO(b'{"original_text": "a", "translated_text": "b", "context": {}}\n{}\n'), "jsonl"))
+    with pytest.raises(ValueError, match="Invalid TMX"):
+        list(iter_tmx(io.BytesIO(b"<tmx><body><tu>")))
+
+
+def test_import_writes_batches_and_syncs_indexes_once_per_batch(tmp_path, monkeypatch):
+    service = TranslationMemoryService(SQLiteStore(str(tmp_path / "memory.db")))
+    batches, syncs = [], []
+    add_many, sync = service.store.add_many, service._sync_index
+    monkeypatch.setattr(service.store, "add_many", lambda items: batches.append(len(items)) or add_many(items))
+    monkeypatch.setattr(service, "_sync_index", lambda: syncs.append(1) or sync())
+
+    entries = make_entries(250)
+    report = asyncio.run(service.import_entries(iter(entries + entries[:10]), batch_size=100))
+
+    assert batches == [100, 100, 60]
+    assert len(syncs) == 3
+    assert (report.created, report.updated) == (250, 10)
+    assert report.entries_per_second > 0
+    assert asyncio.run(service.find_exact(entries[5].original_text, entries[5].novel_title, "ar")).frequency == 4
+
+
+def test_import_and_export_endpoints(monkeypatch):
+    service = TranslationMemoryService()
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+    client = TestClient(main.app)
+
+    response = client.post("/translation-memory/import", params={"target_lang": "ar"},
+                           files={"file": ("memory.tmx", THIRD_PARTY_TMX, "application/xml")})
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+
+    exported = client.get("/translation-memory/export", params={"format": "jsonl"})
+    assert exported.status_code == 200
+    assert [e.translated_text for e in iter_entries(io.BytesIO(exported.content), "jsonl")] == ["اضغط"]
+
+    rejected = client.post("/translation-memory/import", files={"file": ("memory.csv", b"a,b", "text/csv")})
+    assert rejected.status_code == 400
+
+
+def test_import_endpoint_parses_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def recording_iter_entries(*args):
+        for entry in iter_entries(*args):
+            threads.append(threading.current_thread().name)
+            yield entry
+
+    monkeypatch.setattr(main, "iter_entries", recording_iter_entries)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+    data = "".join(export_entries(make_entries(5), "jsonl")).encode("utf-8")
+    response = TestClient(main.app).post(
+        "/translation-memory/import", params={"batch_size": 2},
+        files={"file": ("memory.jsonl", data, "application/jsonl")},
+    )
+    assert response.json()["created"] == 5
+    assert len(threads) == 5 and all(name.startswith("blocking") for name in threads)
+
+
+def test_cli_requires_database(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "memory.jsonl"
+    path.write_text("".join(export_entries(make_entries(3), "jsonl")), encoding="utf-8")
+    monkeypatch.delenv("TRANSLATION_MEMORY_DB", raising=False)
+    monkeypatch.setattr("sys.argv", ["memory_io", "import", str(path)])
+    with pytest.raises(SystemExit) as exc:
+        memory_io.main()
+    assert exc.value.code == 2
+    assert "--db" in capsys.readouterr().err
+
+    monkeypatch.setenv("TRANSLATION_MEMORY_DB", str(tmp_path / "memory.db"))
+    memory_io.main()
+    assert len(SQLiteStore(str(tmp_path / "memory.db"))) == 3
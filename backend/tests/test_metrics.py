@@ -0,0 +1,93 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from monitoring import (
+    Counter, Histogram, MetricsRegistry, PROVIDER_FALLBACKS, PROVIDER_REQUESTS, STAGE_LATENCY, TRANSLATION_SOURCES,
+)
+from services.translation_cache import TranslationCache
+from services.translation_memory_service import TranslationMemoryService
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="provider")
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{stage="provider",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="provider",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{stage="provider",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{stage="provider"} 4' in text
+
+
+def test_counter_labels_are_escaped():
+    counter = Counter("events_total", "Events", ["name"])
+    counter.inc(name='say "hi"')
+    counter.inc(2, name='say "hi"')
+    assert counter.samples() == ['events_total{name="say \\"hi\\""} 3']
+
+
+def test_translate_records_stages_providers_and_gauges(monkeypatch):
+    async def failing_openai(*args, **kwargs):
+        return ""
+
+    async def fake_google(text, source_lang, target_lang):
+        return "مرحبا"
+
+    monkeypatch.setattr(main, "translate_with_openai", failing_openai)
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+
+    provider_before = STAGE_LATENCY.count(stage="provider")
+    fallbacks_before = PROVIDER_FALLBACKS.value(from_provider="openai", to_provider="google")
+    failures_before = PROVIDER_REQUESTS.value(provider="openai", outcome="failure")
+
+    client = TestClient(main.app)
+    payload = {"text": "Hello there", "source_lang": "en", "target_lang": "ar", "ai_provider": "openai"}
+    assert client.post("/translate", json=payload).status_code == 200
+    assert client.post("/translate", json=payload).status_code == 200
+
+    # الطلب الثاني يُخدم من الذاكرة المؤقتة فلا يمر بمرحلة المزود
+    assert STAGE_LATENCY.count(stage="provider") == provider_before + 1
+    assert PROVIDER_FALLBACKS.value(from_provider="openai", to_provider="google") == fallbacks_before + 1
+    assert PROVIDER_REQUESTS.value(provider="openai", outcome="failure") == failures_before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'translation_stage_duration_seconds_count{stage="provider"}' in text
+    assert 'translation_results_total{source="cache"}' in text
+    assert 'http_request_duration_seconds_count{method="POST",endpoint="/translate",status="200"}' in text
+    assert "translation_cache_hit_ratio 0.5" in text
+    assert "translation_memory_entries 0" in text
+
+
+def test_cache_hits_of_concurrent_requests_are_counted_once(monkeypatch):
+    async def fake_google(text, source_lang, target_lang):
+        await asyncio.sleep(0.05 if text == "Slow" else 0)
+        return text.upper()
+
+    services = main.app.state.services
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(services, "translation_memory_service", TranslationMemoryService())
+    monkeypatch.setattr(services, "translation_cache", TranslationCache())
+
+    def request(text):
+        return main.TranslationRequest(text=text, source_lang="en", target_lang="ar")
+
+    async def scenario():
+        await main.translate_text(request("Cached"))
+        before = TRANSLATION_SOURCES.value(source="cache"), TRANSLATION_SOURCES.value(source="provider")
+        # إصابة طلب آخر أثناء انتظار المزود لا تُحسب لهذا الطلب
+        await asyncio.gather(main.translate_text(request("Slow")), main.translate_text(request("Cached")))
+        after = TRANSLATION_SOURCES.value(source="cache"), TRANSLATION_SOURCES.value(source="provider")
+        return after[0] - before[0], after[1] - before[1]
+
+    with main.use_services(services):
+        assert asyncio.run(scenario()) == (1, 1)
@@ -0,0 +1,140 @@
+import asyncio
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+import main
+from models.translation_memory import Character, NovelContext, TranslationContext, TranslationMemoryEntry
+from monitoring import TRANSLATION_SOURCES
+from services.novel_bundle import NovelBundle
+from services.translation_cache import TranslationCache
+from services.translation_memory_service import TranslationMemoryService
+from services.translation_memory_store import SQLiteStore
+
+
+def make_context(glossary=None, characters=None) -> NovelContext:
+    return NovelContext(
+        title="Tales",
+        characters=characters if characters is not None else [
+            Character(name_original="Lin Feng", name_translated="لين فنغ", aliases=["Young Master Lin", "Feng"]),
+        ],
+        glossary=glossary if glossary is not None else {"Qi": "الطاقة"},
+    )
+
+
+def test_bundle_maps_names_aliases_and_glossary():
+    bundle = NovelBundle("Tales", make_context())
+    assert bundle.matcher.apply("Young Master Lin gathered Qi; Feng smiled.") == "لين فنغ gathered الطاقة; لين فنغ smiled."
+    assert bundle.character("young master lin").name_original == "Lin Feng"
+    assert bundle.character("Nobody") is None
+    # مصطلحات الطلب لها الأولوية على مصطلحات الرواية
+    assert bundle.matcher_with((("Qi", "تشي"),)).apply("Qi") == "تشي"
+
+
+def test_update_rebuilds_only_changed_parts():
+    first = NovelBundle("Tales", make_context())
+    same_characters = NovelBundle("Tales", make_context(glossary={"Qi": "تشي"}), first)
+    assert same_characters.version == 2
+    assert same_characters.characters_json is first.characters_json
+    assert same_characters.matcher is not first.matcher
+    unchanged = NovelBundle("Tales", make_context(glossary={"Qi": "تشي"}), same_characters)
+    assert unchanged.matcher is same_characters.matcher
+
+
+def test_service_keeps_bundle_per_novel():
+    service = TranslationMemoryService()
+    asyncio.run(service.add_novel_context("Tales", make_context()))
+    asyncio.run(service.add_novel_context("Other", make_context(glossary={})))
+    other = asyncio.run(service.get_novel_bundle("Other"))
+
+    asyncio.run(service.add_novel_context("Tales", make_context(glossary={"Qi": "تشي"})))
+    assert asyncio.run(service.get_novel_bundle("Tales")).version == 2
+    assert asyncio.run(service.get_novel_bundle("Other")) is other
+    assert asyncio.run(service.get_novel_bundle("Missing")) is None
+
+
+def test_bundle_follows_updates_from_other_workers(tmp_path):
+    path = str(tmp_path / "memory.db")
+    first, second = TranslationMemoryService(SQLiteStore(path)), TranslationMemoryService(SQLiteStore(path))
+    asyncio.run(first.add_novel_context("Tales", make_context()))
+    cached = asyncio.run(second.get_novel_bundle("Tales"))
+    assert cached.matcher.apply("Qi") == "الطاقة"
+    assert asyncio.run(second.get_novel_bundle("Tales")) is cached
+
+    asyncio.run(first.add_novel_context("Tales", make_context(glossary={"Qi": "تشي"})))
+    updated = asyncio.run(second.get_novel_bundle("Tales"))
+    assert updated.matcher.apply("Qi") == "تشي"
+    # الأجزاء التي لم تتغير تُعاد استخدامها، والنسخة الجديدة تُبطل التخزين المؤقت
+    assert updated.version == cached.version + 1
+    assert updated.characters_json is cached.characters_json
+
+
+def test_sqlite_store_adds_version_to_existing_databases(tmp_path):
+    path = str(tmp_path / "memory.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE novel_contexts (novel_title TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+        conn.execute(
+            "INSERT INTO novel_contexts VALUES (?, ?)", ("Tales", make_context().model_dump_json())
+        )
+    conn.close()
+    store = SQLiteStore(path)
+    assert store.novel_context_version("Tales") == 1
+    assert store.save_novel_context("Tales", make_context(glossary={})) == 2
+    assert store.get_novel_context("Tales").glossary == {}
+
+
+def test_translate_applies_novel_glossary(monkeypatch):
+    calls = []
+
+    async def fake_google(text, source_lang, target_lang):
+        calls.append(text)
+        return f"{text} (translated)"
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+    client = TestClient(main.app)
+    client.post("/novel-context/add", params={"novel_title": "Tales"}, json=make_context().model_dump())
+
+    payload = {"text": "Feng gathered Qi", "source_lang": "en", "target_lang": "ar", "novel_title": "Tales"}
+    response = client.post("/translate", json=payload)
+    assert response.status_code == 200
+    assert response.json()["translated_text"] == "لين فنغ gathered الطاقة (translated)"
+
+    # تحديث المسرد يبطل النتيجة المخزنة مؤقتاً
+    client.post("/novel-context/add", params={"novel_title": "Tales"},
+                json=make_context(glossary={"Qi": "تشي"}).model_dump())
+    assert client.post("/translate", json=payload).json()["translated_text"] == "لين فنغ gathered تشي (translated)"
+    assert len(calls) == 2
+
+    characters = client.get("/novel-context/characters/Tales")
+    assert characters.json()["characters"][0]["aliases"] == ["Young Master Lin", "Feng"]
+    assert client.get("/novel-context/characters/Missing").json() == {"characters": []}
+
+
+def test_translate_finds_exact_memory_entry_of_novel(monkeypatch):
+    async def fake_google(text, source_lang, target_lang):
+        raise AssertionError("المدخل المحفوظ للرواية يجب أن يُخدم من الذاكرة")
+
+    service = TranslationMemoryService()
+    asyncio.run(service.add_entry(TranslationMemoryEntry(
+        original_text="The sect gate opened", translated_text="انفتحت بوابة الطائفة",
+        context=TranslationContext(), novel_title="Tales", target_lang="ar",
+    )))
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+    client = TestClient(main.app)
+
+    memory_before = TRANSLATION_SOURCES.value(source="memory")
+    payload = {"text": "The sect gate opened", "source_lang": "en", "target_lang": "ar", "novel_title": "Tales"}
+    response = client.post("/translate", json=payload)
+    assert response.status_code == 200
+    assert response.json()["translated_text"] == "انفتحت بوابة الطائفة"
+    assert TRANSLATION_SOURCES.value(source="memory") == memory_before + 1
+
+    batch = client.post("/translate/batch", json={
+        "segments": ["The sect gate opened"], "source_lang": "en", "target_lang": "ar", "novel_title": "Tales",
+    }).json()
+    assert batch["translations"] == ["انفتحت بوابة الطائفة"]
+    assert batch["memory_hits"] == 1
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import main
+from services.circuit_breaker import CircuitBreakers
+from services.provider_http import CircuitBreaker, CircuitOpenError, ProviderHTTPClient
+
+
+class MockProvider:
+    """خادم HTTP محلي يرد بتسلسل محدد من رموز الحالة"""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = 0
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                provider.requests += 1
+                status = provider.statuses.pop(0) if provider.statuses else 200
+                body = json.dumps({"choices": [{"message": {"content": " مرحبا "}}]}).encode()
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def mock_provider():
+    provider = MockProvider()
+    yield provider
+    provider.close()
+
+
+def make_client(**kwargs) -> ProviderHTTPClient:
+    return ProviderHTTPClient(backoff_base=0.001, **kwargs)
+
+
+def run_post(client: ProviderHTTPClient, url: str):
+    async def post():
+        try:
+            return await client.post("openai", url, json={})
+        finally:
+            await client.aclose()
+    return asyncio.run(post())
+
+
+def test_retries_on_5xx_and_429(mock_provider):
+    mock_provider.statuses = [503, 429]
+    response = run_post(make_client(max_retries=2), mock_provider.url)
+    assert response.status_code == 200
+    assert mock_provider.requests == 3
+
+
+def test_gives_up_after_max_retries(mock_provider):
+    mock_provider.statuses = [500, 500, 500]
+    client = make_client(max_retries=1)
+    assert run_post(client, mock_provider.url).status_code == 500
+    assert mock_provider.requests == 2
+    assert client.breaker("openai").failures == 1
+
+
+def test_open_circuit_skips_provider(mock_provider):
+    mock_provider.statuses = [500] * 4
+    client = make_client(max_retries=0, failure_threshold=2)
+
+    async def scenario():
+        try:
+            for _ in range(2):
+                await client.post("openai", mock_provider.url, json={})
+            with pytest.raises(CircuitOpenError):
+                await client.post("openai", mock_provider.url, json={})
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+    assert mock_provider.requests == 2
+    assert client.breaker("openai").state == "open"
+
+
+def test_half_open_allows_single_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_trial_is_released_when_it_raises_unexpected_error():
+    def handler(request):
+        raise ValueError("bad request body")
+
+    client = make_client(max_retries=0, failure_threshold=1, reset_timeout=0, transport=httpx.MockTransport(handler))
+    breaker = client.breaker("openai")
+    breaker.record_failure()
+
+    async def scenario():
+        try:
+            with pytest.raises(ValueError):
+                await client.post("openai", "http://provider.test/v1", json={})
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+    assert breaker.state == "half_open"
+    # لم يعلق الطلب التجريبي: يُسمح بمحاولة تالية
+    assert breaker.allow()
+
+
+def test_cancelled_google_trial_is_released(monkeypatch):
+    class HangingPool:
+        async def run(self, func, *args):
+            await asyncio.Event().wait()
+
+    services = main.app.state.services
+    monkeypatch.setattr(services, "breakers", CircuitBreakers(failure_threshold=1, reset_timeout=0))
+    monkeypatch.setattr(services, "blocking_pool", HangingPool())
+    breaker = services.breakers.get("google")
+    breaker.record_failure()
+
+    async def scenario():
+        # خسارة طلب تحوطي أو انقطاع عميل البث يلغيان الطلب التجريبي
+        task = asyncio.create_task(main.translate_with_google("Hello", "en", "ar"))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    with main.use_services(services):
+        asyncio.run(scenario())
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_unhealthy_openai_falls_back_to_google(mock_provider, monkeypatch):
+    mock_provider.statuses = [503] * 10
+
+    async def fake_google(text, source_lang, target_lang):
+        return "من جوجل"
+
+    monkeypatch.setattr(main, "OPENAI_API_URL", mock_provider.url)
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+
+    services = main.app.state.services
+
+    async def scenario():
+        services.provider_http = make_client(max_retries=0, failure_threshold=1)
+        try:
+            first = await main.translate_with_providers("Hello", "en", "ar", "openai")
+            second = await main.translate_with_providers("Hello", "en", "ar", "openai")
+        finally:
+            await services.provider_http.aclose()
+        return first, second
+
+    with main.use_services(services):
+        first, second = asyncio.run(scenario())
+    assert first == second == ("من جوجل", 0.7)
+    # الطلب الثاني لم يصل إلى OpenAI لأن الدائرة مفتوحة
+    assert mock_provider.requests == 1
+
+
+def test_openai_uses_shared_client(mock_provider, monkeypatch):
+    monkeypatch.setattr(main, "OPENAI_API_URL", mock_provider.url)
+
+    services = main.app.state.services
+
+    async def scenario():
+        services.provider_http = make_client()
+        try:
+            return await main.translate_with_openai("Hello", "en", "ar", "key")
+        finally:
+            await services.provider_http.aclose()
+
+    with main.use_services(services):
+        assert asyncio.run(scenario()) == "مرحبا"
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from security import InMemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend
+
+
+class FakeRedis:
+    """بديل محلي لعميل redis.asyncio يكفي لواجهة RedisRateLimitBackend"""
+
+    def __init__(self):
+        self.values = {}
+        self.expirations = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        assert transaction
+        return FakePipeline(self)
+
+    def _incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def _expire(self, key, seconds):
+        self.expirations[key] = seconds
+        return True
+
+    def _get(self, key):
+        value = self.values.get(key)
+        return None if value is None else str(value).encode()
+
+    async def decr(self, key):
+        self.round_trips += 1
+        self.values[key] = int(self.values.get(key, 0)) - 1
+        return self.values[key]
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    """معاملة MULTI: تُنفذ الأوامر المجمعة معاً في execute"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.commands = []
+
+    def incr(self, key):
+        self.commands.append((self.redis._incr, key))
+
+    def expire(self, key, seconds):
+        self.commands.append((self.redis._expire, key, seconds))
+
+    def get(self, key):
+        self.commands.append((self.redis._get, key))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        results = [command(*args) for command, *args in self.commands]
+        self.commands = []
+        return results
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    return InMemoryRateLimitBackend() if request.param == "memory" else RedisRateLimitBackend(FakeRedis())
+
+
+def acquire(backend, client_id, window, max_requests, now):
+    return asyncio.run(backend.acquire(client_id, window, max_requests, now))
+
+
+def test_limit_within_window(backend):
+    for _ in range(5):
+        assert acquire(backend, "client", 60, 5, now=120.0)
+    assert not acquire(backend, "client", 60, 5, now=121.0)
+    assert acquire(backend, "other", 60, 5, now=121.0)
+
+
+def test_previous_window_is_weighted(backend):
+    for _ in range(10):
+        assert acquire(backend, "client", 60, 10, now=60.0)
+    # بعد ربع النافذة التالية يُحتسب 75% من الطلبات السابقة: 7.5 من 10
+    assert [acquire(backend, "client", 60, 10, now=135.0) for _ in range(4)] == [True, True, True, False]
+    # بعد نافذتين كاملتين لا يبقى أثر للطلبات القديمة
+    assert acquire(backend, "client", 60, 1, now=240.0)
+
+
+def test_denied_requests_are_not_counted(backend):
+    assert acquire(backend, "client", 60, 1, now=0.0)
+    for _ in range(5):
+        assert not acquire(backend, "client", 60, 1, now=1.0)
+    assert acquire(backend, "client", 60, 1, now=120.0)
+
+
+def test_idle_clients_are_evicted():
+    backend = InMemoryRateLimitBackend()
+    for i in range(1000):
+        acquire(backend, f"client-{i}", 60, 10, now=0.0)
+    acquire(backend, "active", 60, 10, now=130.0)
+    assert list(backend.clients) == ["active"]
+
+
+def test_redis_keys_expire_in_the_same_transaction():
+    redis = FakeRedis()
+    assert acquire(RedisRateLimitBackend(redis), "client", 60, 10, now=0.0)
+    assert redis.expirations == {"ratelimit:client:0": 120}
+    # الزيادة ومدة الصلاحية وقراءة النافذة السابقة في رحلة واحدة
+    assert redis.round_trips == 1
+
+
+def test_middleware_returns_429(monkeypatch):
+    monkeypatch.setattr(main.app.state, "rate_limiter", RateLimiter(window=60, max_requests=2))
+    client = TestClient(main.app)
+    assert [client.get("/health").status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/health").json() == {"error": "Too many requests"}
@@ -0,0 +1,65 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+from services.segmentation import reassemble, split_sentences
+from services.translation_cache import TranslationCache
+from services.translation_memory_service import TranslationMemoryService
+
+
+def test_split_sentences_handles_latin_arabic_and_cjk():
+    text = "  Mr. Lin arrived, e.g. at dawn. Was he late?  No!\n\nالسلام عليكم. كيف حالك؟ بخير\n\n「你好。」我很好！谢谢\n"
+    segments = split_sentences(text)
+    assert [segment.text for segment in segments] == [
+        "Mr. Lin arrived, e.g. at dawn.", "Was he late?", "No!",
+        "السلام عليكم.", "كيف حالك؟", "بخير",
+        "「你好。」", "我很好！", "谢谢",
+    ]
+    assert reassemble(segments, [segment.text for segment in segments]) == text
+    assert [segment.text for segment in split_sentences("Version 3.14 is out. so")] == ["Version 3.14 is out. so"]
+
+
+def test_split_sentences_respects_size_budget():
+    text = "word " * 30 + "end. " + "x" * 25
+    segments = split_sentences(text, max_chars=20)
+    assert all(len(segment.text) <= 20 for segment in segments)
+    assert reassemble(segments, [segment.text for segment in segments]) == text
+
+
+def test_long_text_is_translated_per_sentence(monkeypatch):
+    calls = []
+    running = [0, 0]
+
+    async def fake_google(text, source_lang, target_lang):
+        calls.append(text)
+        running[0] += 1
+        running[1] = max(running)
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return text.replace("Sentence", "جملة")
+
+    service = TranslationMemoryService()
+    asyncio.run(service.add_entry(TranslationMemoryEntry(
+        original_text="Known sentence.", translated_text="جملة معروفة.",
+        context=TranslationContext(), target_lang="ar",
+    )))
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+    monkeypatch.setattr(main, "TRANSLATE_SEGMENT_CHARS", 60)
+    monkeypatch.setattr(main, "TRANSLATE_MAX_CONCURRENCY", 2)
+
+    paragraphs = [" ".join(f"Sentence {p}.{i}." for i in range(4)) for p in range(5)]
+    text = "\n\n".join(paragraphs[:2] + ["Known sentence.  Sentence 0.0."] + paragraphs[2:]) + "\n"
+    response = TestClient(main.app).post("/translate", json={"text": text, "target_lang": "ar", "source_lang": "en"})
+
+    assert response.status_code == 200
+    assert response.json()["translated_text"] == text.replace("Known sentence.", "جملة معروفة.").replace("Sentence", "جملة")
+    # الجملة المعروفة من الذاكرة والمكررة تُترجم مرة واحدة
+    sent = "".join(calls)
+    assert "Known sentence." not in sent
+    assert sent.count("Sentence 0.0.") == 1
+    assert all(len(call) <= 60 for call in calls)
+    assert running[1] == 2
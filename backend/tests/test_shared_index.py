@@ -0,0 +1,171 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from models.translation_memory import TranslationContext, TranslationMemoryEntry  # noqa: E402
+from services.shared_index import SharedIndexReader, SharedIndexWriter  # noqa: E402
+from services.translation_memory_service import TranslationMemoryService  # noqa: E402
+from services.translation_memory_store import SQLiteStore  # noqa: E402
+from services.vector_scoring import SCORE_TOLERANCE  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(30)]
+
+
+def random_text(rng: random.Random, max_words: int = 8) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, max_words)))
+
+
+def random_entry(rng: random.Random) -> TranslationMemoryEntry:
+    text = random_text(rng)
+    return TranslationMemoryEntry(
+        original_text=text,
+        translated_text=text.upper(),
+        context=TranslationContext(
+            previous_paragraph=random_text(rng) if rng.random() < 0.7 else None,
+            scene_type=rng.choice(["حوار", "وصف", None]),
+            chapter_number=rng.choice([1, 2, None]),
+        ),
+        novel_title=rng.choice(["A", None]),
+        target_lang="ar",
+    )
+
+
+def add(service: TranslationMemoryService, entries) -> None:
+    for entry in entries:
+        asyncio.run(service.add_entry(entry))
+
+
+def search(service, text, context=None, threshold=0.5, limit=None):
+    return asyncio.run(service.find_similar_translations(text, context, threshold, limit=limit))
+
+
+def assert_same_matches(actual, expected):
+    assert [match.entry_id for match in actual] == [match.entry_id for match in expected]
+    for got, want in zip(actual, expected):
+        assert abs(got.score - want.score) <= SCORE_TOLERANCE
+        assert got.frequency == want.frequency
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """كاتب وقارئ يتشاركان SQLite ومجلد الفهرس، وخدمة محلية للمقارنة"""
+    path, directory = str(tmp_path / "memory.db"), str(tmp_path / "index")
+    writer = SharedIndexWriter(directory, SQLiteStore(path))
+    reader = TranslationMemoryService(SQLiteStore(path), shared_index=SharedIndexReader(directory))
+    local = TranslationMemoryService(SQLiteStore(path))
+    yield writer, reader, local
+    writer.close()
+
+
+def test_shared_index_matches_local_index(workers):
+    writer, reader, local = workers
+    rng = random.Random(5)
+    add(local, [random_entry(rng) for _ in range(300)])
+    published = local.entry_count
+    assert writer.publish() == 1
+    # مدخلات بعد آخر إصدار تُفهرس محلياً لدى كل عامل
+    add(reader, [random_entry(rng) for _ in range(20)])
+
+    index = reader.shared_index.current()
+    assert (index.version, index.count) == (1, published)
+    assert reader.entry_count == local.entry_count > published
+    assert len(reader._entry_tokens) == local.entry_count - published
+    for _ in range(40):
+        text = random_text(rng)
+        context = random_entry(rng).context if rng.random() < 0.5 else None
+        threshold = rng.choice([0.2, 0.5, 0.8])
+        assert_same_matches(search(reader, text, context, threshold), search(local, text, context, threshold))
+        assert_same_matches(search(reader, text, context, threshold, 5), search(local, text, context, threshold, 5))
+
+
+def test_exact_matches_and_deduplication_use_shared_index(workers):
+    writer, reader, local = workers
+    entry = TranslationMemoryEntry(
+        original_text="The  dragon sleeps", translated_text="التنين نائم",
+        context=TranslationContext(), target_lang="ar",
+    )
+    add(local, [entry])
+    writer.publish()
+
+    found = asyncio.run(reader.find_exact("The dragon sleeps", target_lang="ar"))
+    assert found.translated_text == "التنين نائم"
+    assert asyncio.run(reader.find_exact("The dragon sleeps", target_lang="fr")) is None
+    add(reader, [entry])
+    assert reader.entry_count == 1
+    assert reader.store.get(0).frequency == 2
+
+
+def test_new_versions_swap_atomically(workers):
+    writer, reader, local = workers
+    rng = random.Random(8)
+    add(local, [random_entry(rng) for _ in range(50)])
+    writer.publish()
+    first = reader.shared_index.current()
+    assert not first.scorer._arrays["text_ids"].flags.writeable
+
+    add(local, [random_entry(rng) for _ in range(50)])
+    assert writer.publish() == 2
+    assert writer.publish() is None
+    second = reader.shared_index.current()
+    assert (second.version, second.count) == (2, local.entry_count)
+    # القارئ تخلى عن فهرسه المحلي لأن الإصدار الجديد يشمل كل المدخلات
+    assert reader.entry_count == local.entry_count and reader._entry_tokens == []
+    # إصدار قديم ما زال يُستخدم في استعلام جارٍ يبقى صالحاً وثابتاً
+    ids, _ = first.scorer.top_k(frozenset(WORDS), threshold=0.0)
+    assert len(first.scorer) == first.count < second.count
+    assert ids.max() < first.count
+
+    for _ in range(3):
+        add(local, [random_entry(rng)])
+        writer.publish()
+    assert sorted(os.listdir(writer.directory)) == [
+        "CURRENT", "index-0000000004.bin", "index-0000000005.bin", "writer.lock",
+    ]
+
+
+def test_only_one_process_builds_the_index(tmp_path):
+    path, directory = str(tmp_path / "memory.db"), str(tmp_path / "index")
+    add(TranslationMemoryService(SQLiteStore(path)), [TranslationMemoryEntry(
+        original_text="a b", translated_text="أ ب", context=TranslationContext(),
+    )])
+    holder = SharedIndexWriter(directory, SQLiteStore(path))
+    assert holder.publish() == 1
+
+    script = (
+        "import sys; from services.shared_index import SharedIndexWriter;"
+        "from services.translation_memory_store import SQLiteStore;"
+        f"sys.exit(0 if SharedIndexWriter({directory!r}, SQLiteStore({path!r})).acquire() else 3)"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", script], cwd=backend).returncode == 3
+    holder.close()
+    # بعد توقف الكاتب يتولى عامل آخر النشر ويكمل ترقيم الإصدارات
+    successor = SharedIndexWriter(directory, SQLiteStore(path))
+    assert successor.publish() == 2
+    successor.close()
+
+
+def test_context_updates_are_republished(workers, monkeypatch):
+    writer, reader, local = workers
+    rng = random.Random(11)
+    entries = [random_entry(rng) for _ in range(100)]
+    add(local, entries)
+    # السياقات تُقرأ دفعة واحدة وليس بقراءة كل مدخل على حدة
+    monkeypatch.setattr(writer.store, "get", lambda entry_id: pytest.fail("per-entry read"))
+    assert writer.publish() == 1
+    assert writer.publish() is None
+
+    context = TranslationContext(previous_paragraph="w1 w2 w3", scene_type="معركة", chapter_number=9)
+    for entry_id in range(0, local.entry_count, 7):
+        asyncio.run(local.update_context(entry_id, context))
+    assert writer.publish() == 2
+    assert reader.shared_index.current().count == local.entry_count
+    fresh = TranslationMemoryService(SQLiteStore(local.store.path))
+    for entry in entries[:20]:
+        assert_same_matches(search(reader, entry.original_text, context), search(fresh, entry.original_text, context))
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# وحدات المزودين والكاشف الثقيلة؛ لا تُستورد قبل أول طلب يحتاجها
+HEAVY_MODULES = ["deep_translator", "langdetect", "httpx", "jose", "redis"]
+
+MEASURE = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+import main
+built_at_import = "app" in vars(main)
+app = main.create_app()
+elapsed = time.perf_counter() - start
+if os.path.exists("/proc/self/status"):
+    # ru_maxrss على Linux يرث ذروة العملية الأم (pytest) عبر fork وexec
+    with open("/proc/self/status") as f:
+        rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+else:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 2 ** 20 if sys.platform == "darwin" else rss / 1024
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": rss_mb,
+    "loaded": sorted(name for name in %r if name in sys.modules),
+    "cors": sum(m.cls.__name__ == "CORSMiddleware" for m in app.user_middleware),
+    "providers": list(app.state.services.translation_engine.providers),
+    "built_at_import": built_at_import,
+    "http_client": app.state.services.provider_http is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_startup(**env) -> dict:
+    """استيراد main وبناء التطبيق في عملية جديدة وقياس الوقت وأقصى RSS"""
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE], cwd=BACKEND_DIR, env={**os.environ, **env},
+        capture_output=True, text=True, check=True, timeout=60,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="resource غير متاح على Windows")
+def test_startup_time_and_memory(record_property):
+    stats = measure_startup()
+    record_property("startup_seconds", round(stats["seconds"], 3))
+    record_property("startup_rss_mb", round(stats["rss_mb"], 1))
+
+    assert stats["loaded"] == []
+    assert stats["cors"] == 1
+    assert stats["providers"] == ["openai", "google"]
+    assert not stats["built_at_import"] and not stats["http_client"]
+    # حدود واسعة تلتقط عودة الاستيراد المبكر دون أن تتأثر بسرعة الجهاز
+    assert stats["seconds"] < 3
+    assert stats["rss_mb"] < 120
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="resource غير متاح على Windows")
+def test_only_enabled_providers_are_registered():
+    stats = measure_startup(TRANSLATION_PROVIDERS="google")
+    assert stats["providers"] == ["google"]
+    assert stats["loaded"] == []
+
+
+def test_langdetect_loads_on_first_statistical_detection():
+    from services.language_detection import LanguageDetector
+
+    detector = LanguageDetector()
+    assert detector.detect_statistical("This is clearly an English sentence about dragons.") == "en"
+    assert "langdetect" in sys.modules
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from models.translation_memory import NovelContext
+from services.segmentation import reassemble, split_paragraphs
+from services.translation_memory_service import TranslationMemoryService
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_split_paragraphs_preserves_whitespace():
+    text = "  First paragraph.\n\n\nSecond one\nwith a line break.\n \nThird.\n"
+    segments = split_paragraphs(text)
+    assert [segment.text for segment in segments] == [
+        "First paragraph.", "Second one\nwith a line break.", "Third.",
+    ]
+    assert reassemble(segments, [segment.text for segment in segments]) == text
+
+
+def test_stream_emits_segments_as_they_finish(monkeypatch):
+    async def fake_google(text, source_lang, target_lang):
+        # الفقرة الأولى أبطأ من البقية
+        await asyncio.sleep(0.05 if text == "Slow" else 0)
+        return text.upper()
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+
+    text = "Slow\n\nFast\n\nFaster"
+    response = TestClient(main.app).post(
+        "/translate/stream", json={"text": text, "target_lang": "ar", "source_lang": "en"}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+
+    assert events[0] == ("start", {"segments": 3, "detected_language": "en"})
+    assert events[-1] == ("done", {"segments": 3})
+    segments = [data for name, data in events if name == "segment"]
+    assert segments[-1]["index"] == 0
+    ordered = sorted(segments, key=lambda data: data["index"])
+    assert "".join(s["leading"] + s["translated_text"] + s["separator"] for s in ordered) == "SLOW\n\nFAST\n\nFASTER"
+
+
+def test_stream_passes_openai_deltas_through(monkeypatch):
+    async def fake_openai_stream(text, source_lang, target_lang, api_key, instructions=""):
+        for word in ("مرحبا", " ", "بالعالم"):
+            yield word
+
+    async def fail(*args):
+        raise AssertionError("fallback must not be used")
+
+    monkeypatch.setattr(main, "translate_with_openai_stream", fake_openai_stream)
+    monkeypatch.setattr(main, "translate_with_google", fail)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+
+    response = TestClient(main.app).post("/translate/stream", json={
+        "text": "Hello world", "target_lang": "ar", "source_lang": "en", "ai_provider": "openai",
+    })
+    events = parse_events(response.text)
+    assert [data["delta"] for name, data in events if name == "delta"] == ["مرحبا", " ", "بالعالم"]
+    assert [data["translated_text"] for name, data in events if name == "segment"] == ["مرحبا بالعالم"]
+
+
+def test_stream_falls_back_through_engine_and_applies_novel_glossary(monkeypatch):
+    async def failing_openai_stream(text, source_lang, target_lang, api_key, instructions=""):
+        return
+        yield
+
+    async def fake_google(text, source_lang, target_lang):
+        return f"{text} (translated)"
+
+    service = TranslationMemoryService()
+    asyncio.run(service.add_novel_context("Tales", NovelContext(title="Tales", characters=[], glossary={"Qi": "الطاقة"})))
+    monkeypatch.setattr(main, "translate_with_openai_stream", failing_openai_stream)
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+
+    response = TestClient(main.app).post("/translate/stream", json={
+        "text": "Gather Qi", "target_lang": "ar", "source_lang": "en",
+        "ai_provider": "openai", "novel_title": "Tales",
+    })
+    events = parse_events(response.text)
+    assert [data["translated_text"] for name, data in events if name == "segment"] == ["Gather الطاقة (translated)"]
+    stats = main.app.state.services.translation_engine.stats
+    assert (stats["openai"].failures, stats["google"].successes) == (1, 1)
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.translation_cache import TranslationCache
+from services.translation_memory_service import TranslationMemoryService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TranslationCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TranslationCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_key_depends_on_every_field():
+    base = ("Hello", "en", "ar", "google", [("Hello", "مرحبا")])
+    key = TranslationCache.make_key(*base)
+    assert key == TranslationCache.make_key(*base)
+    for index, value in enumerate(["Hi", "fr", "fa", "openai", []]):
+        changed = list(base)
+        changed[index] = value
+        assert TranslationCache.make_key(*changed) != key
+
+
+def test_single_flight_coalesces_concurrent_requests():
+    cache = TranslationCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "مرحبا"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert [value for value, _ in results] == ["مرحبا"] * 10
+    # طلب واحد حسب النتيجة والبقية حصلوا عليها دون استدعاء compute
+    assert sorted(cached for _, cached in results) == [False] + [True] * 9
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 9
+
+
+def test_failures_are_not_cached():
+    cache = TranslationCache()
+
+    async def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("k", fail))
+    assert cache.stats()["size"] == 0
+
+
+def test_translate_endpoint_uses_cache(monkeypatch):
+    calls = []
+
+    async def fake_google(text, source_lang, target_lang):
+        calls.append(text)
+        return "مرحبا بالعالم"
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+    client = TestClient(main.app)
+    request = {"text": "Hello cached world", "target_lang": "ar", "source_lang": "en"}
+
+    first = client.post("/translate", json=request)
+    second = client.post("/translate", json=request)
+
+    assert first.json() == second.json()
+    assert calls == ["Hello cached world"]
+    stats = client.get("/translate/cache/stats").json()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_new_memory_entries_invalidate_cached_results(monkeypatch):
+    async def fake_google(text, source_lang, target_lang):
+        return "ترجمة المزود"
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    monkeypatch.setattr(main.app.state.services, "translation_cache", TranslationCache())
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", TranslationMemoryService())
+    client = TestClient(main.app)
+    request = {"text": "Hello again", "target_lang": "ar", "source_lang": "en"}
+
+    assert client.post("/translate", json=request).json()["translated_text"] == "ترجمة المزود"
+    client.post("/translation-memory/add", json={
+        "original_text": "Hello again", "translated_text": "مرحبا مجدداً",
+        "context": {}, "target_lang": "ar",
+    })
+    assert client.post("/translate", json=request).json()["translated_text"] == "مرحبا مجدداً"
+    # زيادة تكرار مدخل موجود لا تُبطل النتيجة المخزنة
+    client.post("/translation-memory/add", json={
+        "original_text": "Hello again", "translated_text": "مرحبا مجدداً",
+        "context": {}, "target_lang": "ar",
+    })
+    client.post("/translate", json=request)
+    assert client.get("/translate/cache/stats").json()["hits"] == 1
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.translation_engine import TranslationEngine
+
+
+def stub_provider(result: str, delay: float = 0.0, calls: list = None, error: Exception = None):
+    """مزود محلي يرد بعد delay ثانية"""
+    async def translate(text, source_lang, target_lang, instructions):
+        if calls is not None:
+            calls.append(text)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return translate
+
+
+def test_falls_back_in_order_when_provider_fails():
+    engine = TranslationEngine(hedge_delay=None)
+    engine.register("broken", stub_provider("", error=RuntimeError("boom")), confidence=0.9)
+    engine.register("empty", stub_provider(""), confidence=0.8)
+    engine.register("working", stub_provider("مرحبا"), confidence=0.7)
+
+    result = asyncio.run(engine.translate("Hello", "en", "ar", "broken"))
+    assert (result.text, result.confidence, result.provider) == ("مرحبا", 0.7, "working")
+    assert [(a.provider, a.reason, a.outcome) for a in result.attempts] == [
+        ("broken", "primary", "failure"),
+        ("empty", "fallback", "failure"),
+        ("working", "fallback", "success"),
+    ]
+    assert engine.stats["broken"].failures == 1
+    assert engine.stats["working"].successes == 1
+
+
+def test_all_providers_failing_returns_empty_text():
+    engine = TranslationEngine(hedge_delay=0.01)
+    engine.register("a", stub_provider("", delay=0.02), confidence=0.9)
+    engine.register("b", stub_provider(""), confidence=0.7)
+
+    result = asyncio.run(engine.translate("Hello", "en", "ar"))
+    assert (result.text, result.confidence, result.provider) == ("", 0.0, None)
+    assert sorted(a.provider for a in result.attempts) == ["a", "b"]
+
+
+def test_slow_provider_is_hedged_and_cancelled():
+    slow_calls, fast_calls = [], []
+    engine = TranslationEngine(hedge_delay=0.05)
+    engine.register("slow", stub_provider("بطيء", delay=5, calls=slow_calls), confidence=0.9)
+    engine.register("fast", stub_provider("سريع", calls=fast_calls), confidence=0.7)
+
+    async def scenario():
+        start = asyncio.get_running_loop().time()
+        result = await engine.translate("Hello", "en", "ar", "slow")
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(scenario())
+    assert (result.text, result.provider) == ("سريع", "fast")
+    assert elapsed < 1
+    assert [(a.provider, a.reason, a.outcome) for a in result.attempts] == [
+        ("slow", "primary", "cancelled"),
+        ("fast", "hedge", "success"),
+    ]
+    assert len(slow_calls) == len(fast_calls) == 1
+    # الطلب الملغى لا يُحتسب في إحصاءات المزود
+    assert engine.stats["slow"].successes == engine.stats["slow"].failures == 0
+
+
+def test_fast_primary_is_not_hedged():
+    fallback_calls = []
+    engine = TranslationEngine(hedge_delay=0.5)
+    engine.register("primary", stub_provider("أول"), confidence=0.9)
+    engine.register("fallback", stub_provider("ثان", calls=fallback_calls), confidence=0.7)
+
+    result = asyncio.run(engine.translate("Hello", "en", "ar", "primary"))
+    assert result.provider == "primary"
+    assert fallback_calls == []
+
+
+def test_routes_by_measured_latency():
+    now = [0.0]
+    engine = TranslationEngine(hedge_delay=None, clock=lambda: now[0])
+
+    def timed(result, seconds):
+        async def translate(text, source_lang, target_lang, instructions):
+            now[0] += seconds
+            return result
+        return translate
+
+    engine.register("slow", timed("بطيء", 2.0), confidence=0.9)
+    engine.register("fast", timed("سريع", 0.2), confidence=0.7)
+    engine.register("flaky", timed("", 0.1), confidence=0.8)
+
+    # المزودون غير المقاسين يُجربون بترتيب التسجيل
+    assert engine.route() == ["slow", "fast", "flaky"]
+    for preferred in ("slow", "fast", "flaky"):
+        asyncio.run(engine.translate("Hello", "en", "ar", preferred))
+
+    assert engine.route() == ["fast", "slow", "flaky"]
+    assert engine.stats["fast"].latency == pytest.approx(0.2)
+    # المزود المفضل يبقى أولاً مهما كان زمنه
+    assert engine.route("slow") == ["slow", "fast", "flaky"]
+    assert asyncio.run(engine.translate("Hello", "en", "ar")).provider == "fast"
+
+
+def test_unknown_provider_is_rejected(monkeypatch):
+    calls = []
+
+    async def fake_google(text, source_lang, target_lang):
+        calls.append(text)
+        return "مرحبا"
+
+    monkeypatch.setattr(main, "translate_with_google", fake_google)
+    client = TestClient(main.app)
+    response = client.post("/translate", json={"text": "Hello", "target_lang": "ar", "ai_provider": "anthropic"})
+    assert response.status_code == 400
+    assert "anthropic" in response.json()["detail"]
+    assert calls == []
+
+    stats = client.get("/translate/providers").json()
+    assert set(stats["providers"]) == {"openai", "google"}
+    assert sorted(stats["routing"]) == ["google", "openai"]
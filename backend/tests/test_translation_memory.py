@@ -0,0 +1,238 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.translation_memory import Character, NovelContext, TranslationContext, TranslationMemoryEntry
+from services.translation_memory_service import TranslationMemoryService
+from services.translation_memory_store import CompactStore, InMemoryStore, SQLiteStore
+import main
+
+
+def make_entry(text: str, **context) -> TranslationMemoryEntry:
+    return TranslationMemoryEntry(
+        original_text=text,
+        translated_text=f"ترجمة {text}",
+        context=TranslationContext(**context),
+    )
+
+
+def find(service: TranslationMemoryService, *args, **kwargs) -> list:
+    matches = asyncio.run(service.find_similar_translations(*args, **kwargs))
+    return asyncio.run(service.get_matched_entries(matches))
+
+
+def brute_force(service: TranslationMemoryService, text, context, threshold):
+    """التنفيذ الخطي الأصلي كمرجع للمقارنة"""
+    scored = []
+    for entry in service.memory_entries:
+        similarity = service._calculate_similarity(text, entry.original_text)
+        context_score = service._calculate_context_similarity(context, entry.context) if context else 1.0
+        combined = similarity * 0.7 + context_score * 0.3
+        if combined >= threshold:
+            scored.append((combined, entry.frequency, entry.original_text))
+    return sorted(scored, key=lambda item: (item[0], item[1]), reverse=True)
+
+
+@pytest.fixture
+def populated_service():
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(40)]
+    service = TranslationMemoryService()
+    for _ in range(400):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        asyncio.run(service.add_entry(make_entry(text, scene_type=rng.choice(["حوار", "وصف"]))))
+    return service, rng, words
+
+
+@pytest.mark.parametrize("threshold", [0.2, 0.5, 0.8, 0.95, 1.0])
+def test_indexed_lookup_matches_linear_scan(populated_service, threshold):
+    service, rng, words = populated_service
+    for _ in range(30):
+        query = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        context = TranslationContext(scene_type="حوار") if rng.random() < 0.5 else None
+        expected = brute_force(service, query, context, threshold)
+        found = find(service, query, context, threshold)
+        assert [(e.confidence_score, e.frequency, e.original_text) for e in found] == expected
+
+
+def test_exact_text_is_found():
+    service = TranslationMemoryService()
+    asyncio.run(service.add_entry(make_entry("The old wizard smiled")))
+    asyncio.run(service.add_entry(make_entry("A storm was coming")))
+
+    found = find(service, "the old wizard smiled")
+    assert [e.original_text for e in found] == ["The old wizard smiled"]
+
+
+def test_exact_match_is_ranked_with_fuzzy_matches():
+    service = TranslationMemoryService()
+    asyncio.run(service.add_entry(make_entry("The old wizard smiled softly")))
+    asyncio.run(service.add_entry(make_entry("The old wizard smiled")))
+
+    found = find(service, "The  old wizard smiled", threshold=0.6)
+    assert [(e.original_text, e.confidence_score) for e in found] == [
+        ("The old wizard smiled", 1.0), ("The old wizard smiled softly", pytest.approx(0.86)),
+    ]
+    assert [e.original_text for e in find(service, "The old wizard smiled", threshold=0.6, limit=1)] == [
+        "The old wizard smiled",
+    ]
+
+
+def test_add_entry_deduplicates_on_normalized_text_novel_and_language():
+    service = TranslationMemoryService()
+    asyncio.run(service.add_entry(make_entry("The  old wizard\n")))
+    asyncio.run(service.add_entry(make_entry("The old wizard")))
+    arabic = make_entry("The old wizard")
+    arabic.target_lang = "ar"
+    asyncio.run(service.add_entry(arabic))
+
+    assert len(service.memory_entries) == 2
+    assert service.memory_entries[0].frequency == 2
+    assert asyncio.run(service.find_exact("The old wizard", target_lang="ar")) == arabic
+    assert asyncio.run(service.find_exact("The old wizard", novel_title="Other", target_lang="ar")) is None
+
+
+def test_translate_serves_exact_memory_match_without_provider(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("provider must not be called")
+
+    service = TranslationMemoryService()
+    entry = make_entry("Hello traveller")
+    entry.target_lang = "ar"
+    asyncio.run(service.add_entry(entry))
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+    monkeypatch.setattr(main, "translate_with_google", fail)
+    monkeypatch.setattr(main, "translate_with_openai", fail)
+
+    response = TestClient(main.app).post(
+        "/translate", json={"text": "Hello traveller", "target_lang": "ar", "source_lang": "en"}
+    )
+    assert response.status_code == 200
+    assert response.json()["translated_text"] == "ترجمة Hello traveller"
+    assert response.json()["confidence"] == 1.0
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "memory.db")
+    service = TranslationMemoryService(SQLiteStore(path))
+    asyncio.run(service.add_entry(make_entry("The old wizard smiled", scene_type="حوار")))
+    asyncio.run(service.add_novel_context("Tales", NovelContext(
+        title="Tales",
+        characters=[Character(name_original="Merlin", name_translated="ميرلين")],
+        glossary={},
+    )))
+    service.store.close()
+
+    restarted = TranslationMemoryService(SQLiteStore(path))
+    found = find(restarted, "the old wizard smiled")
+    assert [e.translated_text for e in found] == ["ترجمة The old wizard smiled"]
+    assert found[0].context.scene_type == "حوار"
+    characters = asyncio.run(restarted.get_character_translations("Tales"))
+    assert [c.name_translated for c in characters] == ["ميرلين"]
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "memory.db")
+    first = TranslationMemoryService(SQLiteStore(path))
+    second = TranslationMemoryService(SQLiteStore(path))
+
+    asyncio.run(first.add_entry(make_entry("A storm was coming")))
+    asyncio.run(second.add_entry(make_entry("A storm was coming")))
+    asyncio.run(second.add_entry(make_entry("The storm has passed")))
+
+    assert len(first.memory_entries) == 2
+    assert asyncio.run(first.find_exact("A storm was coming")).frequency == 2
+    found = find(first, "the storm has passed")
+    assert [e.original_text for e in found] == ["The storm has passed"]
+
+
+def test_compact_store_round_trips_entries():
+    store = CompactStore()
+    entry = TranslationMemoryEntry(
+        original_text="Merlin raised his staff",
+        translated_text="رفع ميرلين عصاه",
+        context=TranslationContext(previous_paragraph="The tower shook.", scene_type="معركة", chapter_number=3),
+        frequency=4,
+        last_used=datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone(timedelta(hours=3))),
+        characters=[Character(name_original="Merlin", name_translated="ميرلين", aliases=["the wizard"])],
+        tags=["magic", "battle"],
+        novel_title="Tales",
+        target_lang="ar",
+        chapter_id="c3",
+        confidence_score=0.95,
+    )
+    entry_id, created = store.add("key", entry)
+    assert created and store.add("key", entry) == (entry_id, False)
+
+    stored = store.get(entry_id)
+    assert stored.model_dump(exclude={"frequency", "last_used"}) == entry.model_dump(exclude={"frequency", "last_used"})
+    assert stored.frequency == 5
+
+    # النموذج المعاد نسخة؛ تعديله لا يغير المخزن
+    stored.confidence_score = 0.1
+    assert store.get(entry_id).confidence_score == 0.95
+
+    store.update_context(entry_id, TranslationContext(next_paragraph="Silence.", chapter_title="The End"))
+    assert store.get(entry_id).context == TranslationContext(next_paragraph="Silence.", chapter_title="The End")
+    assert list(store.iter_keys()) == [(0, "Merlin raised his staff", "Tales", "ar")]
+
+
+def test_compact_store_preserves_last_used():
+    store = CompactStore()
+    entry = make_entry("Dawn came")
+    entry.last_used = datetime(2023, 1, 2, 3, 4, 5, 678901)
+    store.add("key", entry)
+    assert store.get(0).last_used == entry.last_used
+    with pytest.raises(IndexError):
+        store.get(1)
+
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_limit_returns_prefix_of_full_ranking(vectorized):
+    rng = random.Random(3)
+    words = [f"w{i}" for i in range(10)]
+    service = TranslationMemoryService(vectorized=vectorized)
+    for i in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5))) + f" e{i % 50}"
+        asyncio.run(service.add_entry(make_entry(text, scene_type=rng.choice(["حوار", "وصف"]))))
+
+    for context in (None, TranslationContext(scene_type="حوار")):
+        full = asyncio.run(service.find_similar_translations("w1 w2 w3", context, 0.3))
+        assert len(full) > 20
+        for limit in (1, 5, 20):
+            top = asyncio.run(service.find_similar_translations("w1 w2 w3", context, 0.3, limit=limit))
+            assert top == full[:limit]
+
+
+def test_queries_do_not_mutate_stored_entries():
+    store = InMemoryStore()
+    service = TranslationMemoryService(store)
+    asyncio.run(service.add_entry(make_entry("the old wizard smiled")))
+    asyncio.run(service.add_entry(make_entry("the old wizard")))
+
+    matches = asyncio.run(service.find_similar_translations("the old wizard smiled again", threshold=0.5))
+    assert [(match.entry_id, match.score) for match in matches] == [(0, 4 / 5 * 0.7 + 0.3), (1, 3 / 5 * 0.7 + 0.3)]
+    assert [entry.confidence_score for entry in store.entries] == [1.0, 1.0]
+    assert asyncio.run(service.get_matched_entries(matches))[1].confidence_score == matches[1].score
+
+
+def test_find_similar_endpoint_paginates(monkeypatch):
+    service = TranslationMemoryService()
+    for i in range(30):
+        asyncio.run(service.add_entry(make_entry(f"the dark forest {i}")))
+    monkeypatch.setattr(main.app.state.services, "translation_memory_service", service)
+    client = TestClient(main.app)
+
+    first = client.post("/translation-memory/find-similar",
+                        params={"text": "the dark forest", "threshold": 0.5, "limit": 5})
+    second = client.post("/translation-memory/find-similar",
+                         params={"text": "the dark forest", "threshold": 0.5, "limit": 5, "offset": 5})
+    assert first.status_code == second.status_code == 200
+    texts = [entry["original_text"] for entry in first.json()["translations"] + second.json()["translations"]]
+    assert texts == [f"the dark forest {i}" for i in range(10)]
+    assert client.post("/translation-memory/find-similar",
+                       params={"text": "x", "limit": 0}).status_code == 422
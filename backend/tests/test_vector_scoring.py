@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+import pytest
+
+from models.translation_memory import TranslationContext, TranslationMemoryEntry
+from services.translation_memory_service import TranslationMemoryService, tokenize
+from services.vector_scoring import SCORE_TOLERANCE, VectorScorer
+
+WORDS = [f"w{i}" for i in range(30)]
+
+
+def random_text(rng: random.Random, max_words: int = 8) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, max_words)))
+
+
+def random_context(rng: random.Random) -> TranslationContext:
+    return TranslationContext(
+        previous_paragraph=random_text(rng) or None,
+        next_paragraph=random_text(rng) or None,
+        scene_type=rng.choice(["حوار", "وصف", None]),
+        chapter_number=rng.choice([1, 2, None]),
+    )
+
+
+@pytest.fixture
+def services():
+    rng = random.Random(11)
+    python = TranslationMemoryService(vectorized=False)
+    vector = TranslationMemoryService(vectorized=True)
+    for _ in range(300):
+        text = random_text(rng) or "w0"
+        context = random_context(rng)
+        for service in (python, vector):
+            asyncio.run(service.add_entry(TranslationMemoryEntry(
+                original_text=text, translated_text=text.upper(), context=context,
+            )))
+    return python, vector, rng
+
+
+def results(service, query, context, threshold):
+    matches = asyncio.run(service.find_similar_translations(query, context, threshold))
+    return [(service.memory_entries[match.entry_id].original_text, match.score) for match in matches]
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.3, 0.5, 0.75, 0.9])
+def test_vectorized_scores_match_python_scoring(services, threshold):
+    python, vector, rng = services
+    for _ in range(40):
+        query = random_text(rng)
+        context = random_context(rng) if rng.random() < 0.7 else None
+        expected = results(python, query, context, threshold)
+        found = results(vector, query, context, threshold)
+        assert [text for text, _ in found] == [text for text, _ in expected]
+        for (_, score), (_, reference) in zip(found, expected):
+            assert abs(score - reference) <= SCORE_TOLERANCE
+
+
+def test_top_k_uses_score_then_entry_order():
+    scorer = VectorScorer()
+    context = TranslationContext()
+    for text in ["a b c", "a b", "a b c", "x y", "a"]:
+        scorer.add(tokenize(text), context)
+
+    ids, scores = scorer.top_k(tokenize("a b c"), threshold=0.4, k=2)
+    assert ids.tolist() == [0, 2]
+    assert scores.tolist() == [1.0, 1.0]
+
+    ids, _ = scorer.top_k(tokenize("a b c"), threshold=0.4)
+    assert ids.tolist() == [0, 2, 1, 4]
+    assert scorer.top_k(tokenize("a b c"), threshold=0.4, k=0)[0].tolist() == []
+
+
+def test_update_context_is_reflected_in_scores():
+    python = TranslationMemoryService(vectorized=False)
+    vector = TranslationMemoryService(vectorized=True)
+    for service in (python, vector):
+        asyncio.run(service.add_entry(TranslationMemoryEntry(
+            original_text="the storm", translated_text="العاصفة",
+            context=TranslationContext(previous_paragraph="dark clouds", scene_type="وصف"),
+        )))
+    query_context = TranslationContext(previous_paragraph="bright sun gone", scene_type="حوار")
+    # بناء المقيم قبل التحديث حتى يُختبر تحديث الفهرس نفسه
+    results(vector, "the storm", query_context, 0.0)
+
+    new_context = TranslationContext(previous_paragraph="bright sun", scene_type="حوار", chapter_number=3)
+    for service in (python, vector):
+        asyncio.run(service.update_context(0, new_context))
+
+    expected = results(python, "a storm", query_context, 0.0)
+    assert results(vector, "a storm", query_context, 0.0) == expected
+    assert expected[0][1] > 0.7 * (1 / 3) + 0.3 * 0.4